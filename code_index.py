@@ -0,0 +1,148 @@
+"""Persisted inverted index of the codes of some columns of a csv file.
+
+Columns holding codes (eg the ICD10 or ICD9 diagnoses of UKBB) are indexed
+once per file: each code maps to the rows holding it, so that the rows with
+any of a set of codes are a few lookups and ORs of bitmaps instead of as
+many comparisons of whole columns. The index is dumped in code_index_folder,
+keyed by the source path, the indexed columns, and the size and
+modification time of the file.
+"""
+import os
+import hashlib
+import logging
+import pandas as pd
+import numpy as np
+
+from io_utils import fingerprint, _cache_dir
+
+
+logger = logging.getLogger(__name__)
+
+code_index_folder = 'cache/code_index/'
+
+# Keep the loaded code indexes in memory
+_code_indexes = dict()
+
+
+def _dump_path(path, columns, index_col, sep, encoding):
+    """Return the path of the dumped code index of a file in its state."""
+    size, mtime = fingerprint(path)
+    cache_dir = _cache_dir(path, sep, encoding, folder=code_index_folder)
+    key = repr((sorted(columns), index_col))
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return f'{cache_dir}{digest}/{size}-{mtime}.pkl'
+
+
+class CodeIndex(object):
+    """Map the codes of some columns of a csv file to the rows holding them.
+
+    Codes are the str values of the columns as read by pandas.read_csv, as
+    compared to str codes. For each column, the rows holding a code are
+    stored as a sorted array of row numbers (CSR like layout).
+    """
+
+    def __init__(self, path, columns, index_col, sep=',', encoding=None):
+        """Init."""
+        self.path = path
+        self.fingerprint = fingerprint(path)
+        self.postings = dict()
+
+        # low_memory=False: types are inferred on whole columns, not by chunk
+        df = pd.read_csv(path, sep=sep, encoding=encoding,
+                         usecols=list(columns) + [index_col],
+                         index_col=index_col, low_memory=False)
+        self.ids = df.index
+
+        for column in columns:
+            values = df[column].values
+            is_code = np.array([isinstance(v, str) for v in values],
+                               dtype=bool)
+            rows = np.flatnonzero(is_code)
+            labels, codes = pd.factorize(values[rows])
+            order = np.argsort(labels, kind='stable')
+            counts = np.bincount(labels, minlength=len(codes))
+            self.postings[column] = (
+                pd.Index(codes),
+                np.concatenate([[0], np.cumsum(counts)]),
+                rows[order].astype(np.int32),
+            )
+
+    @property
+    def n_rows(self):
+        """Number of data rows."""
+        return len(self.ids)
+
+    def rows_with_any(self, codes, columns=None):
+        """Give the bitmap of the rows holding any of the codes.
+
+        Parameters
+        ----------
+        codes : list of str
+            The codes to look for.
+        columns : list of str
+            The columns to look into. All the indexed columns if None.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean array over the rows of the file.
+
+        """
+        if columns is None:
+            columns = list(self.postings)
+
+        bitmap = np.zeros(self.n_rows, dtype=bool)
+        for column in columns:
+            index, starts, rows = self.postings[column]
+            for i in index.get_indexer(pd.Index(list(codes))):
+                if i >= 0:
+                    bitmap[rows[starts[i]:starts[i+1]]] = True
+
+        return bitmap
+
+    def ids_with_any(self, codes, columns=None):
+        """Give the unique ids of the rows holding any of the codes."""
+        return self.ids[self.rows_with_any(codes, columns)].unique()
+
+    def take(self, bitmap, idx):
+        """Give the values of a bitmap for some ids as a boolean Series."""
+        positions = self.ids.get_indexer(idx)
+        if (positions < 0).any():
+            raise KeyError(f'Some ids not found in the code index of '
+                           f'{self.path}.')
+
+        return pd.Series(bitmap[positions], index=idx)
+
+    def dump(self, dump_path):
+        """Dump the code index, removing the stale ones of the same file."""
+        dump_dir = os.path.dirname(dump_path)
+        os.makedirs(dump_dir, exist_ok=True)
+        for filename in os.listdir(dump_dir):
+            if filename != os.path.basename(dump_path):
+                os.remove(os.path.join(dump_dir, filename))
+        pd.to_pickle(self, dump_path)
+
+
+def get_code_index(path, columns, index_col, sep=',', encoding=None):
+    """Load the code index of a file, building and dumping it if needed."""
+    key = (os.path.abspath(path), tuple(sorted(columns)), index_col, sep,
+           encoding)
+    code_index = _code_indexes.get(key, None)
+
+    if code_index is not None and code_index.fingerprint == fingerprint(path):
+        return code_index
+
+    dump_path = _dump_path(path, columns, index_col, sep, encoding)
+
+    if os.path.exists(dump_path):
+        logger.info(f'Code index: loading {dump_path}.')
+        code_index = pd.read_pickle(dump_path)
+    else:
+        logger.info(f'Code index: building code index of {path}.')
+        code_index = CodeIndex(path, columns, index_col, sep=sep,
+                               encoding=encoding)
+        code_index.dump(dump_path)
+
+    _code_indexes[key] = code_index
+
+    return code_index
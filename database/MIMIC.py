@@ -3,6 +3,7 @@
 import pandas as pd
 import numpy as np
 
+from missing_values import HeuristicSpec
 from .base import Database
 from .constants import NOT_APPLICABLE, NOT_AVAILABLE, NOT_MISSING, \
     CATEGORICAL
@@ -54,15 +55,6 @@ class MIMIC(Database):
             encoding=encoding,
             encode=encode)
 
-    @staticmethod
-    def heuristic(series):
-        # The series storing the type of missing values
-        series_mv = pd.Series(NOT_MISSING, index=series.index,
-                              name=series.name)
-
-        # series_mv[series.isna()] = NOT_AVAILABLE
-
-        # print(series.name, end='\r')
-
-        return series_mv
+    # Nans are not considered as missing values
+    heuristic = HeuristicSpec()
 
@@ -1,8 +1,8 @@
 """Gather all NHIS related functions."""
 
 import pandas as pd
-import numpy as np
 
+from missing_values import HeuristicSpec
 from .base import Database
 from .constants import NOT_APPLICABLE, NOT_AVAILABLE, NOT_MISSING
 
@@ -32,33 +32,15 @@ class NHIS(Database):
             data_folder=data_folder,
             )
 
-    @staticmethod
-    def heuristic(series):
-        # The series storing the type of missing values
-        series_mv = pd.Series(NOT_MISSING, index=series.index,
-                              name=series.name)
-
-        # Type 1 missing values
-        series_mv[series.isna()] = NOT_APPLICABLE
-
-        # Type 2 missing values
-        # This rule is not applicable for mixed types columns
-        if series.dtype == np.object:
-            return series_mv
-
-        val_max = series.max()
-
-        if val_max < 10:  # Type 1 column
-            series_mv[series == 7] = NOT_AVAILABLE
-            series_mv[series == 8] = NOT_AVAILABLE
-            series_mv[series == 9] = NOT_AVAILABLE
-
-        if val_max < 100:  # Type 2 column
-            series_mv[series == 97] = NOT_AVAILABLE
-            series_mv[series == 98] = NOT_AVAILABLE
-            series_mv[series == 99] = NOT_AVAILABLE
-
-        return series_mv
+    # Type 1: Nans. Type 2: sentinel codes of the numeric columns, not
+    # applicable for mixed types columns
+    heuristic = HeuristicSpec(
+        na=NOT_APPLICABLE,
+        sentinels=[
+            (10, [7, 8, 9], NOT_AVAILABLE),  # Type 1 column
+            (100, [97, 98, 99], NOT_AVAILABLE),  # Type 2 column
+        ],
+    )
 
     def _encode(self):
         super()._encode()
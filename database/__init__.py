@@ -5,9 +5,50 @@ from .UKBB_utils import UKBB_feature_types_converter
 from .MIMIC import MIMIC
 from features_type import _load_feature_types
 
-dbs = {
-    'TB': TB(),
-    'UKBB': UKBB(),
-    'MIMIC': MIMIC(),
-    'NHIS': NHIS(),
-}
+
+class _DatabaseAccessor(object):
+    """Give an accessor to the databases, instantiated on first access."""
+
+    def __init__(self):
+        """Init."""
+        self.db_classes = {
+            'TB': TB,
+            'UKBB': UKBB,
+            'MIMIC': MIMIC,
+            'NHIS': NHIS,
+        }
+        self._dbs = dict()
+
+    def __getitem__(self, acronym):
+        """Access a database, instantiating it if not already done."""
+        if acronym not in self._dbs:
+            self._dbs[acronym] = self.db_classes[acronym]()
+
+        return self._dbs[acronym]
+
+    def __setitem__(self, acronym, db):
+        """Register an already instantiated database."""
+        self._dbs[acronym] = db
+
+    def __contains__(self, acronym):
+        """Tell whether a database is available."""
+        return acronym in self._dbs or acronym in self.db_classes
+
+    def __iter__(self):
+        """Iterate over the acronyms of the databases."""
+        return iter(self.keys())
+
+    def keys(self):
+        """Give the acronyms of the databases."""
+        return list(dict.fromkeys(list(self.db_classes) + list(self._dbs)))
+
+    def values(self):
+        """Give the databases, instantiating them."""
+        return [self[acronym] for acronym in self.keys()]
+
+    def items(self):
+        """Give the acronyms and databases, instantiating them."""
+        return [(acronym, self[acronym]) for acronym in self.keys()]
+
+
+dbs = _DatabaseAccessor()
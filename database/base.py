@@ -8,10 +8,13 @@ import yaml
 import os
 
 from missing_values import get_missing_values
+from missing_mask import MissingMask
 from features_type import _load_feature_types
-from df_utils import split_features, fill_df, set_dtypes_features, \
-    dtype_from_types
+from pandas.api.types import is_integer_dtype
+from df_utils import ColumnGroups, assemble_columns, dtype_from_types, \
+    cast_dtypes, untyped_memory_usage
 from encode import ordinal_encode, one_hot_encode, date_encode
+from io_utils import read_csv
 from .constants import CATEGORICAL, ORDINAL, BINARY, CONTINUE_R, CONTINUE_I, \
     NOT_A_FEATURE, NOT_MISSING, DATE_TIMESTAMP, DATE_EXPLODED, METADATA_PATH
 
@@ -36,6 +39,7 @@ class Database(ABC):
     def __init__(self, name='', acronym='', paths=dict(), sep=',', load=None,
                  encoding='utf-8', encode=None, data_folder=None):
         self.dataframes = dict()
+        # Missing values stored as MissingMask (2 bits per cell)
         self.missing_values = dict()
         self.feature_types = dict()
         self.ordinal_orders = dict()
@@ -209,19 +213,23 @@ class Database(ABC):
             )
         p = self.frame_paths[df_name]
 
-        # dtype = None
-        # if self._dtype is not None:
-        #     dtype = self._dtype.get(df_name, None)
+        # Types of the features if available: categories are set at parse
+        # time, numeric types once the columns are known to be numeric
+        dtype = dict()
+        if tag in self.feature_types:
+            self._set_dtypes(meta)
+            dtype = self._dtype[tag]
+        parse_dtype = {f: d for f, d in dtype.items() if d == 'category'}
 
         if not isinstance(meta, str):
             # Load only the features of the database (avoid load time)
-            features = pd.read_csv(p, sep=self._sep, encoding=self._encoding,
-                                   nrows=0)
+            features = read_csv(p, sep=self._sep, encoding=self._encoding,
+                                nrows=0)
 
             # Compute index where feature to predict is Nan
             if meta.predict is not None and meta.predict in features:
-                df_predict = pd.read_csv(p, sep=self._sep, encoding=self._encoding,
-                                         usecols=[meta.predict], squeeze=True)
+                df_predict = read_csv(p, sep=self._sep, encoding=self._encoding,
+                                      usecols=[meta.predict], squeeze=True)
                 logger.info(
                     f'Raw DB of shape [{df_predict.size} x {features.shape[1]}]')
                 df_predict_mv = get_missing_values(df_predict, self.heuristic)
@@ -241,11 +249,18 @@ class Database(ABC):
             index_to_drop = None
 
         # Load only the features needed: save a lot of time and space
-        df = pd.read_csv(p, sep=self._sep, encoding=self._encoding,
-                         usecols=to_keep, skiprows=index_to_drop)
+        df = read_csv(p, sep=self._sep, encoding=self._encoding,
+                      usecols=to_keep, skiprows=index_to_drop,
+                      dtype=parse_dtype)
 
         logger.info(f'df {tag} loaded with shape {df.shape}')
-        # dtype=dtype)
+
+        if dtype:
+            size_untyped = untyped_memory_usage(df)
+            df = cast_dtypes(df, dtype)
+            size_typed = df.memory_usage(index=False, deep=True).sum()
+            logger.info(f'df {tag} memory: {size_untyped/1e6:.1f} MB untyped '
+                        f'(estimated), {size_typed/1e6:.1f} MB typed.')
 
         # Replace potential infinite values by Nans
         # df.replace([np.inf, -np.inf], np.nan, inplace=True)
@@ -256,6 +271,9 @@ class Database(ABC):
     def heuristic(self, series):
         """Implement the heuristic for detecting missing values.
 
+        May be given as a missing_values.HeuristicSpec class attribute, which
+        also evaluates whole data frames at once.
+
         Parameters
         ----------
         series : pandas.Series
@@ -295,9 +313,10 @@ class Database(ABC):
         if self._dtype is None:
             self._dtype = dict()
 
-        logger.info(f'Setting dtypes of {meta.tag}.')
-        types = self.feature_types[meta.tag]
-        self._dtype[meta.tag] = dtype_from_types(types, type_to_dtype)
+        tag = meta if isinstance(meta, str) else meta.tag
+        logger.info(f'Setting dtypes of {tag}.')
+        types = self.feature_types[tag]
+        self._dtype[tag] = dtype_from_types(types, type_to_dtype)
 
     def _load_ordinal_orders(self, meta):
         logger.info(f'Loading ordinal orders for {self.acronym}.')
@@ -327,12 +346,32 @@ class Database(ABC):
         tag = meta if isinstance(meta, str) else meta.tag
         logger.info(f'Finding missing values of {tag}.')
         df = self.dataframes[tag]
-        self.missing_values[tag] = get_missing_values(df, self.heuristic)
+        mv = MissingMask.from_frame(get_missing_values(df, self.heuristic))
+        logger.info(f'Missing values of {tag} stored in '
+                    f'{mv.memory_usage()/1e6:.1f} MB.')
+        self.missing_values[tag] = mv
 
     @staticmethod
-    def _encode_df(df, mv, types, order=None, encode=None):
+    def _encode_df(df, mv, types, order=None, encode=None, vocabulary=None):
+        """Encode a df according to the types of its features.
+
+        Given a vocabulary (see vocabulary.get_vocabulary), the categories
+        and date minima of its features are not derived from df: the
+        encoders only transform and the encoded columns do not depend on
+        the rows of df. The orders take precedence over the vocabulary.
+        """
         logger.info(f'Encode mode: {encode}')
 
+        categories, one_hot_categories, minima = None, None, None
+        if vocabulary is not None:
+            categories = {f: v['categories'] for f, v in vocabulary.items()
+                          if 'categories' in v}
+            one_hot_categories = {f: v['one_hot'] for f, v in
+                                  vocabulary.items() if 'one_hot' in v}
+            minima = {f: v['date_min'] for f, v in vocabulary.items()
+                      if 'date_min' in v}
+            order = {**categories, **(order or dict())}
+
         common_features = [f for f in df.columns if f in types.index]
         types = types[common_features]
 
@@ -343,21 +382,15 @@ class Database(ABC):
         types = pd.concat([types, extra_types])
         parent = pd.Series(df.columns, index=df.columns)
 
-        # Split the data frame according to the types of the features
-        splitted_df = split_features(df, types)
-
-        # Split the missing values in the same way
-        splitted_mv = split_features(mv, types)
-
-        # Split the feature types in the same way
-        splitted_types = split_features(types, types)
-
-        # Split the parent features
-        splitted_parent = split_features(parent, types)
+        # Index the columns of each type once, shared by df, mv, types, parent
+        groups = ColumnGroups(types, df.columns)
+        splitted_types = groups.split(types)
+        splitted_parent = groups.split(parent)
 
         # Choose which tables go in which pipeline
         to_ordinal_encode_ids = []
         to_one_hot_encode_ids = []
+        to_categorical_encode_ids = []
         to_delete_ids = [NOT_A_FEATURE]
         to_date_encode_exp = []
         to_date_encode_tim = []
@@ -371,58 +404,80 @@ class Database(ABC):
         if encode is not None and ('one_hot' in encode or 'all' in encode):
             to_one_hot_encode_ids = [CATEGORICAL]
 
+        # Native categorical mode: categorical features kept as integer codes
+        if encode is not None and 'native' in encode:
+            to_categorical_encode_ids = [CATEGORICAL]
+            to_one_hot_encode_ids = []
+
+        sparse = encode is not None and 'sparse' in encode
+
         if encode is not None and ('date' in encode or 'all' in encode):
             to_date_encode_exp = [DATE_EXPLODED]
             to_date_encode_tim = [DATE_TIMESTAMP]
 
         logger.info(f'Keys, ordinal encode: {to_ordinal_encode_ids}')
         logger.info(f'Keys, one hot encode: {to_one_hot_encode_ids}')
+        logger.info(f'Keys, categorical encode: {to_categorical_encode_ids}')
         logger.info(f'Keys, date encode exp: {to_date_encode_exp}')
         logger.info(f'Keys, date encode tim: {to_date_encode_tim}')
         logger.info(f'Keys, to delete: {to_delete_ids}')
 
-        # Delete unwanted tables
-        for k in to_delete_ids:
-            splitted_df.pop(k, None)
-            splitted_mv.pop(k, None)
+        # Split df and mv without the unwanted tables
+        kept_ids = [k for k in groups.labels if k not in to_delete_ids]
+        splitted_df = groups.split(df, kept_ids)
+        splitted_mv = groups.split(mv, kept_ids)
 
-        # Fill missing values otherwise the fit raises an error cause of Nans
-        # splitted_mv_bool = {k: mv != NOT_MISSING for k, mv in splitted_mv.items()}
-        # splitted_df = fill_df(splitted_df, splitted_mv_bool, 'z MISSING_VALUE')
-        # Set missing values to blank
+        # Set missing values to blank, inplace on the splitted copies
         logger.info('Encoding: Fill missing values.')
-        splitted_mv_bool = {k: mv != NOT_MISSING for k, mv in splitted_mv.items()}
-        splitted_df = fill_df(splitted_df, splitted_mv_bool, np.nan)
+        for k, sub_df in splitted_df.items():
+            sub_df.mask(splitted_mv[k] != NOT_MISSING, np.nan, inplace=True)
 
         # Ordinal encode
         logger.info('Encoding: Ordinal encode.')
         splitted_df, splitted_mv = ordinal_encode(splitted_df, splitted_mv, keys=to_ordinal_encode_ids, order=order)
 
+        # Categorical encode: codes without order, types kept as categorical
+        logger.info('Encoding: Categorical encode.')
+        splitted_df, splitted_mv = ordinal_encode(splitted_df, splitted_mv, keys=to_categorical_encode_ids, order=categories)
+
         # One hot encode
         logger.info('Encoding: One hot encode.')
-        splitted_df, splitted_mv, splitted_types, splitted_parent = one_hot_encode(splitted_df, splitted_mv, splitted_types, splitted_parent, keys=to_one_hot_encode_ids)
+        # Always sparse: the dense columns are only written in the merge
+        splitted_df, splitted_mv, splitted_types, splitted_parent = one_hot_encode(splitted_df, splitted_mv, splitted_types, splitted_parent, keys=to_one_hot_encode_ids, sparse=True, categories=one_hot_categories)
 
         # Date encode
         logger.info('Encoding: Date encode.')
         splitted_df, splitted_mv, splitted_types, splitted_parent = date_encode(splitted_df, splitted_mv, splitted_types, splitted_parent, keys=to_date_encode_exp, method='explode', dayfirst=True)
-        splitted_df, splitted_mv, splitted_types, splitted_parent = date_encode(splitted_df, splitted_mv, splitted_types, splitted_parent, keys=to_date_encode_tim, method='timestamp', dayfirst=True)
+        splitted_df, splitted_mv, splitted_types, splitted_parent = date_encode(splitted_df, splitted_mv, splitted_types, splitted_parent, keys=to_date_encode_tim, method='timestamp', dayfirst=True, minima=minima)
 
-        logger.info('Encoding: Fill missing values.')
-        splitted_mv_bool = {k: mv != NOT_MISSING for k, mv in splitted_mv.items()}
-        splitted_df = fill_df(splitted_df, splitted_mv_bool, np.nan)
+        # The encoders give Nans on missing values: no need to fill again
+        for k in [CONTINUE_R, CONTINUE_I]:
+            if k in splitted_df:
+                splitted_df[k] = splitted_df[k].astype(float)
 
-        # Merge encoded df
+        # Merge encoded df into preallocated arrays if dtypes allow it
         logger.info('Encoding: Merge df.')
-        encoded_df = pd.concat(splitted_df.values(), axis=1)
-        encoded_mv = pd.concat(splitted_mv.values(), axis=1)
         encoded_types = pd.concat(splitted_types.values())
         encoded_parent = pd.concat(splitted_parent.values())
 
-        # Set types on encoded df
-        encoded_df = set_dtypes_features(encoded_df, encoded_types, {
-            CONTINUE_R: float,
-            CONTINUE_I: float,
-        })
+        mv_dtypes = [dt for mv in splitted_mv.values() for dt in mv.dtypes]
+        encoded_mv = None
+        if mv_dtypes and all(is_integer_dtype(dt) for dt in mv_dtypes):
+            encoded_mv = assemble_columns(splitted_mv,
+                                          np.result_type(*mv_dtypes))
+        if encoded_mv is None:
+            encoded_mv = pd.concat(splitted_mv.values(), axis=1)
+
+        encoded_df = None
+        if not sparse:
+            encoded_df = assemble_columns(splitted_df, np.float64)
+
+        if encoded_df is None:
+            if not sparse:
+                for k in to_one_hot_encode_ids:
+                    if k in splitted_df:
+                        splitted_df[k] = splitted_df[k].sparse.to_dense()
+            encoded_df = pd.concat(splitted_df.values(), axis=1)
 
         return encoded_df, encoded_mv, encoded_types, encoded_parent
 
@@ -439,13 +494,13 @@ class Database(ABC):
 
         else:
             types = self.feature_types[tag]
-            mv = self.missing_values[tag]
+            mv = self.missing_values[tag].to_frame()
             order = self.ordinal_orders.get(tag, None)
 
             encoded = self._encode_df(df, mv, types, order=order, encode=self.encode)
 
             self.encoded_dataframes[tag] = encoded[0]
-            self.encoded_missing_values[tag] = encoded[1]
+            self.encoded_missing_values[tag] = MissingMask.from_frame(encoded[1])
             self.encoded_feature_types[tag] = encoded[2]
             self.encoded_parent[tag] = encoded[3]
 
@@ -489,7 +544,7 @@ class Database(ABC):
     def rename_encode(self, tag, rename, encode='all'):
         df = self.dataframes[tag]
 
-        mv = self.missing_values[tag]
+        mv = self.missing_values[tag].to_frame()
         types = self.feature_types[tag]
         order = None
         if tag in self.ordinal_orders:
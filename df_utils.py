@@ -1,7 +1,9 @@
 """Operations on pandas data frame."""
-
+import sys
 import pandas as pd
 import numpy as np
+from pandas.api.types import is_numeric_dtype, is_integer_dtype, \
+    is_bool_dtype
 
 
 def split_features(df, groups):
@@ -35,6 +37,101 @@ def split_features(df, groups):
     return sub_df
 
 
+class ColumnGroups():
+    """Index of the positions of the columns of a df by group.
+
+    Computed once from the groups of the features, it hands out the columns
+    of each group of any object sharing the features (df, missing values,
+    types, parents) without the per-group drop of split_features.
+
+    Parameters:
+    -----------
+    groups : pandas.Series
+        Series with the features' names as index and the group as values.
+    columns : pandas.Index
+        The columns of the df, giving the order of the features in the
+        groups. Default to the index of groups.
+
+    """
+
+    def __init__(self, groups, columns=None):
+        if columns is None:
+            columns = groups.index
+        groups = groups[columns]
+        codes, self.labels = pd.factorize(groups)
+        self.labels = list(self.labels)
+        self.columns = columns
+        self.positions = {g: np.flatnonzero(codes == i)
+                          for i, g in enumerate(self.labels)}
+
+    def take(self, obj, group):
+        """Columns of a group of a df (or items of a series), as a copy."""
+        positions = self.positions[group]
+        if isinstance(obj, pd.Series):
+            return obj.take(positions)
+        return obj.take(positions, axis=1)
+
+    def split(self, obj, groups=None):
+        """Dictionnary with groups as keys and sub objects as values."""
+        if groups is None:
+            groups = self.labels
+        return {g: self.take(obj, g) for g in groups}
+
+
+def assemble_columns(frames, dtype):
+    """Concatenate the columns of data frames into one preallocated array.
+
+    The frames are popped from the given dict once copied, so that the peak
+    memory is close to the size of the output. Sparse frames are densified
+    column block by column block. The output holds one contiguous block per
+    column.
+
+    Parameters:
+    -----------
+    frames : dict
+        Data frames sharing the same index, in the order of the output.
+    dtype : np.dtype
+        The dtype of the output. Each frame must have columns of this dtype
+        or of the sparse dtype of this dtype.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The concatenated data frame. None if a frame has a column of another
+        dtype, the frames being left untouched.
+
+    """
+    def subtype(dt):
+        return dt.subtype if isinstance(dt, pd.SparseDtype) else dt
+
+    if not frames or any(subtype(dt) != dtype for df in frames.values()
+                         for dt in df.dtypes):
+        return None
+
+    index = next(iter(frames.values())).index
+    columns = pd.Index([]).append([df.columns for df in frames.values()])
+    values = np.empty((len(columns), len(index)), dtype=dtype)
+
+    start = 0
+    for k in list(frames.keys()):
+        df = frames.pop(k)
+        stop = start + df.shape[1]
+        block = values[start:stop, :]
+        sparse = [isinstance(dt, pd.SparseDtype) for dt in df.dtypes]
+        if any(sparse) and all(sparse) and \
+                {dt.fill_value for dt in df.dtypes} == {0}:
+            coo = df.sparse.to_coo()
+            block[:] = 0
+            block[coo.col, coo.row] = coo.data
+        elif any(sparse):
+            block[:] = df.sparse.to_dense().values.T
+        else:
+            block[:] = df.values.T
+        start = stop
+
+    return pd.DataFrame(values.T, index=index, columns=columns, copy=False)
+
+
 def fill_df(df, b, value, keys=None):
 
     def fill(df, b, value):
@@ -131,6 +228,117 @@ def dtype_from_types(types, type_to_dtype):
     return dtype
 
 
+def _numeric_categories(series):
+    """Convert the categories to numbers if they all are, as read_csv does.
+
+    Keep the values of a categorical column parsed from strings equal to
+    the ones of the untyped parse (eg 1.0 if the column has missing values).
+    """
+    categories = series.cat.categories
+    if is_numeric_dtype(categories) or len(categories) == 0:
+        return series
+
+    try:
+        numbers = pd.to_numeric(categories)
+    except (ValueError, TypeError):
+        return series
+
+    if series.hasnans:
+        numbers = numbers.astype(float)
+
+    # Distinct strings may give the same number (eg 1 and 1.0)
+    new_categories = pd.Index(numbers.unique()).sort_values()
+    old_to_new = new_categories.get_indexer(numbers)
+    codes = series.cat.codes.values
+    codes = np.where(codes >= 0, old_to_new[codes], -1)
+    values = pd.Categorical.from_codes(codes, new_categories)
+
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def _fits_int32(series):
+    """Tell whether a numeric column holds only int32 values or Nans."""
+    values = series.dropna().values
+    if len(values) == 0:
+        return True
+    info = np.iinfo(np.int32)
+    if values.min() < info.min or values.max() > info.max:
+        return False
+    return is_integer_dtype(values) or bool(np.all(np.mod(values, 1) == 0))
+
+
+def cast_dtypes(df, dtype):
+    """Cast the columns of a parsed df to the given dtypes when possible.
+
+    Numeric dtypes are only applied to the columns parsed as numbers: the
+    other ones hold codes of missing values (eg 'NA', 'ND') and are left
+    untouched.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The data frame to cast.
+    dtype : dict
+        Features' names as keys and 'category', np.float32 or 'Int32' as
+        values (see type_to_dtype in database/base.py).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Data frame with casted dtypes.
+
+    """
+    df = df.copy(deep=False)
+
+    for f in df.columns:
+        if f not in dtype:
+            continue
+
+        series = df[f]
+        numeric = is_numeric_dtype(series) and not is_bool_dtype(series)
+
+        if dtype[f] == 'category':
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype('category')
+            df[f] = _numeric_categories(series)
+
+        elif dtype[f] == 'Int32':
+            if numeric and _fits_int32(series):
+                df[f] = series.astype('Int32')
+
+        elif numeric:
+            df[f] = series.astype(dtype[f])
+
+    return df
+
+
+def untyped_memory_usage(df):
+    """Estimate the memory usage of a df if parsed without dtypes (bytes).
+
+    Categorical columns are counted as the float or str objects columns they
+    would have been. Other columns are counted as they are.
+    """
+    size = 0
+
+    for f in df.columns:
+        series = df[f]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            size += series.memory_usage(index=False, deep=True)
+            continue
+
+        categories = series.cat.categories
+        if is_numeric_dtype(categories):
+            size += 8*len(series)
+            continue
+
+        # Pointer to a python str per value, Nan being a float
+        sizes = np.array([sys.getsizeof(c) for c in categories] +
+                         [sys.getsizeof(np.nan)], dtype=np.int64)
+        size += 8*len(series) + sizes[series.cat.codes.values].sum()
+
+    return int(size)
+
+
 def get_columns(df):
     if isinstance(df, pd.DataFrame):
         return df.columns
@@ -4,8 +4,9 @@ import yaml
 from time import time
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import OrdinalEncoder, OneHotEncoder
+from sklearn.preprocessing import OneHotEncoder
 from datetime import datetime
+from pandas.api.types import infer_dtype
 
 from database.constants import NOT_MISSING, BINARY, CONTINUE_I, MV_PLACEHOLDER
 from df_utils import fill_df
@@ -27,9 +28,9 @@ def _df_type_handler(function, df_seq, keys=None, **kwargs):
                 r = function(*(df_seq[i][k] for i in range(n_df)), **kwargs)
                 for i in range(n_df):
                     res[i][k] = r[i]
-            else:
+            else:  # Untouched, shared with the input
                 for i in range(n_df):
-                    res[i][k] = df_seq[i][k].copy()
+                    res[i][k] = df_seq[i][k]
 
         return res
 
@@ -44,65 +45,235 @@ def _df_type_handler(function, df_seq, keys=None, **kwargs):
     return function(*df_seq, **kwargs)
 
 
-def ordinal_encode(df, mv, keys=None, order=None):
+def _normalize(value):
+    """Give the canonical form of a category: 1, 1.0 and '1' are the same.
 
-    def encode(df, mv, order=None):
-        categories = 'auto'
+    Numbers are normalized, integers as int. Strings are read as numbers
+    only if written in their canonical form ('389', '1.5', '1.0'), so that
+    codes like '0389' or '1e3' stay distinct categories.
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return str(value)
 
-        if order is not None:
-            categories = []
-            for feature_name in df.columns:
-                if feature_name in order:
-                    feature_order = order[feature_name]
-                else:
-                    print(
-                        f'INFO: ordinal order for {feature_name} not found. '
-                        f'Derived from unique values found.')
-                    feature_order = list(np.unique(df[feature_name].values))
-                categories.append(feature_order)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
 
-        enc = OrdinalEncoder(categories=categories)
+    if isinstance(value, (float, np.floating)):
+        number = float(value)
+        if not np.isfinite(number):
+            return value
+        return int(number) if number.is_integer() else number
 
-        df = fill_df(df, mv != NOT_MISSING, MV_PLACEHOLDER)
+    if isinstance(value, str):
+        try:
+            if str(int(value)) == value:
+                return int(value)
+        except ValueError:
+            pass
 
-        # Cast to str to prevent: "Found unknown categories ..." error
-        # which occurs when float but order file is str
-        df = df.astype(str)
+        try:
+            number = float(value)
+        except ValueError:
+            return value
 
-        # Fit transform the encoder
-        data_encoded = enc.fit_transform(df)
-        df = fill_df(df, mv != NOT_MISSING, np.nan)
+        if repr(number) == value and np.isfinite(number):
+            return int(number) if number.is_integer() else number
 
-        df_encoded = pd.DataFrame(data_encoded,
-                                  index=df.index, columns=df.columns)
+    return value
 
-        # print(enc.categories_)
-        # order_list = []
-        # for i, feature_name in enumerate(df.columns):
-        #     order_list.append(list(enc.categories_[i]))
-        #     print(f'{feature_name}\n\t{enc.categories_[i]}')
 
-        # document = yaml.dump(order_list, allow_unicode=True)
-        # print(document)
-        # with open(f'order_{time()}.yml', 'w') as file:
-        #     file.write(document)
+def _parsed(value):
+    """Give the number a value is parsed as by read_csv, None if not one.
 
-        return df_encoded, mv
+    Eg '01' and '1.50' are parsed as 1 and 1.5 in a numeric column.
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return None
 
-    return _df_type_handler(encode, (df, mv), keys, order=order)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+
+    if not np.isfinite(number):
+        return None
+
+    return _normalize(number)
+
+
+def _match_parsed(values, categories):
+    """Match values not in categories to the categories parsed as them.
+
+    The rows of a task may be parsed as numbers while the categories are
+    the strings of the whole file (eg '01' parsed as 1 when the strings of
+    the column are in skipped rows). Such a value is matched to the first
+    category parsed as it.
 
+    Returns
+    -------
+    dict
+        The matched values as keys and their categories as values.
 
-def one_hot_encode(df, mv, types, parent, keys=None):
+    """
+    parsed = dict()
+    for c in categories:
+        number = _parsed(c)
+        if number is not None:
+            parsed.setdefault(number, c)
 
-    def encode(df, mv, types, parent):
-        enc = OneHotEncoder(sparse=False)
+    matches = dict()
+    for v in values:
+        number = _parsed(v)
+        if number is not None and number in parsed:
+            matches[v] = parsed[number]
 
-        # Cast to str to prevent: "argument must be a string or number" error
-        # which occurs when mixed types floats and str
-        df = df.astype(str)
+    return matches
 
-        # Fill missing values with a placeholder
-        df = fill_df(df, mv != NOT_MISSING, MV_PLACEHOLDER)
+
+def _sort_key(value):
+    """Sort the numbers by value, then the strings."""
+    if isinstance(value, str):
+        return (1, 0, value)
+    return (0, value, '')
+
+
+def ordinal_categories(series, mv):
+    """Sorted categories of a feature, as derived by ordinal_encode."""
+    _, uniques = pd.factorize(series.where(mv == NOT_MISSING))
+    return sorted(set(_normalize(v) for v in uniques), key=_sort_key)
+
+
+def ordinal_encode(df, mv, keys=None, order=None):
+    """Encode the categories of the features as integers.
+
+    Built on the codes of pandas.factorize: the values are not cast to str,
+    only the distinct ones are normalized (1, 1.0 and '1' are the same
+    category). The categories are given by the order of the feature if any
+    (see Database._load_ordinal_orders), else by the sorted distinct values
+    (numbers first). Values not in the given categories are matched to the
+    ones parsed as them if any (see _match_parsed). Missing values are
+    encoded as Nans.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or dict or list of pandas.DataFrame
+        The features to encode.
+    mv : same type as df
+        The types of missing values of df.
+    keys : list
+        Keys of the dict of df to encode. All encoded if None.
+    order : dict
+        Features' names as keys and list of ordered categories as values.
+
+    Returns
+    -------
+    tuple
+        The encoded df (float codes, Nans for missing values) and mv.
+
+    """
+    def encode(df, mv, order=None):
+        data = dict()
+        is_mv = (mv != NOT_MISSING).values
+
+        for j, feature_name in enumerate(df.columns):
+            series = df.iloc[:, j]
+            codes, uniques = pd.factorize(series.where(~is_mv[:, j]))
+            values = [_normalize(v) for v in uniques]
+
+            if order is not None and feature_name in order:
+                categories = [_normalize(v) for v in order[feature_name]]
+            else:
+                if order is not None:
+                    print(
+                        f'INFO: ordinal order for {feature_name} not found. '
+                        f'Derived from unique values found.')
+                categories = sorted(set(values), key=_sort_key)
+
+            positions = {v: i for i, v in enumerate(categories)}
+            unknown = [v for v in values if v not in positions]
+            for v, c in _match_parsed(unknown, categories).items():
+                positions[v] = positions[c]
+            unknown = [v for v in unknown if v not in positions]
+            if unknown:
+                raise ValueError(f'Found unknown categories {unknown} in '
+                                 f'column {feature_name} during fit')
+
+            # Codes of the distinct values, Nan for missing at the end (-1)
+            mapping = np.array([positions[v] for v in values] + [np.nan])
+            data[j] = mapping[codes]
+
+        df_encoded = pd.DataFrame(data, index=df.index)
+        df_encoded.columns = df.columns
+
+        return df_encoded, mv
+
+    return _df_type_handler(encode, (df, mv), keys, order=order)
+
+
+def _one_hot_values(series, mv, normalize=False):
+    """Values of a feature as one hot encoded: str, placeholder if missing.
+
+    If normalize, 1, 1.0 and '1' are the same value (see _normalize), so
+    that the values do not depend on the type the column is parsed with.
+    """
+    if normalize:
+        codes, uniques = pd.factorize(series)
+        values = [str(_normalize(v)) for v in uniques] + [str(np.nan)]
+        series = pd.Series(np.array(values, dtype=object)[codes],
+                           index=series.index)
+    else:
+        # Cast to str to prevent: "argument must be a string or number"
+        # error which occurs when mixed types floats and str
+        series = series.astype(str)
+
+    return series.mask(mv != NOT_MISSING, MV_PLACEHOLDER)
+
+
+def one_hot_categories(series, mv, normalize=False):
+    """Sorted categories of a feature, as derived by one_hot_encode."""
+    return list(np.unique(_one_hot_values(series, mv, normalize).values))
+
+
+def one_hot_encode(df, mv, types, parent, keys=None, sparse=False,
+                   categories=None):
+    """One hot encode the features.
+
+    If sparse, the encoded features are stored as sparse columns built from
+    the CSR matrix of the encoder instead of a dense float column per
+    category. The categories of the features in categories (see
+    one_hot_categories with normalize) are not derived from df.
+    """
+    def encode(df, mv, types, parent, sparse=False, categories=None):
+        if categories is None:
+            categories = dict()
+
+        # Values as str, missing values filled with a placeholder
+        df = pd.DataFrame({
+            j: _one_hot_values(df.iloc[:, j], mv.iloc[:, j],
+                               normalize=c in categories)
+            for j, c in enumerate(df.columns)
+        }, index=df.index)
+        df.columns = mv.columns
+
+        # Values parsed as numbers while the categories are strings
+        for c in df.columns:
+            if c in categories:
+                known = set(categories[c])
+                unknown = [v for v in df[c].unique() if v not in known]
+                matches = _match_parsed(unknown, categories[c])
+                if matches:
+                    df[c] = df[c].replace(matches)
+
+        enc = OneHotEncoder(sparse=sparse, categories=[
+            categories[c] if c in categories else list(np.unique(df[c].values))
+            for c in df.columns
+        ])
 
         # Fit transform the encoder
         data_encoded = enc.fit_transform(df)
@@ -117,12 +288,17 @@ def one_hot_encode(df, mv, types, parent, keys=None):
             for suffix in enc.categories_[i]:
                 parent[f'{c}_{suffix}'] = c
 
-        df_encoded = pd.DataFrame(data_encoded,
-                                  index=df.index,
-                                  columns=feature_names
-                                  )
-
-        mv_encoded = pd.DataFrame(NOT_MISSING*np.ones(data_encoded.shape),
+        if sparse:
+            df_encoded = pd.DataFrame.sparse.from_spmatrix(
+                data_encoded, index=df.index, columns=feature_names)
+        else:
+            df_encoded = pd.DataFrame(data_encoded,
+                                      index=df.index,
+                                      columns=feature_names
+                                      )
+
+        mv_encoded = pd.DataFrame(np.full(data_encoded.shape, NOT_MISSING,
+                                          dtype=np.int8),
                                   index=df.index,
                                   columns=feature_names)
 
@@ -130,22 +306,138 @@ def one_hot_encode(df, mv, types, parent, keys=None):
 
         return df_encoded, mv_encoded, types_encoded, parent
 
-    return _df_type_handler(encode, (df, mv, types, parent), keys=keys)
+    return _df_type_handler(encode, (df, mv, types, parent), keys=keys,
+                            sparse=sparse, categories=categories)
+
+
+# Formats tried on the date columns, the one giving the same dates as the
+# generic parser on a sample of the values is used for the whole column
+date_formats = [
+    '%Y-%m-%d',
+    '%d/%m/%Y',
+    '%d-%m-%Y',
+    '%Y/%m/%d',
+    '%m/%d/%Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+]
+
+# Formats detected by column: (feature_name, dayfirst) -> format
+_date_formats = dict()
+
+
+def _detect_date_format(values, feature_name=None, dayfirst=False,
+                        n_samples=100):
+    """Find a format parsing a sample of the values as pd.to_datetime does.
+
+    The format detected before for the column is tried first.
+    """
+    step = max(len(values) // n_samples, 1)
+    sample = values[::step][:n_samples]
+    expected = pd.to_datetime(sample, dayfirst=dayfirst)
+
+    key = (feature_name, dayfirst)
+    formats = [_date_formats[key]] if key in _date_formats else []
+
+    for fmt in formats + date_formats:
+        try:
+            parsed = pd.to_datetime(sample, format=fmt)
+        except (TypeError, ValueError):
+            continue
+        if parsed.equals(expected):
+            _date_formats[key] = fmt
+            return fmt
+
+    return None
+
 
+def _parse_dates(series, dayfirst=False):
+    """Parse the distinct values of a column of dates.
 
-def date_encode(df, mv, types, parent, keys=None, method='timestamp', dayfirst=False):
+    Each distinct value is parsed once, with the format detected on a
+    sample if the values are strings.
 
-    def encode(df, mv, types, parent, method='timestamp', dayfirst=False):
+    Returns
+    -------
+    tuple
+        The codes of the values (-1 for missing) and the parsed distinct
+        values as a datetime64 array ending with a NaT: dates[codes] gives
+        the dates of the column.
+
+    """
+    codes, uniques = pd.factorize(series)
+    uniques = np.asarray(uniques)
+
+    fmt = None
+    if uniques.size and infer_dtype(uniques, skipna=False) == 'string':
+        fmt = _detect_date_format(uniques, series.name, dayfirst=dayfirst)
+
+    if fmt is None:
+        parsed = pd.to_datetime(uniques, dayfirst=dayfirst).values
+    else:
+        parsed = pd.to_datetime(uniques, format=fmt, errors='coerce').values
+        failed = np.isnat(parsed)
+        if failed.any():  # Values not in the detected format
+            parsed[failed] = pd.to_datetime(uniques[failed],
+                                            dayfirst=dayfirst).values
+
+    # NaT for missing values at the end (-1)
+    dates = np.append(parsed.astype('datetime64[ns]'), np.datetime64('NaT'))
+
+    return codes, dates
+
+
+def _explode_dates(dates):
+    """Year, month and day of a datetime64 array as floats (Nan for NaT)."""
+    is_nat = np.isnat(dates)
+    months = dates.astype('datetime64[M]')
+
+    year = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (dates.astype('datetime64[D]') -
+           months.astype('datetime64[D]')).astype(np.int64) + 1
+
+    return [np.where(is_nat, np.nan, a) for a in [year, month, day]]
+
+
+def _min_date(dates):
+    """Minimum of a datetime64 array, NaT if only NaTs."""
+    is_nat = np.isnat(dates)
+    return dates[~is_nat].min() if not is_nat.all() else np.datetime64('NaT')
+
+
+def date_minimum(series, mv, dayfirst=False):
+    """Minimum date of a feature, the origin of the timestamp encoding."""
+    _, dates = _parse_dates(series.where(mv == NOT_MISSING), dayfirst=dayfirst)
+    return _min_date(dates)
+
+
+def date_encode(df, mv, types, parent, keys=None, method='timestamp', dayfirst=False,
+                minima=None):
+    """Encode the dates as timestamps (days since the minimum) or exploded.
+
+    The minima of the features in minima (see date_minimum) are not derived
+    from df.
+    """
+    def encode(df, mv, types, parent, method='timestamp', dayfirst=False,
+               minima=None):
         df = fill_df(df, mv != NOT_MISSING, np.nan)
 
+        if minima is None:
+            minima = dict()
+
         if method == 'timestamp':
             data = dict()
 
             for feature_name in df.columns:
-                dt_series = pd.to_datetime(df[feature_name], dayfirst=dayfirst)
-                dt_min = np.datetime64(dt_series.min())
+                codes, dates = _parse_dates(df[feature_name], dayfirst=dayfirst)
+                dt_min = minima.get(feature_name, None)
+                if dt_min is None:
+                    dt_min = _min_date(dates)
                 tdt = np.timedelta64(1, 'D')
-                data[feature_name] = np.subtract(dt_series.values, dt_min)/tdt
+                data[feature_name] = (np.subtract(dates, dt_min)/tdt)[codes]
 
             df_encoded = pd.DataFrame(data, index=df.index)
             mv_encoded = mv
@@ -157,11 +449,12 @@ def date_encode(df, mv, types, parent, keys=None, method='timestamp', dayfirst=F
             parent = pd.Series()
 
             for feature_name in df.columns:
-                dt = pd.to_datetime(df[feature_name], dayfirst=dayfirst).dt
+                codes, dates = _parse_dates(df[feature_name], dayfirst=dayfirst)
+                year, month, day = _explode_dates(dates)
 
-                df_data[f'{feature_name}_year'] = dt.year
-                df_data[f'{feature_name}_month'] = dt.month
-                df_data[f'{feature_name}_day'] = dt.day
+                df_data[f'{feature_name}_year'] = year[codes]
+                df_data[f'{feature_name}_month'] = month[codes]
+                df_data[f'{feature_name}_day'] = day[codes]
 
                 mv_data[f'{feature_name}_year'] = mv[feature_name]
                 mv_data[f'{feature_name}_month'] = mv[feature_name]
@@ -178,4 +471,4 @@ def date_encode(df, mv, types, parent, keys=None, method='timestamp', dayfirst=F
         return df_encoded, mv_encoded, types_encoded, parent
 
     return _df_type_handler(encode, (df, mv, types, parent), keys=keys, method=method,
-                            dayfirst=dayfirst)
+                            dayfirst=dayfirst, minima=minima)
@@ -1,10 +1,10 @@
 """Extract a sub df from a big df."""
 import os
-import pandas as pd
 import argparse
 import logging
 import csv
 
+from io_utils import read_csv
 from prediction.tasks import tasks
 from database.base import Database
 from database import dbs
@@ -32,8 +32,7 @@ def run(argv=None):
     df_name = task.meta.df_name
     path = db.frame_paths[df_name]
 
-    features = pd.read_csv(path, sep=db._sep, encoding=db._encoding,
-                           nrows=0)
+    features = read_csv(path, sep=db._sep, encoding=db._encoding, nrows=0)
 
     to_keep, _ = Database.get_drop_and_keep_meta(features, task.meta)
 
@@ -45,8 +44,8 @@ def run(argv=None):
         index_col = None
         quoting = csv.QUOTE_MINIMAL
 
-    df = pd.read_csv(path, sep=db._sep, encoding=db._encoding,
-                     usecols=to_keep, index_col=index_col)
+    df = read_csv(path, sep=db._sep, encoding=db._encoding,
+                  usecols=to_keep, index_col=index_col)
 
     dump_path = dump_folder + db.acronym
     os.makedirs(dump_path, exist_ok=True)
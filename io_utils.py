@@ -0,0 +1,250 @@
+"""Read the csv files of the databases, optionally through a columnar cache.
+
+The cache is opt-in: set the environment variable CSV_CACHE=1 to enable it.
+On first read, the whole csv is parsed once and stored as a parquet file in
+cache_folder. Next reads load only the asked columns from the parquet file.
+A cache entry is keyed by the source path, its size and its modification
+time, so it is rebuilt automatically when the source csv changes.
+
+Set CSV_N_JOBS to a number of processes > 1 to parse the csv files in
+parallel chunks (see row_index.py).
+"""
+import os
+import hashlib
+import logging
+import pandas as pd
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+cache_folder = 'cache/csv/'
+
+# Count the cache hits and misses of the current process
+cache_stats = {'hits': 0, 'misses': 0}
+
+
+def cache_enabled():
+    """Tell whether the columnar cache is enabled (CSV_CACHE env var)."""
+    return os.environ.get('CSV_CACHE', '0').lower() in ['1', 'true', 'yes']
+
+
+def n_jobs_default():
+    """Give the number of processes parsing a csv (CSV_N_JOBS env var)."""
+    n_jobs = int(os.environ.get('CSV_N_JOBS', '1'))
+    return os.cpu_count() if n_jobs == -1 else max(n_jobs, 1)
+
+
+def fingerprint(path):
+    """Return a (size, mtime) tuple identifying the content of a file."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _cache_dir(path, sep, encoding, folder=None):
+    """Return the folder storing the cache entries of a source file."""
+    if folder is None:
+        folder = cache_folder
+    key = f'{os.path.abspath(path)}|{sep}|{encoding}'
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    basename, _ = os.path.splitext(os.path.basename(path))
+    return f'{folder}{basename}_{digest}/'
+
+
+def _cache_path(path, sep, encoding):
+    """Return the path of the cache entry of a source file in its state."""
+    size, mtime = fingerprint(path)
+    return f'{_cache_dir(path, sep, encoding)}{size}-{mtime}.parquet'
+
+
+def _build_cache(path, sep, encoding, cache_path):
+    """Parse the whole csv and dump it as a parquet file."""
+    n_jobs = n_jobs_default()
+    if n_jobs > 1 and _seekable(path, sep, encoding):
+        from row_index import get_row_index
+        row_index = get_row_index(path, sep=sep, encoding=encoding)
+        df = row_index.read(n_jobs=n_jobs)
+    else:
+        # low_memory=False: types are inferred on whole columns, not by chunk
+        df = pd.read_csv(path, sep=sep, encoding=encoding, low_memory=False)
+
+    # Remove the stale entries of the same source file
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    for filename in os.listdir(cache_dir):
+        os.remove(os.path.join(cache_dir, filename))
+
+    tmp_path = f'{cache_path}.tmp'
+    try:
+        df.to_parquet(tmp_path, index=False)
+    except (ImportError, ValueError, TypeError) as exc:
+        # Eg mixed python types in a column or pyarrow not installed
+        logger.warning(f'Cache: could not cache {path}: {exc}')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return df
+
+    os.replace(tmp_path, cache_path)
+    logger.info(f'Cache: built {cache_path} from {path}.')
+
+    return df
+
+
+def _cached_columns(cache_path):
+    """Read the column names of a cache entry without loading the data."""
+    import pyarrow.parquet as pq
+    return pq.read_schema(cache_path).names
+
+
+def _count(path, key):
+    """Count and log a cache hit or miss."""
+    cache_stats[key] += 1
+    label = 'hit' if key == 'hits' else 'miss'
+    logger.info(f'Cache {label} for {path} '
+                f'(hits: {cache_stats["hits"]}, '
+                f'misses: {cache_stats["misses"]}).')
+
+
+def _read_cache(path, sep, encoding, columns=None):
+    """Read the asked columns of a source file from its cache entry."""
+    cache_path = _cache_path(path, sep, encoding)
+
+    if os.path.exists(cache_path):
+        _count(path, 'hits')
+        if columns is not None:
+            # Keep the order of the columns in the file as read_csv does
+            all_columns = _cached_columns(cache_path)
+            columns = [c for c in all_columns if c in set(columns)]
+        return pd.read_parquet(cache_path, columns=columns)
+
+    _count(path, 'misses')
+    df = _build_cache(path, sep, encoding, cache_path)
+
+    if columns is not None:
+        df = df[[c for c in df.columns if c in set(columns)]]
+
+    return df
+
+
+def _seekable(path, sep, encoding):
+    """Tell whether the rows of a file can be read by seeking to them."""
+    from row_index import get_row_index
+    return get_row_index(path, sep=sep, encoding=encoding).seekable()
+
+
+def _check_columns(usecols, columns):
+    """Raise the same kind of error as read_csv if usecols are missing."""
+    missing = set(usecols) - set(columns)
+    if missing:
+        raise ValueError(f'Usecols do not match columns, '
+                         f'columns expected but not found: {missing}')
+
+
+def read_csv(path, sep=',', encoding=None, usecols=None, skiprows=None,
+             index_col=None, nrows=None, squeeze=False, n_jobs=None,
+             **kwargs):
+    """Read a csv file as pandas.read_csv, using the cache if enabled.
+
+    Parameters
+    ----------
+    path : str
+        Path of the csv file.
+    sep : str
+        Separator of the csv file.
+    encoding : str
+        Encoding of the csv file.
+    usecols : list-like
+        Names of the columns to load. All columns loaded if None.
+    skiprows : list-like of int
+        Line numbers of the rows to skip (the header is line 0). If enough
+        rows are skipped, the kept rows are read by seeking to them using
+        the row index of the file (see row_index.py).
+    index_col : str or list of str
+        Name(s) of the column(s) to use as index.
+    nrows : int
+        Only nrows=0 (load the header only) is served by the cache. Other
+        values are passed to pandas.read_csv.
+    squeeze : bool
+        If the loaded data has only one column, return a Series.
+    n_jobs : int
+        Number of processes parsing the file in chunks. Default given by the
+        CSV_N_JOBS env var. The types are reconciled across the chunks so
+        that the result is the same as with low_memory=False.
+    **kwargs : dict
+        Passed to pandas.read_csv when the cache is not used.
+
+    Returns
+    -------
+    pandas.DataFrame or pandas.Series
+
+    Notes
+    -----
+    When served by the cache, the types are inferred on the whole columns of
+    the file (as with low_memory=False) and not only on the rows kept.
+
+    """
+    if not cache_enabled() or (nrows is not None and nrows != 0):
+        if n_jobs is None:
+            n_jobs = n_jobs_default()
+
+        if nrows is None and (skiprows is not None or n_jobs > 1):
+            from row_index import get_row_index, min_skip_fraction
+            row_index = get_row_index(path, sep=sep, encoding=encoding)
+            n_skipped = 0 if skiprows is None else len(skiprows)
+            skip_fraction = n_skipped/max(row_index.n_rows, 1)
+            if ((n_jobs > 1 or skip_fraction >= min_skip_fraction)
+                    and row_index.seekable()):
+                df = row_index.read(skiprows, n_jobs=n_jobs, usecols=usecols,
+                                    index_col=index_col, **kwargs)
+                if squeeze and df.shape[1] == 1:
+                    return df.iloc[:, 0]
+                return df
+
+        if squeeze:
+            kwargs['squeeze'] = squeeze
+
+        return pd.read_csv(path, sep=sep, encoding=encoding, usecols=usecols,
+                           skiprows=skiprows, index_col=index_col,
+                           nrows=nrows, **kwargs)
+
+    if isinstance(index_col, str):
+        index_col = [index_col]
+
+    columns = None
+    if usecols is not None:
+        columns = set(usecols)
+        if index_col:
+            columns.update(index_col)
+
+    if nrows == 0:
+        cache_path = _cache_path(path, sep, encoding)
+        if not os.path.exists(cache_path):
+            df = _read_cache(path, sep, encoding)  # Build the cache entry
+            all_columns = list(df.columns)
+        else:
+            _count(path, 'hits')
+            all_columns = _cached_columns(cache_path)
+        if columns is not None:
+            _check_columns(columns, all_columns)
+            all_columns = [c for c in all_columns if c in columns]
+        df = pd.DataFrame(columns=all_columns)
+
+    else:
+        df = _read_cache(path, sep, encoding, columns=columns)
+        if columns is not None:
+            _check_columns(columns, df.columns)
+
+        if skiprows is not None:
+            # Lines are 1-based because of the header
+            positions = np.asarray(list(skiprows), dtype=int) - 1
+            keep = np.ones(df.shape[0], dtype=bool)
+            keep[positions[(positions >= 0) & (positions < df.shape[0])]] = False
+            df = df[keep].reset_index(drop=True)
+
+    if index_col:
+        df = df.set_index(index_col if len(index_col) > 1 else index_col[0])
+
+    if squeeze and df.shape[1] == 1:
+        return df.iloc[:, 0]
+
+    return df
@@ -1,5 +1,10 @@
 import prediction
+from prediction import serve
 import test_fit_time
+import test_encode_time
+import test_X_size
+import test_date_encode_time
+import test_encode_memory
 import statistics
 import selection
 import extraction
@@ -8,6 +13,8 @@ import extraction
 def run(argv=None):
     if argv is None or argv[1] == 'prediction':
         prediction.run(argv[1:])
+    elif argv[1] == 'serve_task':
+        serve.run(argv[1:])
     elif argv[1] == 'select':
         selection.run(argv[1:])
     elif argv[1] == 'extract':
@@ -18,6 +25,14 @@ def run(argv=None):
         extraction.run_UKBB_v2(argv[1:])
     elif argv[1] == 'test_fit_time':
         test_fit_time.run(argv[1:])
+    elif argv[1] == 'test_encode_time':
+        test_encode_time.run(argv[1:])
+    elif argv[1] == 'test_X_size':
+        test_X_size.run(argv[1:])
+    elif argv[1] == 'test_date_encode_time':
+        test_date_encode_time.run(argv[1:])
+    elif argv[1] == 'test_encode_memory':
+        test_encode_memory.run(argv[1:])
     elif argv[1] == 'stats':
         statistics.run(argv[1:])
     else:
@@ -0,0 +1,160 @@
+"""Compact storage of the types of missing values of a data frame.
+
+The types of missing values (0: Not a missing value, 1: Not applicable,
+2: Not available) are stored at 2 bits per cell, 4 cells per byte, column by
+column. Counting by feature is done on the packed bytes with lookup tables,
+other operations unpack a few columns at a time.
+"""
+import numpy as np
+import pandas as pd
+
+
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+# _COUNTS[code, byte]: number of cells of the byte holding the code
+_CELLS = (np.arange(256, dtype=np.uint8)[:, None] >> _SHIFTS) & 3
+_COUNTS = np.stack([(_CELLS == code).sum(axis=1) for code in range(4)])
+
+# Number of columns unpacked at once in row-wise operations
+_chunk_size = 256
+
+
+def _pack(codes):
+    """Pack a (n_rows, n_cols) array of codes in [0, 3] column by column."""
+    n_rows, n_cols = codes.shape
+    n_bytes = -(-n_rows // 4)
+    padded = np.zeros((n_cols, 4*n_bytes), dtype=np.uint8)
+    padded[:, :n_rows] = codes.T
+    cells = padded.reshape(n_cols, n_bytes, 4)
+
+    return cells[..., 0] | cells[..., 1] << 2 | cells[..., 2] << 4 | \
+        cells[..., 3] << 6
+
+
+def _unpack(packed, n_rows):
+    """Unpack the codes as a (n_rows, n_cols) uint8 array."""
+    cells = (packed[..., None] >> _SHIFTS) & 3
+    return cells.reshape(packed.shape[0], -1)[:, :n_rows].T
+
+
+class MissingMask(object):
+    """Types of missing values of a data frame stored at 2 bits per cell.
+
+    Compares to a code (mask == code, mask != NOT_MISSING) as a boolean data
+    frame, eg to be given to fill_df, and counts the codes by feature or by
+    row without unpacking the whole mask.
+    """
+
+    def __init__(self, packed, index, columns):
+        """Init.
+
+        Parameters
+        ----------
+        packed : np.ndarray
+            (n_cols, ceil(n_rows/4)) uint8 array of the packed codes.
+        index : pandas.Index
+            Index of the data frame.
+        columns : pandas.Index
+            Columns of the data frame.
+
+        """
+        self.packed = packed
+        self.index = index
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df_mv):
+        """Pack a data frame (or series) of types of missing values."""
+        if isinstance(df_mv, pd.Series):
+            df_mv = df_mv.to_frame()
+
+        codes = df_mv.values
+        if not np.isin(codes, [0, 1, 2]).all():
+            raise ValueError('Types of missing values must be in [0, 1, 2].')
+
+        return cls(_pack(codes.astype(np.uint8)), df_mv.index, df_mv.columns)
+
+    @property
+    def shape(self):
+        """Shape of the data frame."""
+        return len(self.index), len(self.columns)
+
+    @property
+    def values(self):
+        """Codes as a (n_rows, n_cols) int8 array."""
+        return _unpack(self.packed, len(self.index)).astype(np.int8)
+
+    def to_frame(self):
+        """Unpack the mask as an int8 data frame."""
+        return pd.DataFrame(self.values, index=self.index,
+                            columns=self.columns)
+
+    def memory_usage(self):
+        """Number of bytes used by the packed codes."""
+        return self.packed.nbytes
+
+    def eq(self, code):
+        """Boolean data frame telling which cells hold the code."""
+        return pd.DataFrame(_unpack(self.packed, len(self.index)) == code,
+                            index=self.index, columns=self.columns)
+
+    def ne(self, code):
+        """Boolean data frame telling which cells do not hold the code."""
+        return pd.DataFrame(_unpack(self.packed, len(self.index)) != code,
+                            index=self.index, columns=self.columns)
+
+    def __eq__(self, code):
+        return self.eq(code)
+
+    def __ne__(self, code):
+        return self.ne(code)
+
+    __hash__ = None
+
+    def count(self, code, axis=0):
+        """Count the cells holding the code by feature (0) or by row (1)."""
+        n_rows = len(self.index)
+
+        if axis == 0:
+            counts = _COUNTS[code][self.packed].sum(axis=1)
+            if code == 0:  # The padding cells are zeros
+                counts -= self.packed.shape[1]*4 - n_rows
+            return pd.Series(counts, index=self.columns)
+
+        counts = np.zeros(n_rows, dtype=np.int64)
+        for start in range(0, self.packed.shape[0], _chunk_size):
+            chunk = self.packed[start:start+_chunk_size]
+            counts += (_unpack(chunk, n_rows) == code).sum(axis=1)
+
+        return pd.Series(counts, index=self.index)
+
+    def any(self, code, axis=0):
+        """Tell which features (0) or rows (1) have a cell holding the code."""
+        return self.count(code, axis=axis) > 0
+
+    def __getitem__(self, columns):
+        """Select the given columns: a mask or the codes of a column."""
+        if np.isscalar(columns):
+            j = self.columns.get_loc(columns)
+            codes = _unpack(self.packed[j:j+1], len(self.index))[:, 0]
+            return pd.Series(codes.astype(np.int8), index=self.index,
+                             name=columns)
+
+        columns = pd.Index(columns)
+        positions = self.columns.get_indexer(columns)
+        if (positions < 0).any():
+            raise KeyError(f'{list(columns[positions < 0])} not in mask.')
+
+        return MissingMask(self.packed[positions], self.index, columns)
+
+    def drop(self, labels, axis=1):
+        """Drop the given columns."""
+        if axis not in [1, 'columns']:
+            raise ValueError('Only columns can be dropped from a mask.')
+
+        return self[self.columns.drop(labels)]
+
+    def __repr__(self):
+        n_rows, n_cols = self.shape
+        return (f'MissingMask({n_rows} rows x {n_cols} columns, '
+                f'{self.memory_usage()} bytes)')
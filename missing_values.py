@@ -1,5 +1,159 @@
 """Function for detecting missing values."""
+import logging
 import pandas as pd
+import numpy as np
+from pandas.api.types import is_numeric_dtype
+
+
+logger = logging.getLogger(__name__)
+
+# Types of missing values of the columns of the source files, memoized by
+# (db, df_name, fingerprint of the source file, column)
+_mv_cache = dict()
+
+# Count the cells reused or computed by the current process
+mv_cache_stats = {'hits': 0, 'misses': 0}
+
+
+class HeuristicSpec(object):
+    """Declarative heuristic for detecting missing values.
+
+    The rules are applied in this order, a later match overriding an
+    earlier one: Nans, global tokens, per-column tokens, numeric sentinels.
+    The whole data frame is evaluated at once with isin-style matching.
+
+    Parameters
+    ----------
+    na : int or None
+        Type of missing value given to Nans. Nans are not missing if None.
+    tokens : dict
+        Type of missing value as keys and list of values matched in every
+        column as values. Eg {NOT_AVAILABLE: ['NA', 'ND']}.
+    columns : dict
+        Column name as keys and dict of the same form as tokens as values.
+        Values matched in this column only.
+    sentinels : list of tuple
+        Rules (bound, values, type) applied on the numeric columns whose
+        maximum is lower than bound only. Eg (10, [7, 8, 9], NOT_AVAILABLE).
+
+    """
+
+    def __init__(self, na=None, tokens=None, columns=None, sentinels=None):
+        """Init."""
+        self.na = na
+        self.tokens = dict() if tokens is None else tokens
+        self.columns = dict() if columns is None else columns
+        self.sentinels = list() if sentinels is None else sentinels
+
+    def __call__(self, df):
+        """Determine the type of missing values of a df or series.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame or pandas.Series
+            The data to evaluate.
+
+        Returns
+        -------
+        pandas.DataFrame or pandas.Series
+            Same index and columns as the input (same name for a series)
+            with int8 values in [0, 1, 2]: Not a missing value,
+            Not applicable, Not available.
+
+        """
+        is_series = isinstance(df, pd.Series)
+        if is_series:
+            df = df.to_frame()
+
+        mv = np.zeros(df.shape, dtype=np.int8)  # Not a missing value
+
+        if self.na is not None:
+            mv[df.isna().values] = self.na
+
+        # Global tokens, only matched in the columns that may hold them
+        for code, values in self.tokens.items():
+            j = self._candidates(df, values)
+            if j.size:
+                # Fancy indexing gives a copy: assign it back
+                mask = df.iloc[:, j].isin(values).values
+                sub = mv[:, j]
+                sub[mask] = code
+                mv[:, j] = sub
+
+        # Per-column tokens
+        positions = {c: j for j, c in enumerate(df.columns)}
+        for column, column_tokens in self.columns.items():
+            if column not in positions:
+                continue
+            j = positions[column]
+            for code, values in column_tokens.items():
+                mv[df.iloc[:, j].isin(values).values, j] = code
+
+        # Numeric sentinels
+        if self.sentinels:
+            j_num, df_num = self._numeric(df)
+            if j_num.size:
+                maxs = df_num.max().values
+                for bound, values, code in self.sentinels:
+                    j = np.flatnonzero(maxs < bound)
+                    if not j.size:
+                        continue
+                    mask = df_num.iloc[:, j].isin(values).values
+                    sub = mv[:, j_num[j]]
+                    sub[mask] = code
+                    mv[:, j_num[j]] = sub
+
+        if is_series:
+            return pd.Series(mv[:, 0], index=df.index, name=df.columns[0])
+
+        return pd.DataFrame(mv, index=df.index, columns=df.columns)
+
+    @property
+    def cell_wise(self):
+        """Tell whether the type of a cell only depends on its value.
+
+        True when no rule depends on the other rows (sentinels depend on the
+        maximum of the column) nor on the parsed type of the column (only
+        str tokens). The types can then be memoized cell by cell.
+        """
+        values = [v for tokens in [self.tokens, *self.columns.values()]
+                  for vs in tokens.values() for v in vs]
+        return not self.sentinels and all(isinstance(v, str) for v in values)
+
+    @staticmethod
+    def _candidates(df, values):
+        """Positions of the columns which may hold one of the values."""
+        if all(isinstance(v, str) for v in values):
+            # Strings are only held by object or categorical columns
+            return np.flatnonzero([
+                dtype == object or isinstance(dtype, pd.CategoricalDtype)
+                for dtype in df.dtypes])
+
+        return np.arange(df.shape[1])
+
+    @staticmethod
+    def _numeric(df):
+        """Positions and float values of the numeric columns.
+
+        Typed columns are evaluated through their values: categorical ones
+        whose categories are numeric and nullable integers.
+        """
+        j_num, data = [], dict()
+
+        for j, dtype in enumerate(df.dtypes):
+            series = df.iloc[:, j]
+            if isinstance(dtype, pd.CategoricalDtype):
+                if not is_numeric_dtype(dtype.categories):
+                    continue
+                series = series.astype(float)
+            elif not is_numeric_dtype(dtype):
+                continue
+            elif not isinstance(dtype, np.dtype):
+                series = series.astype(float)
+            j_num.append(j)
+            data[j] = series.values
+
+        return np.array(j_num, dtype=int), pd.DataFrame(data, index=df.index)
 
 
 def get_missing_values(df, heuristic):
@@ -10,10 +164,13 @@ def get_missing_values(df, heuristic):
     df : pandas.DataFrame
         The data frame storing the input table from which to determine the type
         of missing values.
-    heuristic : function with pandas.Series -> pandas.Series signature
+    heuristic : HeuristicSpec or function with pandas.Series -> pandas.Series
+                signature
         The heuristic according to which are determined the type of missing
-        values. Given a column of df stored as a pandas.Series, the heuristic
-        returns a pandas.Series storing the type of missing values encountered.
+        values. A HeuristicSpec evaluates the whole data frame at once.
+        Given a column of df stored as a pandas.Series, a function heuristic
+        returns a pandas.Series storing the type of missing values
+        encountered.
 
     Returns
     -------
@@ -23,7 +180,7 @@ def get_missing_values(df, heuristic):
         1: Not applicable, 2: Not available).
 
     """
-    if isinstance(df, pd.Series):
+    if isinstance(df, pd.Series) or isinstance(heuristic, HeuristicSpec):
         return heuristic(df)
 
     # Compute the Series storing the types of missing values
@@ -34,6 +191,101 @@ def get_missing_values(df, heuristic):
     return df_mv
 
 
+def get_missing_values_cached(df, heuristic, source):
+    """Memoized get_missing_values on columns as read from a source file.
+
+    Each cell is evaluated at most once per process, the types being
+    reused by the next calls (eg by other tasks on the same df). Only
+    cell-wise HeuristicSpec are memoized.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or pandas.Series
+        Columns as read from the source file (not transformed), indexed by
+        ids identifying the rows of the file.
+    heuristic : HeuristicSpec or function
+        See get_missing_values.
+    source : tuple
+        (db, df_name, fingerprint) identifying the source file in its state.
+
+    Returns
+    -------
+    pandas.DataFrame or pandas.Series
+        See get_missing_values.
+
+    """
+    if not isinstance(heuristic, HeuristicSpec) or not heuristic.cell_wise \
+            or not df.index.is_unique:
+        return get_missing_values(df, heuristic)
+
+    is_series = isinstance(df, pd.Series)
+    if is_series:
+        df = df.to_frame()
+
+    mv = np.zeros(df.shape, dtype=np.int8)
+    new = []  # Positions of the columns not memoized
+    partial = []  # Positions of the columns with rows not memoized
+    rows = np.zeros(df.shape[0], dtype=bool)  # Rows not memoized of those
+
+    for j, c in enumerate(df.columns):
+        cached = _mv_cache.get((*source, c), None)
+        if cached is None:
+            new.append(j)
+            continue
+
+        positions = cached.index.get_indexer(df.index)
+        found = positions >= 0
+        mv[found, j] = cached.values[positions[found]]
+        if not found.all():
+            partial.append(j)
+            rows |= ~found
+
+    # Cell-wise: only the rows not memoized need to be evaluated
+    n_misses = 0
+    for columns, rows in [(new, np.arange(df.shape[0])),
+                          (partial, np.flatnonzero(rows))]:
+        if not columns:
+            continue
+        df_mv = heuristic(df.iloc[rows, columns])
+        n_misses += df_mv.size
+        for k, j in enumerate(columns):
+            key = (*source, df.columns[j])
+            series = df_mv.iloc[:, k]
+            mv[rows, j] = series.values
+            cached = _mv_cache.get(key, None)
+            if cached is not None:  # Add the new rows only
+                series = pd.concat([cached,
+                                    series[~series.index.isin(cached.index)]])
+            _mv_cache[key] = series
+
+    n_hits = df.size - n_misses
+    mv_cache_stats['hits'] += n_hits
+    mv_cache_stats['misses'] += n_misses
+    n_total = mv_cache_stats['hits'] + mv_cache_stats['misses']
+    logger.info(f'MV cache: {n_hits} cells reused, {n_misses} computed '
+                f'(hit rate {100*mv_cache_stats["hits"]/max(n_total, 1):.0f}%'
+                f' over {n_total} cells).')
+
+    if is_series:
+        return pd.Series(mv[:, 0], index=df.index, name=df.columns[0])
+
+    return pd.DataFrame(mv, index=df.index, columns=df.columns)
+
+
+def filled_missing_values(mv, heuristic):
+    """Derive the types of missing values of a df filled with Nans.
+
+    Give the result of get_missing_values on fill_df(df, mv != 0, np.nan)
+    without evaluating the heuristic again, when it is a cell-wise
+    HeuristicSpec: the filled cells become Nans. None otherwise.
+    """
+    if not isinstance(heuristic, HeuristicSpec) or not heuristic.cell_wise:
+        return None
+
+    na = 0 if heuristic.na is None else heuristic.na
+    return mv.where(mv == 0, na).astype(np.int8)
+
+
 if __name__ == '__main__':
     from database import NHIS
     print(get_missing_values(NHIS['family'], NHIS.heuristic))
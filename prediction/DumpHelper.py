@@ -267,12 +267,14 @@ class DumpHelper:
         pvals.to_csv(self.task_folder+'pvals.csv', header=False)
 
     def dump_times(self, imputation_time, tuning_time, imputation_pt,
-                   tuning_pt, fold=None, tag=None):
+                   tuning_pt, imputation_cached=False, fold=None, tag=None):
         df = pd.DataFrame({
             'imputation_WCT': [imputation_time],
             'tuning_WCT': [tuning_time],
             'imputation_PT': [imputation_pt],
             'tuning_PT': [tuning_pt],
+            # Imputation loaded from the imputation cache (not fitted)
+            'imputation_cached': [imputation_cached],
         })
 
         if tag is None:
@@ -264,6 +264,10 @@ class PlotHelperV4(object):
             Dict of imputation time of each fold.
         tuning_times : dict
             Dict of tuning time of each fold.
+        imputation_cached : dict
+            Dict of whether the imputation of each fold was loaded from the
+            imputation cache. The imputation times of these folds are load
+            times, they are given as Nans.
 
 
         """
@@ -279,8 +283,11 @@ class PlotHelperV4(object):
         tuning_wct = dict()
         imputation_pt = dict()
         tuning_pt = dict()
+        imputation_cached = dict()
 
         for fold, df_gb in df.groupby('fold'):
+            imputation_cached[fold] = 'imputation_cached' in cols and \
+                bool(df_gb['imputation_cached'].iloc[0])
 
             if 'imputation_PT' in cols and 'imputation_WCT' in cols:
                 imputation_wct[fold] = float(df_gb['imputation_WCT'])
@@ -294,11 +301,16 @@ class PlotHelperV4(object):
                 imputation_wct[fold] = float(df_gb['imputation'])
                 tuning_wct[fold] = float(df_gb['tuning'])
 
+            if imputation_cached[fold]:  # Not an imputation time
+                imputation_wct[fold] = np.nan
+                imputation_pt[fold] = np.nan
+
         return {
             'imputation_WCT': imputation_wct,
             'tuning_WCT': tuning_wct,
             'imputation_PT': imputation_pt,
-            'tuning_PT': tuning_pt
+            'tuning_PT': tuning_pt,
+            'imputation_cached': imputation_cached,
         }
 
     def absolute_scores(self, db, t, methods, size, mean=True):
@@ -435,12 +447,13 @@ class PlotHelperV4(object):
                             tun_wct = times['tuning_WCT'][fold]
                             imp_pt = times['imputation_PT'].get(fold, None)
                             tun_pt = times['tuning_PT'].get(fold, None)
+                            imp_cached = times['imputation_cached'][fold]
 
                             rows.append(
-                                (size, db, t, renamed_m, T, fold, s, scorer, selection, n, p, task_type, imp_wct, tun_wct, imp_pt, tun_pt)
+                                (size, db, t, renamed_m, T, fold, s, scorer, selection, n, p, task_type, imp_wct, tun_wct, imp_pt, tun_pt, imp_cached)
                             )
 
-        cols = ['size', 'db', 'task', 'method', 'trial', 'fold', 'score', 'scorer', 'selection', 'n', 'p', 'type', 'imputation_WCT', 'tuning_WCT', 'imputation_PT', 'tuning_PT']
+        cols = ['size', 'db', 'task', 'method', 'trial', 'fold', 'score', 'scorer', 'selection', 'n', 'p', 'type', 'imputation_WCT', 'tuning_WCT', 'imputation_PT', 'tuning_PT', 'imputation_cached']
 
         df = pd.DataFrame(rows, columns=cols).astype({
             'size': int,
@@ -953,6 +966,9 @@ class PlotHelperV4(object):
     def plot_times(filepath, which, xticks_dict=None, db_order=None,
                    method_order=None, rename=dict(), reference_method=None):
         df = pd.read_csv(filepath, index_col=0)
+        if 'imputation_cached' in df.columns:
+            # The times of the folds with a cached imputation are incomplete
+            df = df[~df['imputation_cached'].astype(bool)]
         if which == 'PT':
             df['total_PT'] = df['imputation_PT'].fillna(0) + df['tuning_PT']
             value = 'total_PT'
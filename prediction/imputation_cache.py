@@ -0,0 +1,131 @@
+"""Cache on disk the imputed train and test sets of train4.
+
+Strategies differing only by their estimator (eg Classification_imputed_
+Iterative and Classification_RFC_imputed_Iterative) fit the same imputer on
+the same folds of the same task. The cache stores the imputed train and
+test sets of a fold once, so that the other strategies only fit their
+estimator on them.
+
+A cache entry is keyed by a hash of the content of X, of the class and the
+params of the imputer, of the RS, of the size of the train set and of the
+indexes of the train and test sets. The least recently used entries are
+removed when the cache gets larger than IMPUTATION_CACHE_MAX_MB.
+
+The cache is opt-in: set the environment variable IMPUTATION_CACHE=1 to
+enable it.
+"""
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+from .tasks import cache as task_cache
+from .tasks.cache import _describe, _hash
+
+
+logger = logging.getLogger(__name__)
+
+cache_folder = 'cache/imputation/'
+
+# Change when the imputation in train4 changes to invalidate the entries
+version = 1
+
+# Count the cache hits and misses of the current process
+cache_stats = {'hits': 0, 'misses': 0}
+
+
+def cache_enabled():
+    """Tell whether the imputation cache is enabled (IMPUTATION_CACHE)."""
+    return os.environ.get('IMPUTATION_CACHE', '0').lower() in ['1', 'true',
+                                                                'yes']
+
+
+def max_size():
+    """Give the size bound of the cache in bytes (IMPUTATION_CACHE_MAX_MB)."""
+    return int(float(os.environ.get('IMPUTATION_CACHE_MAX_MB', '5000'))*1e6)
+
+
+def data_fingerprint(X):
+    """Give a hash of the content of X, its columns included."""
+    return _hash(f'{_describe(X)}|{list(X.columns)}'.encode('utf-8'))
+
+
+def imputation_key(fingerprint, imputer, RS, n, train_idx, test_idx):
+    """Give the key of the imputation of a fold.
+
+    Parameters
+    ----------
+    fingerprint : str
+        The data_fingerprint of X.
+    imputer : sklearn transformer
+        The imputer, not fitted.
+    RS : int
+        The random state of the splits.
+    n : int
+        The size of the train set.
+    train_idx, test_idx : np.ndarray
+        Positions of the train and test sets in X.
+
+    Returns
+    -------
+    str
+
+    """
+    description = '|'.join([
+        f'version={version}',
+        fingerprint,
+        type(imputer).__name__,
+        _describe(imputer.get_params()),
+        f'RS={RS}',
+        f'n={n}',
+        _describe(np.asarray(train_idx)),
+        _describe(np.asarray(test_idx)),
+    ])
+
+    return _hash(description.encode('utf-8'))
+
+
+def _entry_path(key):
+    return f'{cache_folder}{key}.pkl'
+
+
+def load(key):
+    """Load the imputed train and test sets of a key, None if not cached.
+
+    The modification time of a loaded entry is updated: it orders the
+    entries from the most to the least recently used.
+    """
+    path = _entry_path(key)
+
+    try:
+        data = pd.read_pickle(path)
+    except FileNotFoundError:
+        cache_stats['misses'] += 1
+        logger.info(f'Imputation cache miss for {key} '
+                    f'(hits: {cache_stats["hits"]}, '
+                    f'misses: {cache_stats["misses"]}).')
+        return None
+
+    try:
+        os.utime(path)
+    except FileNotFoundError:  # Evicted meanwhile by another process
+        pass
+
+    cache_stats['hits'] += 1
+    logger.info(f'Imputation cache hit for {key} '
+                f'(hits: {cache_stats["hits"]}, '
+                f'misses: {cache_stats["misses"]}).')
+
+    return data
+
+
+def dump(key, data):
+    """Dump the imputed train and test sets of a key, evict the oldest."""
+    os.makedirs(cache_folder, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    pd.to_pickle(data, tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f'Imputation cache: dumped {path}.')
+
+    task_cache.evict(max_size(), keep=[path], folder=cache_folder)
@@ -29,6 +29,10 @@ parser.add_argument('--T', dest='T', default=0, nargs='?',
                     help='The trial #.')
 parser.add_argument('--n_top_pvals', dest='n_top_pvals', default=100, nargs='?',
                     help='The trial #.')
+parser.add_argument('--categorical', dest='categorical', default='one_hot',
+                    choices=['one_hot', 'sparse', 'native'],
+                    help='How to encode the categorical features: dense or '
+                    'sparse one hot, or native categorical codes.')
 
 
 def run(argv=None):
@@ -50,11 +54,21 @@ def run(argv=None):
     if isinstance(strategy_name, int):
         strategy_name = list(strategies.keys())[strategy_name]
 
-    task = tasks.get(task_name, RS=RS, T=T, n_top_pvals=n_top_pvals)
     strategy = strategies[strategy_name]
 
+    categorical = args.categorical
+    if categorical == 'native' and strategy.imputer is not None:
+        # Imputers need numeric input: sparse one hot fallback
+        logger.info('Imputer in strategy, sparse one hot encoding used '
+                    'instead of native categorical.')
+        categorical = 'sparse'
+
+    task = tasks.get(task_name, RS=RS, T=T, n_top_pvals=n_top_pvals,
+                     categorical_encoding=categorical)
+
     logger.info(f'Run task {task_name} using {strategy_name}')
     logger.info(f'Asked RS {RS} T {T} n_top_pvals {n_top_pvals}')
+    logger.info(f'Categorical encoding: {categorical}')
 
     if RS:
         RS = int(RS)
@@ -0,0 +1,49 @@
+"""Publish the X and y of tasks for the processes running the strategies."""
+import logging
+import argparse
+import numpy as np
+
+from .tasks import tasks, shared
+from .tasks.cache import task_key
+
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())  # Print also in console.
+
+# Parser config
+parser = argparse.ArgumentParser(description='Publish the X of tasks.')
+parser.add_argument('program')
+parser.add_argument('task_names', nargs='+')
+parser.add_argument('--RS', dest='RS', default=None, nargs='?',
+                    help='The random state to use.')
+parser.add_argument('--T', dest='T', default=0, nargs='?',
+                    help='The trial #.')
+parser.add_argument('--n_top_pvals', dest='n_top_pvals', default=100,
+                    nargs='?', help='The number of features kept.')
+parser.add_argument('--categorical', dest='categorical', default='one_hot',
+                    choices=['one_hot', 'native'],
+                    help='How to encode the categorical features.')
+parser.add_argument('--dtype', dest='dtype', default='float32',
+                    choices=['float32', 'float64'],
+                    help='The dtype of the published X.')
+parser.add_argument('--remove', dest='remove', action='store_true',
+                    help='Remove the published X instead.')
+
+
+def run(argv=None):
+    """Publish (or remove) the X and y of the given tasks."""
+    args = parser.parse_args(argv)
+
+    for task_name in args.task_names:
+        task = tasks.get(task_name, RS=args.RS, T=args.T,
+                         n_top_pvals=args.n_top_pvals,
+                         categorical_encoding=args.categorical)
+
+        if args.remove:
+            shared.unpublish(task_key(task))
+            continue
+
+        key = shared.publish(task, dtype=np.dtype(args.dtype))
+        logger.info(f'{task_name}: published with key {key}. Run the '
+                    f'strategies with TASK_SHARED=1 and the same RS, T, '
+                    f'n_top_pvals and categorical encoding to attach.')
@@ -45,6 +45,8 @@ param_space = params.get('param_space', None)
 train_set_steps = params.get('train_set_steps', [])
 min_test_set = params.get('min_test_set', 0.2)
 n_splits = params.get('n_splits', 5)
+n_outer_jobs = params.get('n_outer_jobs', 1)
+n_cpus = params.get('n_cpus', -1)
 
 # Default RS
 RS = 42
@@ -64,6 +66,8 @@ logger.info(f'param_space: {param_space}')
 logger.info(f'RS: {RS}')
 logger.info(f'train_set_steps: {train_set_steps}')
 logger.info(f'min_test_set: {min_test_set}')
+logger.info(f'n_outer_jobs: {n_outer_jobs}')
+logger.info(f'n_cpus: {n_cpus}')
 
 if param_space is None:
     param_space = {
@@ -111,6 +115,8 @@ strategies.append(Strategy(
     train_set_steps=train_set_steps,
     min_test_set=min_test_set,
     n_splits=n_splits,
+    n_outer_jobs=n_outer_jobs,
+    n_cpus=n_cpus,
 ))
 
 
@@ -156,6 +162,8 @@ strategies.append(Strategy(
     train_set_steps=train_set_steps,
     min_test_set=min_test_set,
     n_splits=n_splits,
+    n_outer_jobs=n_outer_jobs,
+    n_cpus=n_cpus,
 ))
 
 # A strategy to run a regression
@@ -200,6 +208,8 @@ strategies.append(Strategy(
     train_set_steps=train_set_steps,
     min_test_set=min_test_set,
     n_splits=n_splits,
+    n_outer_jobs=n_outer_jobs,
+    n_cpus=n_cpus,
 ))
 
 
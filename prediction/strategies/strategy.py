@@ -19,7 +19,8 @@ class Strategy():
                  imputer=None, search_params=dict(), compute_importance=False,
                  importance_params=dict(), learning_curve=False,
                  learning_curve_params=dict(), roc=False, name=None,
-                 train_set_steps=None, min_test_set=None, n_splits=None):
+                 train_set_steps=None, min_test_set=None, n_splits=None,
+                 n_outer_jobs=1, n_cpus=-1):
         self.estimator = estimator
         self.inner_cv = inner_cv
         self.outer_cv = outer_cv
@@ -34,6 +35,8 @@ class Strategy():
         self.train_set_steps = train_set_steps
         self.min_test_set = min_test_set
         self.n_splits = n_splits
+        self.n_outer_jobs = n_outer_jobs
+        self.n_cpus = n_cpus
 
         if not all(p in estimator.get_params().keys() for p in param_space.keys()):
             raise ValueError('Given parmameters must be params of estimator.')
@@ -109,6 +112,26 @@ class Strategy():
             'sklearn_version': sklearn.__version__
         }
 
+    def set_categorical_features(self, categorical_features):
+        """Give the positions of the categorical features to the estimator.
+
+        Only for estimators supporting categorical features natively (eg
+        HistGradientBoosting), the features being used as ordinal otherwise.
+        """
+        if 'categorical_features' not in self.estimator.get_params():
+            logger.warning(f'{self.estimator_class()}: no native support of '
+                           f'categorical features, used as ordinal.')
+            return
+
+        if self.imputer is not None:
+            logger.warning('Categorical codes given to the imputer, use the '
+                           'sparse categorical encoding instead.')
+
+        categorical_features = list(categorical_features) or None
+        self.estimator.set_params(categorical_features=categorical_features)
+        self.search.estimator.set_params(
+            model__categorical_features=categorical_features)
+
     def reset_RS(self, RS):
         if RS is None:
             return  # Nothing to do
@@ -1,22 +1,28 @@
 """Prediction tasks for MIMIC."""
 import os
 import pandas as pd
-from dask import dataframe as dd
 
+import database
+import code_index
+import pvals_store
 from .task import TaskMeta
 from .transform import Transform
-from database import dbs
 
 
-# Define overall tables
-MIMIC = dbs['MIMIC']
-patients = dd.read_csv(MIMIC.frame_paths['patients']).set_index('ROW_ID')
-diagnoses_icd = dd.read_csv(MIMIC.frame_paths['diagnoses_icd'], assume_missing=True).set_index('ROW_ID')
-patients_diagnosis = patients.merge(diagnoses_icd.drop(['SEQ_NUM'], axis=1), how='left', on='SUBJECT_ID')
+def diagnosed(*codes):
+    """Give the SUBJECT_ID of the patients with any of the ICD9 codes.
 
-# Tasks specific tables
-septic_shock = dd.from_pandas(pd.DataFrame({'ICD9_CODE': ['78552']}), npartitions=1)
-hemo_shock = dd.from_pandas(pd.DataFrame({'ICD9_CODE': ['78559', '99809', '9584']}), npartitions=1)
+    Looked up in the inverted index of the codes of DIAGNOSES_ICD, built
+    once and persisted (see code_index.py).
+    """
+    MIMIC = database.dbs['MIMIC']
+    index = code_index.get_code_index(MIMIC.frame_paths['diagnoses_icd'],
+                                      ['ICD9_CODE'], index_col='SUBJECT_ID')
+    return index.ids_with_any(codes)
+
+
+septic_shock = ('78552',)
+hemo_shock = ('78559', '99809', '9584')
 
 
 # Task 1: Septic shock prediciton
@@ -27,9 +33,7 @@ def septic_task(**kwargs):
     def define_predict_septic(df):
         """Compute y from patients table."""
         # Ignore given df
-        positives = patients_diagnosis.merge(septic_shock, how='inner', on='ICD9_CODE')
-        positives = positives.drop_duplicates(subset=['SUBJECT_ID']).set_index('SUBJECT_ID').index
-        positives_idx = positives.compute()
+        positives_idx = diagnosed(*septic_shock)
 
         # Get full idx from df and set the complementary to 0
         # idx = patients.set_index('SUBJECT_ID').index.compute()
@@ -71,22 +75,18 @@ def septic_task(**kwargs):
         assert os.path.exists(septic_idx_path)
         assert os.path.exists(septic_pvals_path)
 
-        pvals = pd.read_csv(septic_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
-        pvals = pvals.sort_values()[:n_top_pvals]
-        septic_top_pvals = list(pvals.index.astype(str))
+        septic_top_pvals = pvals_store.top_pvals(
+            septic_pvals_path, n_top_pvals)
 
         septic_pvals_keep_transform = Transform(
             output_features=septic_top_pvals
         )
 
-        septic_drop_idx = pd.read_csv(septic_idx_path, index_col=0,
-                                      squeeze=True)
+        septic_drop_idx = pvals_store.used_idx(septic_idx_path)
 
         septic_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(septic_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(septic_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -112,9 +112,7 @@ def hemo_task(**kwargs):
     def define_predict_hemo(df):
         """Compute y from patients table."""
         # Ignore given df
-        positives = patients_diagnosis.merge(hemo_shock, how='inner', on='ICD9_CODE')
-        positives = positives.drop_duplicates(subset=['SUBJECT_ID']).set_index('SUBJECT_ID').index
-        positives_idx = positives.compute()
+        positives_idx = diagnosed(*hemo_shock)
 
         # Get full idx from df and set the complementary to 0
         # idx = patients.set_index('SUBJECT_ID').index.compute()
@@ -156,21 +154,17 @@ def hemo_task(**kwargs):
         assert os.path.exists(hemo_idx_path)
         assert os.path.exists(hemo_pvals_path)
 
-        pvals = pd.read_csv(hemo_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
-        pvals = pvals.sort_values()[:n_top_pvals]
-        hemo_top_pvals = list(pvals.index.astype(str))
+        hemo_top_pvals = pvals_store.top_pvals(hemo_pvals_path, n_top_pvals)
 
         hemo_pvals_keep_transform = Transform(
             output_features=hemo_top_pvals
         )
 
-        hemo_drop_idx = pd.read_csv(hemo_idx_path, index_col=0, squeeze=True)
+        hemo_drop_idx = pvals_store.used_idx(hemo_idx_path)
 
         hemo_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(hemo_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(hemo_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -1,7 +1,7 @@
 """Prediction tasks for NHIS."""
 import os
-import pandas as pd
 
+import pvals_store
 from .task import TaskMeta
 from .transform import Transform
 
@@ -42,26 +42,18 @@ def income_task(**kwargs):
         assert os.path.exists(income_idx_path)
         assert os.path.exists(income_pvals_path)
 
-        pvals = pd.read_csv(income_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
-        # Match exact feature or start with and followed by '_' (categorical)
-        for f in income_drop_features:  # Drop asked features from pvals
-            regex = f'(^{f}$|^{f}_)'
-            pvals = pvals[~pvals.index.str.match(regex)]
-        pvals = pvals.sort_values()[:n_top_pvals]
-        income_top_pvals = list(pvals.index.astype(str))
+        income_top_pvals = pvals_store.top_pvals(
+            income_pvals_path, n_top_pvals, drop_features=income_drop_features)
 
         income_pvals_keep_transform = Transform(
             output_features=income_top_pvals
         )
 
-        income_drop_idx = pd.read_csv(income_idx_path, index_col=0,
-                                      squeeze=True)
+        income_drop_idx = pvals_store.used_idx(income_idx_path)
 
         income_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(income_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(income_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -116,26 +108,19 @@ def bmi_task(**kwargs):
         assert os.path.exists(bmi_idx_path)
         assert os.path.exists(bmi_pvals_path)
 
-        pvals = pd.read_csv(bmi_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
-        # Match exact feature or start with and followed by '_' (categorical)
-        for f in bmi_drop_features:  # Drop asked features from pvals
-            regex = f'(^{f}$|^{f}_)'
-            pvals = pvals[~pvals.index.str.match(regex)]
-        pvals = pvals.sort_values()[:n_top_pvals]
-        bmi_top_pvals = list(pvals.index.astype(str))
+        bmi_top_pvals = pvals_store.top_pvals(
+            bmi_pvals_path, n_top_pvals, drop_features=bmi_drop_features)
         print(bmi_top_pvals)
 
         bmi_pvals_keep_transform = Transform(
             output_features=bmi_top_pvals
         )
 
-        bmi_drop_idx = pd.read_csv(bmi_idx_path, index_col=0, squeeze=True)
+        bmi_drop_idx = pvals_store.used_idx(bmi_idx_path)
 
         bmi_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(bmi_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(bmi_drop_idx, axis=0),
         )
 
     return TaskMeta(
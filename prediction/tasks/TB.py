@@ -1,8 +1,7 @@
 """Prediction tasks for UKBB."""
 import os
-import pandas as pd
-import numpy as np
 
+import pvals_store
 from .task import TaskMeta
 from .transform import Transform
 
@@ -37,21 +36,17 @@ def death_task(**kwargs):
         assert os.path.exists(death_idx_path)
         assert os.path.exists(death_pvals_path)
 
-        pvals = pd.read_csv(death_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
-        pvals = pvals.sort_values()[:n_top_pvals]
-        death_top_pvals = list(pvals.index.astype(str))
+        death_top_pvals = pvals_store.top_pvals(death_pvals_path, n_top_pvals)
 
         death_pvals_keep_transform = Transform(
             output_features=death_top_pvals
         )
 
-        death_drop_idx = pd.read_csv(death_idx_path, index_col=0, squeeze=True)
+        death_drop_idx = pvals_store.used_idx(death_idx_path)
 
         death_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(death_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(death_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -80,72 +75,25 @@ platelet_predict_transform = Transform(
 
 def platelet_task(**kwargs):
     """Return TaskMeta for platelet prediction."""
-    def define_new_features_platelet(df):
-        """Callable used to define new features from a bunch of features."""
-        # github.com/wjiang94/ABSLOPE/blob/master/ABSLOPE/OnlineSupp/OnlineSupp.pdf
-
-        df = df.astype(float)
-
-        df['Age'] = df['Age du patient (ans)']
-        df['SI'] = df['FC en phase hospitalière'].divide(df['Pression Artérielle Systolique - PAS'])
-        df['MBP'] = (2*df['Pression Artérielle Diastolique - PAD']+df['Pression Artérielle Systolique - PAS'])/3
-        df['Delta.hemo'] = df['Delta Hémocue']
-        df['Time.amb'] = df['Délai « arrivée sur les lieux - arrivée hôpital »']
-        df['Lactate'] = df['Lactates']
-        df['Temp'] = df['Température']
-        df['HR'] = df['FC en phase hospitalière']
-        df['VE'] = df['Cristalloïdes']+df['Colloïdes']
-        df['RBC'] = df['Choc hémorragique (? 4 CGR sur 6h)']
-        df['SI.amb'] = df['Fréquence cardiaque (FC) à l arrivée du SMUR'].divide(df['Pression Artérielle Systolique (PAS) à l arrivée du SMUR'])
-        df['MAP.amb'] = (2*df['Pression Artérielle Diastolique (PAD) à l arrivée du SMUR']+df['Pression Artérielle Systolique (PAS) à l arrivée du SMUR'])/3
-        df['HR.max'] = df['Fréquence cardiaque (FC) maximum']
-        df['SBP.min'] = df['Pression Artérielle Systolique (PAS) minimum']
-        df['DBP.min'] = df['Pression Artérielle Diastolique (PAD) minimum']
-
-        # Replace potential infinite values by Nans (divide may have created infs)
-        df.replace([np.inf, -np.inf], np.nan, inplace=True)
-
-        return df
-
+    # github.com/wjiang94/ABSLOPE/blob/master/ABSLOPE/OnlineSupp/OnlineSupp.pdf
     platelet_new_features_tranform = Transform(
-        input_features=[
-            'Age du patient (ans)',
-            'FC en phase hospitalière',
-            'Pression Artérielle Systolique - PAS',
-            'Pression Artérielle Diastolique - PAD',
-            'Delta Hémocue',
-            'Délai « arrivée sur les lieux - arrivée hôpital »',
-            'Lactates',
-            'Température',
-            # 'FC en phase hospitalière',
-            'Cristalloïdes',
-            'Colloïdes',
-            'Choc hémorragique (? 4 CGR sur 6h)',
-            'Fréquence cardiaque (FC) à l arrivée du SMUR',
-            'Pression Artérielle Systolique (PAS) à l arrivée du SMUR',
-            'Pression Artérielle Diastolique (PAD) à l arrivée du SMUR',
-            'Fréquence cardiaque (FC) maximum',
-            'Pression Artérielle Systolique (PAS) minimum',
-            'Pression Artérielle Diastolique (PAD) minimum',
-        ],
-        transform=define_new_features_platelet,
-        output_features=[
-            'Age',
-            'SI',
-            'MBP',
-            'Delta.hemo',
-            'Time.amb',
-            'Lactate',
-            'Temp',
-            'HR',
-            'VE',
-            'RBC',
-            'SI.amb',
-            'MAP.amb',
-            'HR.max',
-            'SBP.min',
-            'DBP.min',
-        ],
+        expressions={
+            'Age': '`Age du patient (ans)`',
+            'SI': '`FC en phase hospitalière` / `Pression Artérielle Systolique - PAS`',
+            'MBP': '(2*`Pression Artérielle Diastolique - PAD` + `Pression Artérielle Systolique - PAS`)/3',
+            'Delta.hemo': '`Delta Hémocue`',
+            'Time.amb': '`Délai « arrivée sur les lieux - arrivée hôpital »`',
+            'Lactate': '`Lactates`',
+            'Temp': '`Température`',
+            'HR': '`FC en phase hospitalière`',
+            'VE': '`Cristalloïdes` + `Colloïdes`',
+            'RBC': '`Choc hémorragique (? 4 CGR sur 6h)`',
+            'SI.amb': '`Fréquence cardiaque (FC) à l arrivée du SMUR` / `Pression Artérielle Systolique (PAS) à l arrivée du SMUR`',
+            'MAP.amb': '(2*`Pression Artérielle Diastolique (PAD) à l arrivée du SMUR` + `Pression Artérielle Systolique (PAS) à l arrivée du SMUR`)/3',
+            'HR.max': '`Fréquence cardiaque (FC) maximum`',
+            'SBP.min': '`Pression Artérielle Systolique (PAS) minimum`',
+            'DBP.min': '`Pression Artérielle Diastolique (PAD) minimum`',
+        },
     )
 
     return TaskMeta(
@@ -193,25 +141,19 @@ def platelet_pvals_task(**kwargs):
         assert os.path.exists(platelet_idx_path)
         assert os.path.exists(platelet_pvals_path)
 
-        pvals = pd.read_csv(platelet_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
-        # Match exact feature or start with and followed by '_' (categorical)
-        for f in platelet_drop_features:  # Drop asked features from pvals
-            regex = f'(^{f}$|^{f}_)'
-            pvals = pvals[~pvals.index.str.match(regex)]
-        pvals = pvals.sort_values()[:n_top_pvals]
-        platelet_top_pvals = list(pvals.index.astype(str))
+        platelet_top_pvals = pvals_store.top_pvals(
+            platelet_pvals_path, n_top_pvals,
+            drop_features=platelet_drop_features)
 
         platelet_pvals_keep_transform = Transform(
             output_features=platelet_top_pvals
         )
 
-        platelet_drop_idx = pd.read_csv(platelet_idx_path, index_col=0, squeeze=True)
+        platelet_drop_idx = pvals_store.used_idx(platelet_idx_path)
 
         platelet_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(platelet_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(platelet_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -241,60 +183,22 @@ hemo_predict_transform = Transform(
 def hemo_task(**kwargs):
     """Return TaskMeta for hemo shock prediction."""
 
-    def define_new_features_hemo(df):
-        """Callable used to define new features from a bunch of features."""
-        df = df.astype(float)
-
-        df['Age'] = df['Age du patient (ans)']
-        df['BMI'] = df['BMI']
-        df['FC.SMUR'] = df['Fréquence cardiaque (FC) à l arrivée du SMUR']
-        df['SD.SMUR'] = df['Pression Artérielle Systolique (PAS) à l arrivée du SMUR'] - df['Pression Artérielle Diastolique (PAD) à l arrivée du SMUR']
-        df['SD.min'] = df['Pression Artérielle Systolique (PAS) minimum'] - df['Pression Artérielle Diastolique (PAD) minimum']
-        df['FC.max'] = df['Fréquence cardiaque (FC) maximum']
-        df['Glasgow.moteur.init'] = df['Glasgow moteur initial']
-        df['Glasgow.init'] = df['Glasgow initial']
-        df['Hemocue.init'] = df['Hémocue initial']
-        df['SpO2.min'] = df['SpO2 min']
-        df['RT.colloides'] = df['Colloïdes']
-        df['RT.cristalloides'] = df['Cristalloïdes']
-
-        # Replace potential infinite values by Nans (divide may have created infs)
-        df.replace([np.inf, -np.inf], np.nan, inplace=True)
-
-        return df
-
     hemo_new_features_tranform = Transform(
-        input_features=[
-            'Age du patient (ans)',
-            'BMI',
-            'Fréquence cardiaque (FC) à l arrivée du SMUR',
-            'Pression Artérielle Systolique (PAS) à l arrivée du SMUR',
-            'Pression Artérielle Diastolique (PAD) à l arrivée du SMUR',
-            'Pression Artérielle Systolique (PAS) minimum',
-            'Pression Artérielle Diastolique (PAD) minimum',
-            'Fréquence cardiaque (FC) maximum',
-            'Glasgow moteur initial',
-            'Glasgow initial',
-            'Hémocue initial',
-            'SpO2 min',
-            'Colloïdes',
-            'Cristalloïdes',
-        ],
-        transform=define_new_features_hemo,
-        output_features=[
-            'Age',
-            'BMI',
-            'FC.SMUR',
-            'SD.SMUR',
-            'SD.min',
-            'FC.max',
-            'Glasgow.moteur.init',
-            'Glasgow.init',
-            'Hemocue.init',
-            'SpO2.min',
-            'RT.colloides',
-            'RT.cristalloides'
-        ],
+        expressions={
+            # Defined first to keep its place among the input features
+            'BMI': '`BMI`',
+            'Age': '`Age du patient (ans)`',
+            'FC.SMUR': '`Fréquence cardiaque (FC) à l arrivée du SMUR`',
+            'SD.SMUR': '`Pression Artérielle Systolique (PAS) à l arrivée du SMUR` - `Pression Artérielle Diastolique (PAD) à l arrivée du SMUR`',
+            'SD.min': '`Pression Artérielle Systolique (PAS) minimum` - `Pression Artérielle Diastolique (PAD) minimum`',
+            'FC.max': '`Fréquence cardiaque (FC) maximum`',
+            'Glasgow.moteur.init': '`Glasgow moteur initial`',
+            'Glasgow.init': '`Glasgow initial`',
+            'Hemocue.init': '`Hémocue initial`',
+            'SpO2.min': '`SpO2 min`',
+            'RT.colloides': '`Colloïdes`',
+            'RT.cristalloides': '`Cristalloïdes`',
+        },
     )
 
     return TaskMeta(
@@ -337,21 +241,17 @@ def hemo_pvals_task(**kwargs):
         assert os.path.exists(hemo_idx_path)
         assert os.path.exists(hemo_pvals_path)
 
-        pvals = pd.read_csv(hemo_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
-        pvals = pvals.sort_values()[:n_top_pvals]
-        hemo_top_pvals = list(pvals.index.astype(str))
+        hemo_top_pvals = pvals_store.top_pvals(hemo_pvals_path, n_top_pvals)
 
         hemo_pvals_keep_transform = Transform(
             output_features=hemo_top_pvals
         )
 
-        hemo_drop_idx = pd.read_csv(hemo_idx_path, index_col=0, squeeze=True)
+        hemo_drop_idx = pvals_store.used_idx(hemo_idx_path)
 
         hemo_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(hemo_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(hemo_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -378,102 +278,54 @@ def acid_task(**kwargs):
         output_features=['Acide tranexamique'],
     )
 
-    def define_new_features_acid(df):
-        """Callable used to define new features from a bunch of features."""
-        df = df.astype(float)
-
-        # Temp features (will be dropped)
-        df['SBP.min'] = df['Pression Artérielle Systolique (PAS) minimum']
-        df['SBP.MICU'] = df['Pression Artérielle Systolique (PAS) à l arrivée du SMUR']
-        df['DBP.min'] = df['Pression Artérielle Diastolique (PAD) minimum']
-        df['DBP.MICU'] = df['Pression Artérielle Diastolique (PAD) à l arrivée du SMUR']
-        df['HR.max'] = df['Fréquence cardiaque (FC) maximum']
-        df['HR.MICU'] = df['Fréquence cardiaque (FC) à l arrivée du SMUR']
-        df['Shock.index.h'] = df['FC en phase hospitalière'].divide(df['Pression Artérielle Systolique - PAS'])
-
-        # Persistent features
-        df['SBP.ph'] = np.minimum(df['SBP.min'], df['SBP.MICU'])
-        df['DBP.ph'] = np.minimum(df['DBP.min'], df['DBP.MICU'])
-        df['HR.ph'] = np.maximum(df['HR.max'], df['HR.MICU'])
-        df['Cardiac.arrest.ph'] = df['Arrêt cardio-respiratoire (massage)']
-        df['HemoCue.init'] = df['Hémocue initial']
-        df['SpO2.min'] = df['SpO2 min']
-        df['Vasopressor.therapy'] = df['Catécholamines max dans choc hémorragique']
-        df['Cristalloid.volume'] = df['Cristalloïdes']
-        df['Colloid.volume'] = df['Colloïdes']
-        df['Shock.index.ph'] = df['Fréquence cardiaque (FC) à l arrivée du SMUR'].divide(df['Pression Artérielle Systolique (PAS) à l arrivée du SMUR'])
-        df['AIS.external'] = df['ISS  / External']
-        df['Delta.shock.index'] = df['Shock.index.h'] - df['Shock.index.ph']
-        df['Delta.hemoCue'] = df['Delta Hémocue']
-
-        df['Anticoagulant.therapy'] = df['Traitement anticoagulant']
-        df['Antiplatelet.therapy'] = df['Traitement antiagrégants']
-        df['GCS.init'] = df['Glasgow initial']
-        df['GCS'] = df['Score de Glasgow en phase hospitalière']
-        df['GCS.motor.init'] = df['Glasgow moteur initial']
-        df['GCS.motor'] = df['Glasgow moteur']
-        df['Improv.anomaly.osmo'] = df['Régression mydriase sous osmothérapie']
-        df['Medcare.time.ph'] = df['Délai « arrivée sur les lieux - arrivée hôpital »']
-        df['FiO2'] = df['FiO2']
-        df['Temperature.min'] = df['Température min']
-        df['TCD.PI.max'] = df['DTC IP max (sur les premières 24 heures d HTIC)']
-        df['IICP'] = df['HTIC (>25 PIC simple sédation)']
-        df['EVD'] = df['Dérivation ventriculaire externe (DVE)']
-        df['Decompressive.craniectomy'] = df['Craniectomie dé-compressive']
-        df['Neurosurgery.day0'] = df['Bloc dans les premières 24h  / Neurochirurgie (ex. : Craniotomie ou DVE)']
-        df['AIS.head'] = df['ISS  / Head neck']
-        df['AIS.face'] = df['ISS  / Face']
-        df['ISS'] = df['Score ISS']
-        df['ISS.II'] = df['Total Score IGS']
-
-        # Replace potential infinite values by Nans (divide may have created infs)
-        df.replace([np.inf, -np.inf], np.nan, inplace=True)
-
-        return df
-
     acid_new_features_tranform = Transform(
-        input_features=[
-            'Pression Artérielle Systolique (PAS) minimum',
-            'Pression Artérielle Systolique (PAS) à l arrivée du SMUR',
-            'Pression Artérielle Diastolique (PAD) minimum',
-            'Pression Artérielle Diastolique (PAD) à l arrivée du SMUR',
-            'Fréquence cardiaque (FC) maximum',
-            'Fréquence cardiaque (FC) à l arrivée du SMUR',
-            'FC en phase hospitalière',
-            'Pression Artérielle Systolique - PAS',
-            # 'Numéro de centre',
-            'Arrêt cardio-respiratoire (massage)',
-            'Hémocue initial',
-            'SpO2 min',
-            'Catécholamines max dans choc hémorragique',
-            'Cristalloïdes',
-            'Colloïdes',
-            'ISS  / External',
-            'Delta Hémocue',
-            'Traitement anticoagulant',
-            'Traitement antiagrégants',
-            'Glasgow initial',
-            'Score de Glasgow en phase hospitalière',
-            'Glasgow moteur initial',
-            'Glasgow moteur',
-            # 'Anomalie pupillaire (Pré-hospitalier)',
-            # 'Anomalie pupillaire (Phase hospitalière)',
-            # 'Osmothérapie',
-            'Régression mydriase sous osmothérapie',
-            'Délai « arrivée sur les lieux - arrivée hôpital »',
-            'FiO2',
-            'Température min',
-            'DTC IP max (sur les premières 24 heures d HTIC)',
-            'HTIC (>25 PIC simple sédation)',
-            'Dérivation ventriculaire externe (DVE)',
-            'Craniectomie dé-compressive',
-            'Bloc dans les premières 24h  / Neurochirurgie (ex. : Craniotomie ou DVE)',
-            'ISS  / Head neck',
-            'ISS  / Face',
-            'Score ISS',
-            'Total Score IGS',
-        ],
-        transform=define_new_features_acid,
+        expressions={
+            # Defined first to keep its place among the input features
+            'FiO2': '`FiO2`',
+
+            # Temp features (not in the output features)
+            'SBP.min': '`Pression Artérielle Systolique (PAS) minimum`',
+            'SBP.MICU': '`Pression Artérielle Systolique (PAS) à l arrivée du SMUR`',
+            'DBP.min': '`Pression Artérielle Diastolique (PAD) minimum`',
+            'DBP.MICU': '`Pression Artérielle Diastolique (PAD) à l arrivée du SMUR`',
+            'HR.max': '`Fréquence cardiaque (FC) maximum`',
+            'HR.MICU': '`Fréquence cardiaque (FC) à l arrivée du SMUR`',
+            'Shock.index.h': '`FC en phase hospitalière` / `Pression Artérielle Systolique - PAS`',
+
+            # Persistent features
+            'SBP.ph': 'minimum(`SBP.min`, `SBP.MICU`)',
+            'DBP.ph': 'minimum(`DBP.min`, `DBP.MICU`)',
+            'HR.ph': 'maximum(`HR.max`, `HR.MICU`)',
+            'Cardiac.arrest.ph': '`Arrêt cardio-respiratoire (massage)`',
+            'HemoCue.init': '`Hémocue initial`',
+            'SpO2.min': '`SpO2 min`',
+            'Vasopressor.therapy': '`Catécholamines max dans choc hémorragique`',
+            'Cristalloid.volume': '`Cristalloïdes`',
+            'Colloid.volume': '`Colloïdes`',
+            'Shock.index.ph': '`Fréquence cardiaque (FC) à l arrivée du SMUR` / `Pression Artérielle Systolique (PAS) à l arrivée du SMUR`',
+            'AIS.external': '`ISS  / External`',
+            'Delta.shock.index': '`Shock.index.h` - `Shock.index.ph`',
+            'Delta.hemoCue': '`Delta Hémocue`',
+
+            'Anticoagulant.therapy': '`Traitement anticoagulant`',
+            'Antiplatelet.therapy': '`Traitement antiagrégants`',
+            'GCS.init': '`Glasgow initial`',
+            'GCS': '`Score de Glasgow en phase hospitalière`',
+            'GCS.motor.init': '`Glasgow moteur initial`',
+            'GCS.motor': '`Glasgow moteur`',
+            'Improv.anomaly.osmo': '`Régression mydriase sous osmothérapie`',
+            'Medcare.time.ph': '`Délai « arrivée sur les lieux - arrivée hôpital »`',
+            'Temperature.min': '`Température min`',
+            'TCD.PI.max': '`DTC IP max (sur les premières 24 heures d HTIC)`',
+            'IICP': '`HTIC (>25 PIC simple sédation)`',
+            'EVD': '`Dérivation ventriculaire externe (DVE)`',
+            'Decompressive.craniectomy': '`Craniectomie dé-compressive`',
+            'Neurosurgery.day0': '`Bloc dans les premières 24h  / Neurochirurgie (ex. : Craniotomie ou DVE)`',
+            'AIS.head': '`ISS  / Head neck`',
+            'AIS.face': '`ISS  / Face`',
+            'ISS': '`Score ISS`',
+            'ISS.II': '`Total Score IGS`',
+        },
         output_features=[
             # 'Trauma.center',
             'SBP.ph',
@@ -568,24 +420,20 @@ def septic_task(**kwargs):
         assert os.path.exists(septic_idx_path)
         assert os.path.exists(septic_pvals_path)
 
-        pvals = pd.read_csv(septic_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
         assert 'n_top_pvals' in kwargs
         n_top_pvals = kwargs['n_top_pvals']
-        pvals = pvals.sort_values()[:n_top_pvals]
-        septic_top_pvals = list(pvals.index.astype(str))
+        septic_top_pvals = pvals_store.top_pvals(
+            septic_pvals_path, n_top_pvals)
 
         septic_pvals_keep_transform = Transform(
             output_features=septic_top_pvals
         )
 
-        septic_drop_idx = pd.read_csv(septic_idx_path,
-                                      index_col=0, squeeze=True)
+        septic_drop_idx = pvals_store.used_idx(septic_idx_path)
 
         septic_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(septic_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(septic_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -1,7 +1,9 @@
 """Prediction tasks for UKBB."""
 import os
-import pandas as pd
 
+import database
+import code_index
+import pvals_store
 from .task import TaskMeta
 from .transform import Transform
 
@@ -17,6 +19,9 @@ ICD10_main = '41202-0.0'
 ICD10_sec = '41204-0.0'
 ICD10_cancer = '40006-0.0'
 
+ICD_fields = [ICD9, ICD9_main, ICD9_sec, ICD9_cancer, ICD10, ICD10_main,
+              ICD10_sec, ICD10_cancer]
+
 
 # Define some helpers
 def ICD9_equal(df, value):
@@ -43,6 +48,34 @@ def cancer_ICD9(df, value):
     return df[ICD9_cancer] == value
 
 
+def ICD_index():
+    """Load the inverted index of the diagnoses of the df of the tasks."""
+    db = database.dbs['UKBB']
+    return code_index.get_code_index(db.frame_paths['40663_filtered'],
+                                     ICD_fields, index_col='eid',
+                                     sep=db._sep, encoding=db._encoding)
+
+
+def diagnosed(df, ICD10_codes=(), ICD9_codes=(), cancer=True):
+    """Tell which rows of df have any of the given diagnoses.
+
+    Same as the union of ICD10_equal and ICD9_equal (and of cancer_ICD10
+    and cancer_ICD9 if cancer) over the codes, but looked up in the inverted
+    index of the diagnoses instead of comparing the columns of df.
+    """
+    index = ICD_index()
+    ICD10_fields = [ICD10, ICD10_main, ICD10_sec]
+    ICD9_fields = [ICD9, ICD9_main, ICD9_sec]
+    if cancer:
+        ICD10_fields.append(ICD10_cancer)
+        ICD9_fields.append(ICD9_cancer)
+
+    bitmap = index.rows_with_any(ICD10_codes, ICD10_fields)
+    bitmap |= index.rows_with_any(ICD9_codes, ICD9_fields)
+
+    return index.take(bitmap, df.index)
+
+
 # Task 1.1: Breast cancer prediction followng paper
 # https://www.ncbi.nlm.nih.gov/pmc/articles/PMC6558751/
 # -----------------------------------------------------
@@ -58,22 +91,11 @@ def select_idx_breast(df):
 def define_predict_breast(df):
     """Callable used to define the feature to predict."""
     # Breast cancer
-    df['C50'] = (
-        cancer_ICD10(df, 'C500') | ICD10_equal(df, 'C500') |
-        cancer_ICD10(df, 'C501') | ICD10_equal(df, 'C501') |
-        cancer_ICD10(df, 'C502') | ICD10_equal(df, 'C502') |
-        cancer_ICD10(df, 'C503') | ICD10_equal(df, 'C503') |
-        cancer_ICD10(df, 'C504') | ICD10_equal(df, 'C504') |
-        cancer_ICD10(df, 'C505') | ICD10_equal(df, 'C505') |
-        cancer_ICD10(df, 'C506') | ICD10_equal(df, 'C506') |
-        cancer_ICD10(df, 'C508') | ICD10_equal(df, 'C508') |
-        cancer_ICD10(df, 'C509') | ICD10_equal(df, 'C509') |
-        cancer_ICD9(df, '1740') | ICD9_equal(df, '1740') |
-        cancer_ICD9(df, '1743') | ICD9_equal(df, '1743') |
-        cancer_ICD9(df, '1744') | ICD9_equal(df, '1744') |
-        cancer_ICD9(df, '1745') | ICD9_equal(df, '1745') |
-        cancer_ICD9(df, '1748') | ICD9_equal(df, '1748') |
-        cancer_ICD9(df, '1749') | ICD9_equal(df, '1749')
+    df['C50'] = diagnosed(
+        df,
+        ICD10_codes=['C500', 'C501', 'C502', 'C503', 'C504', 'C505', 'C506',
+                     'C508', 'C509'],
+        ICD9_codes=['1740', '1743', '1744', '1745', '1748', '1749'],
     )
 
     # Convert bool to {0, 1}
@@ -83,8 +105,7 @@ def define_predict_breast(df):
 
 
 breast_predict_transform = Transform(
-    input_features=[ICD9, ICD9_main, ICD9_sec, ICD9_cancer, ICD10, ICD10_main,
-                    ICD10_sec, ICD10_cancer],
+    input_features=[],  # Diagnoses looked up in ICD_index
     transform=define_predict_breast,
     output_features=['C50'],
 )
@@ -100,20 +121,18 @@ def breast_task(**kwargs):
     def define_new_features_breast(df):
         """Callable used to define new features from a bunch of features."""
         # People with endometriosis
-        df['N80'] = (
-            ICD10_equal(df, 'N800') | ICD9_equal(df, '6170') |
-            ICD10_equal(df, 'N801') | ICD9_equal(df, '6171') |
-            ICD10_equal(df, 'N802') | ICD9_equal(df, '6172') |
-            ICD10_equal(df, 'N803') | ICD9_equal(df, '6173') |
-            ICD10_equal(df, 'N804') | ICD9_equal(df, '6174') |
-            ICD10_equal(df, 'N805') | ICD9_equal(df, '6175') |
-            ICD10_equal(df, 'N806') | ICD9_equal(df, '6176') |
-            ICD10_equal(df, 'N808') | ICD9_equal(df, '6178') |
-            ICD10_equal(df, 'N809') | ICD9_equal(df, '6179')
+        df['N80'] = diagnosed(
+            df,
+            ICD10_codes=['N800', 'N801', 'N802', 'N803', 'N804', 'N805',
+                         'N806', 'N808', 'N809'],
+            ICD9_codes=['6170', '6171', '6172', '6173', '6174', '6175', '6176',
+                        '6178', '6179'],
+            cancer=False,
         )
 
         # Polycystic ovarian syndrom
-        df['E28.2'] = ICD10_equal(df, 'E282') | ICD9_equal(df, '2564')
+        df['E28.2'] = diagnosed(df, ICD10_codes=['E282'], ICD9_codes=['2564'],
+                                cancer=False)
 
         # Has cancer
         df['Cancer != C50'] = (
@@ -121,10 +140,7 @@ def breast_task(**kwargs):
         )
 
         # Ovarian cancer
-        df['C56'] = (
-            cancer_ICD10(df, 'C56') | ICD10_equal(df, 'C56') |
-            cancer_ICD9(df, '1830') | ICD9_equal(df, '1830')
-        )
+        df['C56'] = diagnosed(df, ICD10_codes=['C56'], ICD9_codes=['1830'])
 
         # Convert bool to {0, 1}
         df['N80'] = df['N80'].astype(int)
@@ -135,8 +151,7 @@ def breast_task(**kwargs):
         return df
 
     breast_new_features_transform = Transform(
-        input_features=[ICD9, ICD9_main, ICD9_sec, ICD9_cancer, ICD10, ICD10_main,
-                        ICD10_sec, ICD10_cancer, 'C50'],
+        input_features=[ICD9_cancer, ICD10_cancer, 'C50'],
         transform=define_new_features_breast,
         output_features=['N80', 'E28.2', 'Cancer != C50', 'C56'],
     )
@@ -214,22 +229,18 @@ def breast_pvals_task(**kwargs):
         assert os.path.exists(breast_idx_path)
         assert os.path.exists(breast_pvals_path)
 
-        pvals = pd.read_csv(breast_pvals_path, header=None,
-                            index_col=0, squeeze=True)
-
-        pvals = pvals.sort_values()[:n_top_pvals]
-        breast_top_pvals = list(pvals.index.astype(str))
+        breast_top_pvals = pvals_store.top_pvals(
+            breast_pvals_path, n_top_pvals)
 
         breast_pvals_keep_transform = Transform(
             output_features=breast_top_pvals
         )
 
-        breast_drop_idx = pd.read_csv(breast_idx_path, index_col=0,
-                                      squeeze=True)
+        breast_drop_idx = pvals_store.used_idx(breast_idx_path)
 
         breast_idx_transform = Transform(
             input_features=['31-0.0'],
-            transform=lambda df: select_idx_breast(df).drop(breast_drop_idx.index,
+            transform=lambda df: select_idx_breast(df).drop(breast_drop_idx,
                                                             axis=0),
         )
 
@@ -256,42 +267,15 @@ def skin_task(**kwargs):
     def define_predict_skin(df):
         """Callable used to define the feature to predict."""
         # Melanoma and other malignant neoplasms of skin
-        df['C43-C44'] = (
-            cancer_ICD10(df, 'C430') | ICD10_equal(df, 'C430') |
-            cancer_ICD10(df, 'C431') | ICD10_equal(df, 'C431') |
-            cancer_ICD10(df, 'C432') | ICD10_equal(df, 'C432') |
-            cancer_ICD10(df, 'C433') | ICD10_equal(df, 'C433') |
-            cancer_ICD10(df, 'C434') | ICD10_equal(df, 'C434') |
-            cancer_ICD10(df, 'C435') | ICD10_equal(df, 'C435') |
-            cancer_ICD10(df, 'C436') | ICD10_equal(df, 'C436') |
-            cancer_ICD10(df, 'C437') | ICD10_equal(df, 'C437') |
-            cancer_ICD10(df, 'C438') | ICD10_equal(df, 'C438') |
-            cancer_ICD10(df, 'C439') | ICD10_equal(df, 'C439') |
-            cancer_ICD10(df, 'C440') | ICD10_equal(df, 'C440') |
-            cancer_ICD10(df, 'C441') | ICD10_equal(df, 'C441') |
-            cancer_ICD10(df, 'C442') | ICD10_equal(df, 'C442') |
-            cancer_ICD10(df, 'C443') | ICD10_equal(df, 'C443') |
-            cancer_ICD10(df, 'C444') | ICD10_equal(df, 'C444') |
-            cancer_ICD10(df, 'C445') | ICD10_equal(df, 'C445') |
-            cancer_ICD10(df, 'C446') | ICD10_equal(df, 'C446') |
-            cancer_ICD10(df, 'C447') | ICD10_equal(df, 'C447') |
-            cancer_ICD10(df, 'C448') | ICD10_equal(df, 'C448') |
-            cancer_ICD10(df, 'C449') | ICD10_equal(df, 'C449') |
-            cancer_ICD9(df, '1720') | ICD9_equal(df, '1720') |
-            cancer_ICD9(df, '1723') | ICD9_equal(df, '1723') |
-            cancer_ICD9(df, '1725') | ICD9_equal(df, '1725') |
-            cancer_ICD9(df, '1726') | ICD9_equal(df, '1726') |
-            cancer_ICD9(df, '1727') | ICD9_equal(df, '1727') |
-            cancer_ICD9(df, '1729') | ICD9_equal(df, '1729') |
-            cancer_ICD9(df, '1730') | ICD9_equal(df, '1730') |
-            cancer_ICD9(df, '1731') | ICD9_equal(df, '1731') |
-            cancer_ICD9(df, '1732') | ICD9_equal(df, '1732') |
-            cancer_ICD9(df, '1733') | ICD9_equal(df, '1733') |
-            cancer_ICD9(df, '1734') | ICD9_equal(df, '1734') |
-            cancer_ICD9(df, '1735') | ICD9_equal(df, '1735') |
-            cancer_ICD9(df, '1736') | ICD9_equal(df, '1736') |
-            cancer_ICD9(df, '1737') | ICD9_equal(df, '1737') |
-            cancer_ICD9(df, '1739') | ICD9_equal(df, '1739')
+        df['C43-C44'] = diagnosed(
+            df,
+            ICD10_codes=['C430', 'C431', 'C432', 'C433', 'C434', 'C435',
+                         'C436', 'C437', 'C438', 'C439', 'C440', 'C441',
+                         'C442', 'C443', 'C444', 'C445', 'C446', 'C447',
+                         'C448', 'C449'],
+            ICD9_codes=['1720', '1723', '1725', '1726', '1727', '1729', '1730',
+                        '1731', '1732', '1733', '1734', '1735', '1736', '1737',
+                        '1739'],
         )
 
         # Convert bool to {0, 1}
@@ -300,8 +284,7 @@ def skin_task(**kwargs):
         return df
 
     skin_predict_transform = Transform(
-        input_features=[ICD9, ICD9_main, ICD9_sec, ICD9_cancer, ICD10, ICD10_main,
-                        ICD10_sec, ICD10_cancer],
+        input_features=[],  # Diagnoses looked up in ICD_index
         transform=define_predict_skin,
         output_features=['C43-C44'],
     )
@@ -327,21 +310,17 @@ def skin_task(**kwargs):
         assert os.path.exists(skin_idx_path)
         assert os.path.exists(skin_pvals_path)
 
-        pvals = pd.read_csv(skin_pvals_path, header=None, index_col=0,
-                            squeeze=True)
-
-        pvals = pvals.sort_values()[:n_top_pvals]
-        skin_top_pvals = list(pvals.index.astype(str))
+        skin_top_pvals = pvals_store.top_pvals(skin_pvals_path, n_top_pvals)
 
         skin_pvals_keep_transform = Transform(
             output_features=skin_top_pvals
         )
 
-        skin_drop_idx = pd.read_csv(skin_idx_path, index_col=0, squeeze=True)
+        skin_drop_idx = pvals_store.used_idx(skin_idx_path)
 
         skin_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(skin_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(skin_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -367,19 +346,11 @@ def parkinson_task(**kwargs):
     def define_predict_parkinson(df):
         """Callable used to define the feature to predict."""
         # Parkinson's disease
-        df['Parkinson'] = (
-            cancer_ICD10(df, 'G20') | ICD10_equal(df, 'G20') |
-            cancer_ICD10(df, 'G210') | ICD10_equal(df, 'G210') |
-            cancer_ICD10(df, 'G211') | ICD10_equal(df, 'G211') |
-            cancer_ICD10(df, 'G212') | ICD10_equal(df, 'G212') |
-            cancer_ICD10(df, 'G213') | ICD10_equal(df, 'G213') |
-            cancer_ICD10(df, 'G214') | ICD10_equal(df, 'G214') |
-            cancer_ICD10(df, 'G218') | ICD10_equal(df, 'G218') |
-            cancer_ICD10(df, 'G219') | ICD10_equal(df, 'G219') |
-            cancer_ICD10(df, 'G22') | ICD10_equal(df, 'G22') |
-            cancer_ICD10(df, 'F023') | ICD10_equal(df, 'F023') |
-            cancer_ICD9(df, '3320') | ICD9_equal(df, '3320') |
-            cancer_ICD9(df, '3321') | ICD9_equal(df, '3321')
+        df['Parkinson'] = diagnosed(
+            df,
+            ICD10_codes=['G20', 'G210', 'G211', 'G212', 'G213', 'G214',
+                         'G218', 'G219', 'G22', 'F023'],
+            ICD9_codes=['3320', '3321'],
         )
 
         # Convert bool to {0, 1}
@@ -388,8 +359,7 @@ def parkinson_task(**kwargs):
         return df
 
     parkinson_predict_transform = Transform(
-        input_features=[ICD9, ICD9_main, ICD9_sec, ICD9_cancer, ICD10, ICD10_main,
-                        ICD10_sec, ICD10_cancer],
+        input_features=[],  # Diagnoses looked up in ICD_index
         transform=define_predict_parkinson,
         output_features=['Parkinson'],
     )
@@ -415,22 +385,18 @@ def parkinson_task(**kwargs):
         assert os.path.exists(parkinson_idx_path)
         assert os.path.exists(parkinson_pvals_path)
 
-        pvals = pd.read_csv(parkinson_pvals_path, header=None, index_col=0,
-                            squeeze=True)
-
-        pvals = pvals.sort_values()[:n_top_pvals]
-        parkinson_top_pvals = list(pvals.index.astype(str))
+        parkinson_top_pvals = pvals_store.top_pvals(
+            parkinson_pvals_path, n_top_pvals)
 
         parkinson_pvals_keep_transform = Transform(
             output_features=parkinson_top_pvals
         )
 
-        parkinson_drop_idx = pd.read_csv(parkinson_idx_path, index_col=0,
-                                         squeeze=True)
+        parkinson_drop_idx = pvals_store.used_idx(parkinson_idx_path)
 
         parkinson_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(parkinson_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(parkinson_drop_idx, axis=0),
         )
 
     return TaskMeta(
@@ -478,21 +444,17 @@ def fluid_task(**kwargs):
         assert os.path.exists(fluid_idx_path)
         assert os.path.exists(fluid_pvals_path)
 
-        pvals = pd.read_csv(fluid_pvals_path,
-                            header=None, index_col=0, squeeze=True)
-
-        pvals = pvals.sort_values()[:n_top_pvals]
-        fluid_top_pvals = list(pvals.index.astype(str))
+        fluid_top_pvals = pvals_store.top_pvals(fluid_pvals_path, n_top_pvals)
 
         fluid_pvals_keep_transform = Transform(
             output_features=fluid_top_pvals
         )
 
-        fluid_drop_idx = pd.read_csv(fluid_idx_path, index_col=0, squeeze=True)
+        fluid_drop_idx = pvals_store.used_idx(fluid_idx_path)
 
         fluid_idx_transform = Transform(
             input_features=[],
-            transform=lambda df: df.drop(fluid_drop_idx.index, axis=0),
+            transform=lambda df: df.drop(fluid_drop_idx, axis=0),
         )
 
     return TaskMeta(
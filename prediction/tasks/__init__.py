@@ -1,5 +1,5 @@
 """Gather tasks metas from all databases and create the task accessor."""
-from .task import Task
+from .task import Task, scan_together
 
 from .TB import task_metas as TB_task_metas
 from .UKBB import task_metas as UKBB_task_metas
@@ -19,7 +19,8 @@ class _TaskAccessor(object):
             'NHIS': NHIS_task_metas,
         }
 
-    def get(self, tag, n_top_pvals=100, RS=0, T=0):
+    def get(self, tag, n_top_pvals=100, RS=0, T=0,
+            categorical_encoding='one_hot'):
         """Return asked task with given parameters."""
         db, name = tag.split('/')
         task_meta = self.task_metas[db]
@@ -29,7 +30,36 @@ class _TaskAccessor(object):
             'RS': RS,
             'T': T,
         }
-        return Task(task_meta[name](**kwargs))
+        return Task(task_meta[name](**kwargs),
+                    categorical_encoding=categorical_encoding)
+
+    def get_many(self, tags, n_top_pvals=100, RS=0, T=0,
+                 categorical_encoding='one_hot', y_only=False):
+        """Return asked tasks, the ones on the same df scanned together.
+
+        The source df of tasks sharing it is read once for all of them (see
+        scan_together): the types of its features are then inferred on the
+        rows needed by any of these tasks.
+
+        Parameters
+        ----------
+        tags : list of str
+            The tags of the tasks.
+        y_only : bool
+            Whether to scan together only the features needed by y (eg
+            when only y is used), X being loaded by each task.
+
+        Returns
+        -------
+        list of Task
+
+        """
+        task_list = [self.get(tag, n_top_pvals=n_top_pvals, RS=RS, T=T,
+                              categorical_encoding=categorical_encoding)
+                     for tag in tags]
+        scan_together(task_list, y_only=y_only)
+
+        return task_list
 
     def __getitem__(self, tag):
         """Access a task with default parameters."""
@@ -0,0 +1,238 @@
+"""Cache the loaded X and y of the tasks on disk.
+
+The strategies run on a task share the same X and y for given task, RS, T
+and n_top_pvals. The cache stores them once fully loaded, encoded and
+transformed, so that next loads of the task are a read of one file.
+
+A cache entry is keyed by a hash of the TaskMeta (the source code and the
+captured variables of its transforms included), of the categorical encoding
+and of the state of the source file and of its metadata (feature types,
+ordinal orders). The least recently used entries are removed when the
+cache gets larger than TASK_CACHE_MAX_MB.
+
+The cache is opt-in: set the environment variable TASK_CACHE=1 to enable it.
+"""
+import os
+import types
+import inspect
+import hashlib
+import logging
+import dataclasses
+import pandas as pd
+import numpy as np
+
+from database import dbs
+from io_utils import fingerprint
+from vocabulary import vocabulary_enabled, metadata_paths
+
+
+logger = logging.getLogger(__name__)
+
+cache_folder = 'cache/tasks/'
+
+# Change when the loading of the tasks changes to invalidate the entries
+version = 1
+
+# Count the cache hits and misses of the current process
+cache_stats = {'hits': 0, 'misses': 0}
+
+
+def cache_enabled():
+    """Tell whether the task cache is enabled (TASK_CACHE env var)."""
+    return os.environ.get('TASK_CACHE', '0').lower() in ['1', 'true', 'yes']
+
+
+def max_size():
+    """Give the size bound of the cache in bytes (TASK_CACHE_MAX_MB)."""
+    return int(float(os.environ.get('TASK_CACHE_MAX_MB', '2000'))*1e6)
+
+
+def _describe(obj, seen=None):
+    """Give a str describing an object, callables by their source code.
+
+    Dataclasses are described field by field, callables by their source
+    code and the values they capture (closure, defaults and globals), data
+    frames by the hash of their content.
+    """
+    if seen is None:
+        seen = set()
+
+    if isinstance(obj, (types.FunctionType, types.MethodType)) or \
+            dataclasses.is_dataclass(obj):
+        if id(obj) in seen:  # Recursive reference
+            return '<seen>'
+        seen = seen | {id(obj)}
+
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        fields = {f.name: _describe(getattr(obj, f.name), seen)
+                  for f in dataclasses.fields(obj)}
+        return f'{type(obj).__name__}({fields})'
+
+    if isinstance(obj, types.MethodType):
+        return _describe(obj.__func__, seen)
+
+    if isinstance(obj, types.FunctionType):
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = repr((obj.__code__.co_code, obj.__code__.co_consts))
+        closure = [c.cell_contents for c in obj.__closure__ or []]
+        # Values of the module variables used by the function
+        used_globals = {n: obj.__globals__[n] for n in obj.__code__.co_names
+                        if n in obj.__globals__ and not
+                        isinstance(obj.__globals__[n], (types.ModuleType,
+                                                        type))}
+        return (f'{source}|{_describe(closure, seen)}|'
+                f'{_describe(obj.__defaults__, seen)}|'
+                f'{_describe(used_globals, seen)}')
+
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        content = pd.util.hash_pandas_object(obj, index=True).values
+        return f'{type(obj).__name__}{obj.shape}:{_hash(content.tobytes())}'
+
+    if isinstance(obj, np.ndarray):
+        return f'ndarray{obj.shape}:{_hash(obj.tobytes())}'
+
+    if isinstance(obj, dict):
+        items = sorted((repr(k), _describe(v, seen)) for k, v in obj.items())
+        return f'{{{items}}}'
+
+    if isinstance(obj, (set, frozenset)):
+        return f'{{{sorted(_describe(v, seen) for v in obj)}}}'
+
+    if isinstance(obj, (list, tuple)):
+        return f'[{[_describe(v, seen) for v in obj]}]'
+
+    return repr(obj)
+
+
+def _hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def task_key(task):
+    """Key of the cache entry of the X and y of a task.
+
+    Parameters
+    ----------
+    task : Task
+        The task to load.
+
+    Returns
+    -------
+    str
+        Hex digest of the meta and encoding of the task and of the state of
+        its source files.
+
+    """
+    meta = task.meta
+    db = dbs[meta.db]
+    paths = [db.frame_paths[meta.df_name]] + metadata_paths(db,
+                                                            meta.df_name)
+    states = [fingerprint(p) if os.path.exists(p) else None for p in paths]
+
+    description = '|'.join([
+        str(version),
+        _describe(meta),
+        task.categorical_encoding,
+        str(vocabulary_enabled()),
+        repr(list(zip(paths, states))),
+    ])
+
+    return _hash(description.encode('utf-8'))
+
+
+def _entry_path(key):
+    return f'{cache_folder}{key}.pkl'
+
+
+def exists(key):
+    """Tell whether a cache entry exists."""
+    return os.path.exists(_entry_path(key))
+
+
+def load(key):
+    """Load a cache entry, None if not cached.
+
+    The modification time of a loaded entry is updated: it orders the
+    entries from the most to the least recently used.
+    """
+    path = _entry_path(key)
+
+    try:
+        data = pd.read_pickle(path)
+    except FileNotFoundError:
+        cache_stats['misses'] += 1
+        logger.info(f'Task cache miss for {key} '
+                    f'(hits: {cache_stats["hits"]}, '
+                    f'misses: {cache_stats["misses"]}).')
+        return None
+
+    try:
+        os.utime(path)
+    except FileNotFoundError:  # Evicted meanwhile by another process
+        pass
+
+    cache_stats['hits'] += 1
+    logger.info(f'Task cache hit for {key} '
+                f'(hits: {cache_stats["hits"]}, '
+                f'misses: {cache_stats["misses"]}).')
+
+    return data
+
+
+def dump(key, data):
+    """Dump a cache entry and evict the least recently used ones."""
+    os.makedirs(cache_folder, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    pd.to_pickle(data, tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f'Task cache: dumped {path}.')
+
+    evict(max_size(), keep=[path])
+
+
+def evict(max_bytes, keep=None, folder=None):
+    """Remove the least recently used entries until the cache fits.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The size bound of the cache in bytes.
+    keep : list
+        Paths of entries never removed (eg the one just dumped).
+    folder : str
+        The folder of the cache entries, cache_folder if None.
+
+    """
+    if folder is None:
+        folder = cache_folder
+
+    if not os.path.exists(folder):
+        return
+
+    keep = set(keep or [])
+    entries = []
+    for filename in os.listdir(folder):
+        if not filename.endswith('.pkl'):
+            continue
+        path = os.path.join(folder, filename)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    size = sum(e[1] for e in entries)
+    for _, entry_size, path in sorted(entries):
+        if size <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        size -= entry_size
+        logger.info(f'Cache: evicted {path}.')
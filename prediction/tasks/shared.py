@@ -0,0 +1,134 @@
+"""Share the loaded X and y of a task between processes.
+
+A server process loads a task and publishes X and y as a memory-mapped
+array in shared_folder (in shared memory, /dev/shm, when available). The
+processes running strategies on the same task attach to it: their X is a
+read only view on the same pages instead of a copy each. The published
+datasets are keyed as the entries of the task cache (see cache.task_key).
+
+Publish with `python main.py serve_task <task>`. Attaching is opt-in: set
+the environment variable TASK_SHARED=1 in the processes of the strategies.
+"""
+import os
+import shutil
+import logging
+import pandas as pd
+import numpy as np
+from pandas.api.types import is_numeric_dtype
+
+from . import cache as task_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+def shared_folder():
+    """Give the folder of the published datasets (TASK_SHARED_FOLDER)."""
+    default = 'cache/shared/'
+    if os.path.isdir('/dev/shm'):
+        default = '/dev/shm/missing_values_analysis/'
+    return os.environ.get('TASK_SHARED_FOLDER', default)
+
+
+def shared_enabled():
+    """Tell whether the tasks attach to published X (TASK_SHARED env var)."""
+    return os.environ.get('TASK_SHARED', '0').lower() in ['1', 'true', 'yes']
+
+
+def _dataset_dir(key):
+    return os.path.join(shared_folder(), key)
+
+
+def publish(task, dtype=np.float32):
+    """Load the X and y of a task and publish them for the other processes.
+
+    Parameters
+    ----------
+    task : Task
+        The task to publish.
+    dtype : np.dtype
+        The dtype of the published X.
+
+    Returns
+    -------
+    str
+        The key of the published dataset.
+
+    """
+    X, y = task.X, task.y
+
+    if any(isinstance(dt, pd.SparseDtype) or not is_numeric_dtype(dt)
+           for dt in X.dtypes):
+        raise ValueError(f'{task.meta.tag}: only dense numeric X can be '
+                         f'shared (categorical encoding one_hot or native).')
+
+    key = task_cache.task_key(task)
+    dataset_dir = _dataset_dir(key)
+    tmp_dir = f'{dataset_dir}.{os.getpid()}.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    # One row per feature: each column of X is contiguous
+    values = np.lib.format.open_memmap(os.path.join(tmp_dir, 'X.npy'),
+                                       mode='w+', dtype=dtype,
+                                       shape=(X.shape[1], X.shape[0]))
+    for j in range(X.shape[1]):
+        values[j, :] = X.iloc[:, j].to_numpy(dtype=dtype)
+    values.flush()
+    del values
+
+    pd.to_pickle({
+        'tag': task.meta.tag,
+        'columns': X.columns,
+        'index': X.index,
+        'y': y,
+        'f_categorical': task._f_categorical,
+    }, os.path.join(tmp_dir, 'meta.pkl'))
+
+    if os.path.exists(dataset_dir):
+        shutil.rmtree(dataset_dir)
+    os.replace(tmp_dir, dataset_dir)
+
+    size = X.shape[0]*X.shape[1]*np.dtype(dtype).itemsize
+    logger.info(f'Published X of {task.meta.tag} {X.shape} '
+                f'({size/1e6:.1f} MB) in {dataset_dir}.')
+
+    return key
+
+
+def exists(key):
+    """Tell whether a dataset is published."""
+    return os.path.exists(os.path.join(_dataset_dir(key), 'meta.pkl'))
+
+
+def attach(key):
+    """Attach to a published dataset, None if not published.
+
+    Returns
+    -------
+    dict
+        X (read only data frame on the shared pages), y and f_categorical.
+
+    """
+    dataset_dir = _dataset_dir(key)
+    meta_path = os.path.join(dataset_dir, 'meta.pkl')
+
+    if not os.path.exists(meta_path):
+        return None
+
+    meta = pd.read_pickle(meta_path)
+    values = np.load(os.path.join(dataset_dir, 'X.npy'), mmap_mode='r')
+    X = pd.DataFrame(values.T, index=meta['index'], columns=meta['columns'],
+                     copy=False)
+
+    logger.info(f'Attached to X of {meta["tag"]} {X.shape} in '
+                f'{dataset_dir}.')
+
+    return {'X': X, 'y': meta['y'], 'f_categorical': meta['f_categorical']}
+
+
+def unpublish(key):
+    """Remove a published dataset."""
+    dataset_dir = _dataset_dir(key)
+    if os.path.exists(dataset_dir):
+        shutil.rmtree(dataset_dir)
+        logger.info(f'Removed {dataset_dir}.')
@@ -0,0 +1,147 @@
+"""Cache the intermediate steps of the loading of the tasks.
+
+Loading a task is a DAG of steps, each cached keyed by its inputs, the keys
+of the steps it depends on included:
+
+    y: the rows kept and the encoded y, derived from the source file,
+        idx_selection and predict.
+    features: the features of the source file filled and encoded on the
+        rows of y by an encode mode. Features are encoded independently of
+        each other, so they are cached feature by feature.
+
+Changing select (eg n_top_pvals) then reuses y and the features already
+encoded, and only the new features are read and encoded. Changing
+transform reuses y and the encoded inputs of the transform. The final X
+and y are cached as a whole by cache.py.
+
+The steps are cached with the tasks (TASK_CACHE=1), in the same folder and
+size bound.
+"""
+import pandas as pd
+import numpy as np
+
+from database import dbs
+from database.constants import CONTINUE_R, NOT_A_FEATURE
+from df_utils import assemble_columns
+from io_utils import fingerprint
+from vocabulary import vocabulary_enabled, metadata_states
+from . import cache as task_cache
+
+
+def steps_enabled():
+    """Tell whether the steps are cached (TASK_CACHE env var)."""
+    return task_cache.cache_enabled()
+
+
+def _key(step, *inputs):
+    """Key of the cache entry of a step from the description of its inputs."""
+    description = '|'.join([str(task_cache.version), step] +
+                           [task_cache._describe(i) for i in inputs])
+    return f'{step}-{task_cache._hash(description.encode("utf-8"))}'
+
+
+def y_key(task):
+    """Key of the y step of a task."""
+    meta = task.meta
+    db = dbs[meta.db]
+    path = db.frame_paths[meta.df_name]
+
+    return _key('y', meta.db, meta.df_name, fingerprint(path),
+                meta.idx_column, meta.idx_selection, meta.predict,
+                meta.classif, meta.encode_y)
+
+
+def features_key(task, encode):
+    """Key of the encoded features of a task for an encode mode."""
+    meta = task.meta
+    db = dbs[meta.db]
+    states = metadata_states(db, meta.df_name)
+
+    return _key('features', y_key(task), encode, task.categorical_encoding,
+                vocabulary_enabled(), states)
+
+
+def load(key):
+    """Load the output of a step, None if not cached."""
+    return task_cache.load(key)
+
+
+def dump(key, data):
+    """Dump the output of a step."""
+    task_cache.dump(key, data)
+
+
+def split_encoded(df, types, parent, features):
+    """Split the output of _encode_df by feature (see assemble_encoded).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The encoded df.
+    types : pandas.Series
+        The types of the encoded features.
+    parent : pandas.Series
+        The parent features of the encoded features.
+    features : list
+        The features of the df given to _encode_df.
+
+    Returns
+    -------
+    dict
+        Features as keys and dict of their encoded columns and types as
+        values.
+
+    """
+    parent = parent[df.columns]
+    return {f: {
+        'df': df.loc[:, (parent == f).values],
+        'types': types[parent.index[parent == f]],
+    } for f in features}
+
+
+def assemble_encoded(encoded, features, types, encode):
+    """Concatenate the encoded features in the order of _encode_df.
+
+    Parameters
+    ----------
+    encoded : dict
+        The encoded features (see split_encoded).
+    features : list
+        The features to concatenate, in the order of the source file.
+    types : pandas.Series
+        The types of the features of the source file.
+    encode : str or list
+        The encode mode. If None the features are not encoded and are kept
+        in the given order.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The encoded features.
+    pandas.Series
+        The types of the encoded features, None if not encoded.
+
+    """
+    if not encode:
+        order = list(features)
+    else:
+        # _encode_df groups the features by type, in the order of their
+        # first appearance, the features not to use being removed
+        f_types = pd.Series([types.get(f, CONTINUE_R) for f in features],
+                            index=features, dtype=object)
+        order = [f for t in pd.unique(f_types) if t != NOT_A_FEATURE
+                 for f in features if f_types[f] == t]
+
+    dfs = {f: encoded[f]['df'] for f in order}
+    df = None
+    if all(isinstance(dt, np.dtype) and dt == np.float64
+           for sub in dfs.values() for dt in sub.dtypes):
+        df = assemble_columns(dict(dfs), np.float64)
+    if df is None:
+        df = pd.concat(dfs.values(), axis=1)
+
+    encoded_types = None
+    if encode:
+        encoded_types = pd.concat([encoded[f]['types'] for f in order])
+
+    return df, encoded_types
@@ -4,12 +4,26 @@ import numpy as np
 from dataclasses import dataclass, field
 from typing import Set
 import logging
+from pandas.api.types import is_numeric_dtype
 
-from missing_values import get_missing_values
-from df_utils import fill_df
+from missing_values import get_missing_values, get_missing_values_cached, \
+    filled_missing_values
+from df_utils import fill_df, assemble_columns
 from database import dbs, _load_feature_types
+from database.constants import CATEGORICAL
 from .transform import Transform
+from . import cache as task_cache
+from . import shared
+from . import steps
 from encode import ordinal_encode
+from io_utils import read_csv, fingerprint
+from row_index import get_row_index
+from vocabulary import get_vocabulary, vocabulary_enabled
+
+
+# Categorical features must have less categories than the bins of the
+# estimators with native support (max_bins of HistGradientBoosting)
+max_categories = 255
 
 
 @dataclass
@@ -75,43 +89,66 @@ class TaskMeta(object):
 
 
 class Task(object):
-    """Gather a TaskMeta and a dataframe."""
+    """Gather a TaskMeta and a dataframe.
+
+    The categorical features one hot encoded by the encode modes of the meta
+    can instead be one hot encoded in sparse columns (categorical_encoding
+    'sparse') or kept as integer codes (categorical_encoding 'native') for
+    the estimators supporting categorical features natively.
+    """
 
-    def __init__(self, meta):
+    def __init__(self, meta, categorical_encoding='one_hot'):
         """Init."""
+        if categorical_encoding not in ['one_hot', 'sparse', 'native']:
+            raise ValueError(f'Unknown categorical encoding '
+                             f'{categorical_encoding}.')
+
         self.meta = meta
+        self.categorical_encoding = categorical_encoding
 
         # Store the features availables in each dataframe
         self._f_init = None
+        self._f_header = None
         self._f_y = None
         self._f_transform = None
 
         # Store the dataframes
         self._X_select_base = None
+        # Unencoded features, kept only when built without the task cache
         self._X_select_unenc = None
         self._X_select = None
         self._X_extra_base = None
         self._X_extra_unenc = None
         self._X_extra = None
         self._y = None
+        self._X = None
+        self._X_numpy = dict()
 
         self._file_index = None
+        self._df_scan = None
+        self._scan_skipped = None
 
-        self._rows_to_drop = None
+        self._idx_to_drop = None
+        self._mv_filled = None
+        self._f_categorical = []
 
     @property
     def X(self):
-        """Input dataset."""
-        if self._X_select is None and self._X_extra is None:
-            self._load_X_y()
+        """Input dataset, assembled once (see _assemble_X)."""
+        if self._X is None:
+            if self._X_select is None and self._X_extra is None:
+                self._load_X_y()
+            self._X = self._assemble_X()
 
-        if self._X_select is None:
-            return self._X_extra
+        return self._X
 
-        if self._X_extra is None:
-            return self._X_select
+    def to_numpy(self, dtype=np.float32):
+        """Array of X, a view on X if it has the dtype already (memoized)."""
+        dtype = np.dtype(dtype)
+        if dtype not in self._X_numpy:
+            self._X_numpy[dtype] = self.X.to_numpy(dtype=dtype)
 
-        return pd.concat((self._X_select, self._X_extra), axis=1)
+        return self._X_numpy[dtype]
 
     @property
     def y(self):
@@ -121,6 +158,27 @@ class Task(object):
 
         return self._y[self._f_y[0]]
 
+    @property
+    def categorical_features(self):
+        """Positions in X of the features kept as categorical codes.
+
+        Features with more categories than the bins of the estimators (see
+        max_categories) are left out and used as ordinal codes.
+        """
+        X = self.X
+        f_categorical = set(self._f_categorical)
+        positions = []
+
+        for j, f in enumerate(X.columns):
+            if f not in f_categorical:
+                continue
+            if X.iloc[:, j].max() >= max_categories:
+                logging.info(f'{f}: too many categories, used as ordinal.')
+                continue
+            positions.append(j)
+
+        return positions
+
     def is_classif(self):
         """Tell if the task is a classification or a regression."""
         return self.meta.classif
@@ -135,18 +193,18 @@ class Task(object):
         return infos
 
     def _idx_to_rows(self, idx):
-        if self.meta.idx_column is None:
-            return idx + 1  # Rows start to 1 wih header
+        """Give the line numbers (header is 0) of the given indexes."""
+        if not self.meta.idx_column:
+            return np.asarray(idx) + 1  # Rows start to 1 wih header
 
         if self._file_index is None:
             self._load_index()
 
-        rows = []
-        index = self._file_index
-        for i in idx:
-            rows.append(index.get_loc(i)+1)
+        rows = self._file_index.get_indexer(idx)
+        if (rows < 0).any():
+            raise KeyError('Some indexes not found in the file index.')
 
-        return rows
+        return rows + 1
 
     def _features_to_load(self, features):
         """From a set of features to load, find where they are."""
@@ -196,61 +254,250 @@ class Task(object):
         return pd.concat((df_init, df_y, df_transform), axis=1)
 
     def _load_index(self):
-        db = dbs[self.meta.db]
-        df_name = self.meta.df_name
-        df_path = db.frame_paths[df_name]
-        sep = db._sep
-        encoding = db._encoding
         index_col = self.meta.idx_column
+        if not index_col:
+            return
 
-        if index_col:
-            df = pd.read_csv(df_path, sep=sep, encoding=encoding,
-                             usecols=index_col, index_col=index_col)
-            self._file_index = df.index
+        if len(index_col) == 1:
+            # Read from the persisted row index of the file
+            db = dbs[self.meta.db]
+            df_path = db.frame_paths[self.meta.df_name]
+            row_index = get_row_index(df_path, sep=db._sep,
+                                      encoding=db._encoding)
+            self._file_index = row_index.index(index_col[0])
 
-    def _load_y(self):
-        """Load a dataframe from taskmeta (only y)."""
-        # Step 0: get dataframe's path and load infos
-        logging.debug('Get df path and load infos')
+        else:
+            if self._df_scan is None:
+                self._scan()
+            self._file_index = self._df_scan.index
+
+    def _load_header(self):
+        """Load the available features of the initial df (header only)."""
         db = dbs[self.meta.db]
-        df_name = self.meta.df_name
-        df_path = db.frame_paths[df_name]
-        sep = db._sep
-        encoding = db._encoding
+        df_path = db.frame_paths[self.meta.df_name]
         index_col = self.meta.idx_column
 
-        # Step 1: Load available features from initial df
-        df = pd.read_csv(df_path, sep=sep, encoding=encoding, nrows=0,
-                         index_col=index_col)
+        df = read_csv(df_path, sep=db._sep, encoding=db._encoding, nrows=0,
+                      index_col=index_col)
         self._f_init = {s for s in set(df.columns) if s not in self.meta.drop}
         self._f_init.update(index_col)
+        self._f_header = list(df.columns)
+
+    def _select_features(self):
+        """Return the features of the initial df used by select."""
+        select = self.meta.select
+        if not select:
+            return set()
+
+        if select.output_features and select.input_features:
+            raise ValueError('Cannot specify both input and output '
+                             'features for select transform.')
+
+        if select.output_features:
+            select_f = select.get_parent(select.output_features)
+        else:
+            select_f = select.input_features
+
+        return set(select_f).intersection(self._f_init)
+
+    def _transform_features(self):
+        """Return the features of the initial df used by transform."""
+        transform = self.meta.transform
+        if not transform:
+            return set()
+
+        return set(transform.input_features).intersection(self._f_init)
+
+    def _plan_scan(self, y_only=False):
+        """Gather the features of the initial df needed by all the steps.
+
+        Parameters
+        ----------
+        y_only : bool
+            Whether to gather only the features needed to derive y.
+
+        Returns
+        -------
+        set or None
+            Union of the features needed by idx_selection, predict, select
+            and transform, plus the index. None if all the features are
+            needed, ie neither select nor transform is given.
+
+        """
+        if self._f_init is None:
+            self._load_header()
+
+        if not y_only and not self.meta.select and not self.meta.transform:
+            return None
+
+        features = set(self.meta.idx_column)
+        if self.meta.idx_selection:
+            features.update(self.meta.idx_selection.input_features)
+        features.update(self.meta.predict.input_features)
+        if not y_only:
+            features.update(self._select_features())
+            features.update(self._transform_features())
+
+        return features.intersection(self._f_init)
+
+    def _scan(self, features=None, skipped=None):
+        """Read once all the features needed by the task (or the given).
+
+        The rows known to be dropped are not read, unless the rows to skip
+        are given (eg the ones skipped by the scan of a cached y step: the
+        dtypes inferred by read_csv depend on the rows read).
+        """
+        db = dbs[self.meta.db]
+        df_path = db.frame_paths[self.meta.df_name]
+
+        if features is None:
+            features = self._plan_scan()
+        logging.debug(f'Scan {df_path} for features {features}.')
+
+        # Rows known to be dropped before the scan are not read
+        if skipped is None:
+            skipped = self._idx_to_drop
+        if skipped is None:
+            skipped = pd.Index([])
+        self._scan_skipped = skipped
+
+        skiprows = None
+        if len(skipped) > 0:
+            skiprows = self._idx_to_rows(skipped)
+
+        # We add low_memory=False because if True, types are inferred by chunk
+        # and some mixed types may happen (eg 1 and 1.0) which lead to an
+        # error when ordinal encoding (2 categories instead of one).
+        self._df_scan = read_csv(df_path, sep=db._sep, encoding=db._encoding,
+                                 usecols=features, skiprows=skiprows,
+                                 index_col=self.meta.idx_column,
+                                 low_memory=False)
+        logging.debug(f'Scanned df of shape {self._df_scan.shape}.')
+
+    def _scanned(self, features=None):
+        """Return the asked features of the scan without the dropped rows."""
+        if self._df_scan is None:
+            self._scan()
+
+        else:
+            # The scan may be shared by tasks and only hold the features
+            # needed by y (see scan_together)
+            needed = features
+            if needed is None:
+                needed = self._plan_scan()
+            if needed is None:
+                needed = self._f_header
+            if not set(needed).intersection(self._f_header).issubset(
+                    self._df_scan.columns):
+                self._scan(skipped=self._scan_skipped)
+
+        df = self._df_scan
+        if features is not None:
+            features = set(features)
+            df = df[[f for f in df.columns if f in features]]
+
+        if self._idx_to_drop is not None and len(self._idx_to_drop) > 0:
+            # Some of the indexes may not have been read by the scan
+            df = df.drop(self._idx_to_drop.intersection(df.index), axis=0)
+
+        return df
+
+    def _missing_values(self, df):
+        """Types of missing values of columns as read from the file.
+
+        Memoized across tasks on the same df when rows are identified by
+        the index column.
+        """
+        db = dbs[self.meta.db]
+        if not self.meta.idx_column:
+            return get_missing_values(df, db.heuristic)
+
+        path = db.frame_paths[self.meta.df_name]
+        source = (db.acronym, self.meta.df_name, fingerprint(path))
+        return get_missing_values_cached(df, db.heuristic, source)
+
+    def _filled_missing_values(self, df):
+        """Types of missing values of a part of the filled df (step 5.3)."""
+        if self._mv_filled is None:
+            return get_missing_values(df, dbs[self.meta.db].heuristic)
+
+        return self._mv_filled[df.columns]
+
+    def _load_idx_to_drop(self):
+        """Derive the indexes to drop from idx_selection if any."""
+        idx_transformer = self.meta.idx_selection
+        self._idx_to_drop = pd.Index([])  # At start, no indexes to drop
+
+        if not idx_transformer:
+            return
+
+        logging.debug('Derive indexes to drop.')
+        input_features = set(idx_transformer.input_features)
+
+        if self._index_only_selection():
+            # Only the index is needed: no need to scan the file, and the
+            # dropped rows will be skipped by the scan
+            self._load_index()
+            df = pd.DataFrame(index=self._file_index)
+        else:
+            df = self._scanned(input_features)
+
+        idx = df.index
+        df = idx_transformer.transform(df)
+        idx_to_keep = df.index
+        self._idx_to_drop = idx.difference(idx_to_keep)
+
+    def _index_only_selection(self):
+        """Tell whether idx_selection only needs the index of the df."""
+        input_features = set(self.meta.idx_selection.input_features)
+        return bool(self.meta.idx_column) and \
+            input_features <= set(self.meta.idx_column)
+
+    def _load_y(self):
+        """Load y, from the cached y step if enabled (see steps.py)."""
+        if not steps.steps_enabled():
+            return self._derive_y()
+
+        key = steps.y_key(self)
+        cached = steps.load(key)
+
+        if cached is None:
+            self._derive_y()
+            steps.dump(key, {
+                'y': self._y,
+                'f_y': self._f_y,
+                'idx_to_drop': self._idx_to_drop,
+                'scan_skipped': self._scan_skipped,
+            })
+            return
+
+        if self._f_init is None:
+            self._load_header()
+
+        self._y = cached['y']
+        self._f_y = cached['f_y']
+        self._idx_to_drop = cached['idx_to_drop']
+        self._scan_skipped = cached['scan_skipped']
+        self._f_init.discard(self._f_y[0])
+
+    def _derive_y(self):
+        """Load a dataframe from taskmeta (only y)."""
+        # Step 0: get the database
+        db = dbs[self.meta.db]
+
+        # Step 1: Load available features from initial df and scan them
+        if self._f_init is None:
+            self._load_header()
 
         # Step 1.2: load index
         self._load_index()
 
         # Step 2: Derive indexes to drop if any
-        idx_transformer = self.meta.idx_selection
-        idx_to_drop = pd.Index([])  # At start, no indexes to drop
-        if idx_transformer:
-            logging.debug('Derive indexes to drop.')
-            features_to_load = set(idx_transformer.input_features+index_col)
-            features_to_load = features_to_load.intersection(self._f_init)
-            df = pd.read_csv(df_path, sep=sep, encoding=encoding,
-                             usecols=features_to_load, index_col=index_col)
-            idx = df.index
-            logging.debug(f'Loaded df of shape {df.shape}.')
-            df = idx_transformer.transform(df)
-            idx_to_keep = df.index
-            idx_to_drop = idx.difference(idx_to_keep)
-            self._rows_to_drop = self._idx_to_rows(idx_to_drop)
+        self._load_idx_to_drop()
 
         # Step 3: Derive the feature to predict y
         logging.debug('Derive the feature to predict y.')
-        features_to_load = set(self.meta.predict.input_features+index_col)
-        features_to_load = features_to_load.intersection(self._f_init)
-        df = pd.read_csv(df_path, sep=sep, encoding=encoding,
-                         usecols=features_to_load, skiprows=self._rows_to_drop,
-                         index_col=index_col)
+        df = self._scanned(self.meta.predict.input_features)
         logging.debug(f'Loaded df of shape {df.shape}.')
 
         if len(self.meta.predict.output_features) != 1:
@@ -266,16 +513,25 @@ class Task(object):
         self._f_init.discard(y_name)
 
         # Step 4: Add NAN values of y to index to drop and drop them from y
-        y_mv = get_missing_values(self._y[y_name], db.heuristic)
+        # y is as read from the file if predict has the default transform
+        if self.meta.predict.transform is Transform.transform:
+            y_mv = self._missing_values(self._y[y_name])
+        else:
+            y_mv = get_missing_values(self._y[y_name], db.heuristic)
         idx_to_drop_y = self._y[y_name].index[y_mv != 0]
 
-        idx_to_drop = idx_to_drop.union(idx_to_drop_y)  # merge the indexes
-        self._rows_to_drop = self._idx_to_rows(idx_to_drop)
+        # merge the indexes
+        self._idx_to_drop = self._idx_to_drop.union(idx_to_drop_y)
         self._y = self._y.drop(idx_to_drop_y, axis=0)
 
         # Step 5: Encode y if needed
         if self.is_classif() and self.meta.encode_y:
-            y_mv = get_missing_values(self._y, db.heuristic)
+            # Only rows without missing values are left
+            y_mv = filled_missing_values(y_mv.drop(idx_to_drop_y), db.heuristic)
+            if y_mv is None:
+                y_mv = get_missing_values(self._y, db.heuristic)
+            else:
+                y_mv = y_mv.to_frame()
             self._y, _ = ordinal_encode(self._y, y_mv)
         elif self.meta.encode_y:  # cast to float for regression
             self._y = self._y.astype(float)
@@ -286,58 +542,46 @@ class Task(object):
         if self._y is None:
             self._load_y()
 
-        # Step 0: get dataframe's path and load infos
-        logging.debug('Get df path and load infos')
+        if steps.steps_enabled():
+            return self._load_X_base_steps()
+
+        # Step 0: get the database
         db = dbs[self.meta.db]
         df_name = self.meta.df_name
-        df_path = db.frame_paths[df_name]
-        sep = db._sep
-        encoding = db._encoding
-        index_col = self.meta.idx_column
 
-        # Step 5.1: Load asked features
-        features_to_load = set(index_col)
+        # Step 5.1: Take the asked features from the scan
         select = self.meta.select
-        if select:
-            if select.output_features and select.input_features:
-                raise ValueError('Cannot specify both input and output '
-                                 'features for select transform.')
-
-            if select.output_features:
-                select_f = select.get_parent(select.output_features)
-            else:
-                select_f = select.input_features
-            select_f = set(select_f).intersection(self._f_init)
-            features_to_load.update(select_f)
-            features_to_load = features_to_load.intersection(self._f_init)
-
         transform = self.meta.transform
-        if transform:
-            transform_f = set(transform.input_features).intersection(self._f_init)
-            features_to_load.update(transform_f)
-            features_to_load = features_to_load.intersection(self._f_init)
+        select_f = self._select_features()
+        transform_f = self._transform_features()
 
         # If nothing specified, we load everything
         if not select and not transform:
-            features_to_load = None
+            df = self._scanned()
+        else:
+            df = self._scanned(select_f.union(transform_f))
 
-        df = pd.read_csv(df_path, sep=sep, usecols=features_to_load,
-                         encoding=encoding, skiprows=self._rows_to_drop,
-                         index_col=index_col, low_memory=False)
-        # We add low_memory=False because if True, types are inferred by chunk
-        # and some mixed types may happen (eg 1 and 1.0) which lead to an
-        # error when ordinal encoding (2 categories instead of one).
-        mv = get_missing_values(df, db.heuristic)
+        # The scan is not needed anymore
+        self._df_scan = None
+
+        mv = self._missing_values(df)
         df = fill_df(df, mv != 0, np.nan)
 
         df.sort_index(inplace=True)  # to have consistent order with y
 
+        # Types of missing values of the filled df, used by the encoding
+        self._mv_filled = filled_missing_values(mv, db.heuristic)
+        if self._mv_filled is not None:
+            self._mv_filled.sort_index(inplace=True)
+
         # Step 5.2: save the results
         if select:
+            select_f = [f for f in df.columns if f in select_f]
             self._X_select_base = df[select_f]
             self._X_select_unenc = df[select_f]
 
         if transform:
+            transform_f = [f for f in df.columns if f in transform_f]
             self._X_extra_base = df[transform_f]
             self._X_extra_unenc = df[transform_f]
 
@@ -348,29 +592,171 @@ class Task(object):
         # Step 5.3: Encode both dataframes
         if self.meta.encode_transform and self._X_extra_base is not None:
             df = self._X_extra_base
-            mv = get_missing_values(df, db.heuristic)
+            mv = self._filled_missing_values(df)
             types = _load_feature_types(db, df_name, anonymized=False)
             db._load_ordinal_orders(self.meta)
             order = db.ordinal_orders.get(self.meta.tag, None)
-            df, _, _, _ = db._encode_df(df, mv, types, order=order,
-                                        encode=self.meta.encode_transform)
+            encode = self._encode_mode(self.meta.encode_transform)
+            vocabulary = self._vocabulary(df)
+            df, _, types, _ = db._encode_df(df, mv, types, order=order,
+                                            encode=encode,
+                                            vocabulary=vocabulary)
+            self._f_categorical += self._categorical_f(types, encode)
             self._X_extra_base = df
             self._X_extra_base.sort_index(inplace=True)
 
         if self.meta.encode_select and self._X_select_base is not None:
             df = self._X_select_base
-            mv = get_missing_values(df, db.heuristic)
+            mv = self._filled_missing_values(df)
             types = _load_feature_types(db, df_name, anonymized=False)
             db._load_ordinal_orders(self.meta)
             order = db.ordinal_orders.get(self.meta.tag, None)
-            df, _, _, _ = db._encode_df(df, mv, types, order=order,
-                                        encode=self.meta.encode_select)
+            encode = self._encode_mode(self.meta.encode_select)
+            vocabulary = self._vocabulary(df)
+            df, _, types, _ = db._encode_df(df, mv, types, order=order,
+                                            encode=encode,
+                                            vocabulary=vocabulary)
+            self._f_categorical += self._categorical_f(types, encode)
             self._X_select_base = df
             self._X_select_base.sort_index(inplace=True)
 
+        self._mv_filled = None
+        self._share_index()
+        self.check_index_consistency()
+
+        logging.info(f'X of {self.meta.tag} ({self.categorical_encoding}): '
+                     f'{self._width()} features, {self._memory()/1e6:.1f} MB.')
+
+    def _load_X_base_steps(self):
+        """Step 5 from the features encoded by the cached steps.
+
+        Unlike _load_X_base, the unencoded features (_X_select_unenc,
+        _X_extra_unenc) are not kept: they are left to None.
+        """
+        select = self.meta.select
+        transform = self.meta.transform
+        select_f = self._select_features()
+        transform_f = self._transform_features()
+
+        # Features in the order of the source file, as scanned
+        header = [f for f in self._f_header if f not in self.meta.idx_column]
+        if not select and not transform:
+            select_f = header
+
+        if select or not transform:
+            select_f = [f for f in header if f in set(select_f)]
+            self._X_select_base = self._encoded_features(
+                select_f, self.meta.encode_select)
+
+        if transform:
+            transform_f = [f for f in header if f in set(transform_f)]
+            self._X_extra_base = self._encoded_features(
+                transform_f, self.meta.encode_transform)
+
+        self._df_scan = None
+        self._share_index()
         self.check_index_consistency()
 
+        logging.info(f'X of {self.meta.tag} ({self.categorical_encoding}): '
+                     f'{self._width()} features, {self._memory()/1e6:.1f} MB.')
+
+    def _encoded_features(self, features, encode):
+        """Features filled and encoded, only the ones not cached computed.
+
+        See steps.py.
+        """
+        if not features:
+            return pd.DataFrame(index=self._y.index)
+
+        db = dbs[self.meta.db]
+        key = steps.features_key(self, encode)
+        encoded = steps.load(key) or dict()
+        missing = [f for f in features if f not in encoded]
+
+        if missing:
+            scanned = set() if self._df_scan is None else self._df_scan.columns
+            if not set(missing).issubset(scanned):
+                self._scan(set(missing).union(self.meta.idx_column),
+                           skipped=self._scan_skipped)
+
+            df = self._scanned(missing)
+            mv = self._missing_values(df)
+            df = fill_df(df, mv != 0, np.nan)
+            df.sort_index(inplace=True)
+
+            if encode:
+                mv = filled_missing_values(mv, db.heuristic)
+                if mv is None:
+                    mv = get_missing_values(df, db.heuristic)
+                mv.sort_index(inplace=True)
+                types = _load_feature_types(db, self.meta.df_name,
+                                            anonymized=False)
+                db._load_ordinal_orders(self.meta)
+                order = db.ordinal_orders.get(self.meta.tag, None)
+                df, _, types, parent = db._encode_df(
+                    df, mv, types, order=order,
+                    encode=self._encode_mode(encode),
+                    vocabulary=self._vocabulary(df))
+                encoded.update(steps.split_encoded(df, types, parent,
+                                                   missing))
+            else:
+                encoded.update({f: {'df': df[[f]], 'types': None}
+                                for f in missing})
+
+            steps.dump(key, encoded)
+
+        types = None
+        if encode:
+            types = _load_feature_types(db, self.meta.df_name,
+                                        anonymized=False)
+        df, types = steps.assemble_encoded(encoded, features, types, encode)
+        if encode:
+            self._f_categorical += self._categorical_f(
+                types, self._encode_mode(encode))
+
+        return df
+
     def _load_X_y(self):
+        """Load X and y, from the shared X or task cache if enabled.
+
+        See shared.py and cache.py.
+        """
+        if shared.shared_enabled():
+            attached = shared.attach(task_cache.task_key(self))
+            if attached is not None:
+                self._X_select = attached['X']
+                self._X_extra = None
+                self._y = attached['y'].to_frame()
+                self._f_y = [attached['y'].name]
+                self._f_categorical = attached['f_categorical']
+                self._share_index()
+                return
+
+        if not task_cache.cache_enabled():
+            return self._build_X_y()
+
+        key = task_cache.task_key(self)
+        cached = task_cache.load(key)
+
+        if cached is not None:
+            self._X_select = cached['X_select']
+            self._X_extra = cached['X_extra']
+            self._y = cached['y']
+            self._f_y = cached['f_y']
+            self._f_categorical = cached['f_categorical']
+            self._share_index()
+            return
+
+        self._build_X_y()
+        task_cache.dump(key, {
+            'X_select': self._X_select,
+            'X_extra': self._X_extra,
+            'y': self._y,
+            'f_y': self._f_y,
+            'f_categorical': self._f_categorical,
+        })
+
+    def _build_X_y(self):
         """Load a dataframe from taskmeta (X and y)."""
         if self._X_extra_base is None and self._X_select_base is None:
             self._load_X_base()
@@ -403,8 +789,98 @@ class Task(object):
         else:
             self._X_select = self._X_select_base
 
+        self._share_index()
         self.check_index_consistency()
 
+    def _vocabulary(self, df):
+        """Persisted vocabulary of the features of df if enabled."""
+        if not vocabulary_enabled():
+            return None
+
+        return get_vocabulary(dbs[self.meta.db], self.meta.df_name,
+                              list(df.columns))
+
+    def _encode_mode(self, encode):
+        """Add the categorical encoding to an encode mode one hot encoding."""
+        if encode is None or self.categorical_encoding == 'one_hot':
+            return encode
+
+        if not isinstance(encode, list):
+            encode = [encode]
+
+        if 'one_hot' not in encode and 'all' not in encode:
+            return encode
+
+        return encode + [self.categorical_encoding]
+
+    @staticmethod
+    def _categorical_f(types, encode):
+        """Features kept as categorical codes by an encode mode."""
+        if not isinstance(encode, list) or 'native' not in encode:
+            return []
+
+        return list(types.index[types == CATEGORICAL])
+
+    def _width(self):
+        """Number of features of X (before step 7)."""
+        return sum(df.shape[1] for df in [self._X_select_base,
+                                          self._X_extra_base]
+                   if df is not None)
+
+    def _memory(self):
+        """Number of bytes used by the encoded features (before step 7)."""
+        return sum(df.memory_usage(deep=True).sum()
+                   for df in [self._X_select_base, self._X_extra_base]
+                   if df is not None)
+
+    def _assemble_X(self):
+        """Concatenate the selected and extra features of X.
+
+        Dense numeric features are copied into a single contiguous block and
+        the selected and extra dfs become views on it. X being a single
+        block already (eg attached to a shared X) is used as is.
+        """
+        dfs = {k: df for k, df in [('_X_select', self._X_select),
+                                   ('_X_extra', self._X_extra)]
+               if df is not None}
+        dtypes = [dt for df in dfs.values() for dt in df.dtypes]
+
+        if len(dfs) == 1 and next(iter(dfs.values()))._mgr.is_single_block:
+            return next(iter(dfs.values()))
+
+        X = None
+        if dtypes and all(isinstance(dt, np.dtype) and is_numeric_dtype(dt)
+                          for dt in dtypes):
+            widths = [df.shape[1] for df in dfs.values()]
+            X = assemble_columns(dict(dfs), np.result_type(*dtypes))
+
+        if X is None:
+            return pd.concat(dfs.values(), axis=1)
+
+        start = 0
+        for (k, df), width in zip(dfs.items(), widths):
+            view = X.iloc[:, start:start+width]
+            if self._X_select_base is df:
+                self._X_select_base = view
+            if self._X_extra_base is df:
+                self._X_extra_base = view
+            setattr(self, k, view)
+            start += width
+
+        return X
+
+    def _share_index(self):
+        """Make the dfs equal to the index of y share this index object.
+
+        Comparing or sorting (already sorted) indexes is then O(1).
+        """
+        index = self._y.index
+        for df in [self._X_extra, self._X_extra_base, self._X_extra_unenc,
+                   self._X_select, self._X_select_base, self._X_select_unenc]:
+            if df is not None and not df.index.is_(index) and \
+                    df.index.equals(index):
+                df.index = index
+
     def check_index_consistency(self):
         """Check whether all indexes are equal."""
         dfs = [self._y, self._X_extra, self._X_extra_base, self._X_extra_unenc,
@@ -416,3 +892,68 @@ class Task(object):
             idx1 = indexes[i]
             idx2 = indexes[i+1]
             assert idx1.equals(idx2)
+
+
+def scan_together(tasks, y_only=False):
+    """Read once the features needed by tasks sharing the same source df.
+
+    The tasks on the same df and index are given the same scan: the union
+    of the features they need, without the rows that all of them drop
+    from their index only. The types of the scanned features are then
+    inferred on the rows read for all the tasks. Tasks already cached
+    or shared (see cache.py and shared.py) are left out.
+
+    The y step and task cache entries of the tasks then depend on the tasks
+    they were loaded with: the rows skipped by the shared scan (recorded as
+    _scan_skipped) are not part of the cache keys. An entry dumped after a
+    shared scan is served to a task loaded alone, and conversely.
+
+    Parameters
+    ----------
+    tasks : list of Task
+        The tasks to scan for.
+    y_only : bool
+        Whether to read only the features needed to derive y. The other
+        features are read by each task when asked for X.
+
+    """
+    groups = dict()
+    for task in tasks:
+        if task._df_scan is not None or task._y is not None:
+            continue
+        if task_cache.cache_enabled() or shared.shared_enabled():
+            key = task_cache.task_key(task)
+            if (task_cache.cache_enabled() and task_cache.exists(key)) or \
+                    (shared.shared_enabled() and shared.exists(key)):
+                continue
+        meta = task.meta
+        group_key = (meta.db, meta.df_name, tuple(meta.idx_column))
+        groups.setdefault(group_key, []).append(task)
+
+    for (db_name, df_name, index_col), group in groups.items():
+        if len(group) < 2:
+            continue
+
+        features, skipped = set(index_col), None
+        for task in group:
+            task_features = task._plan_scan(y_only=y_only)
+            if task_features is None:  # All the features
+                task_features = set(task._f_header)
+            features.update(task_features)
+
+            drop = pd.Index([])
+            if len(index_col) == 1 and task.meta.idx_selection and \
+                    task._index_only_selection():
+                task._load_idx_to_drop()
+                drop = task._idx_to_drop
+            skipped = drop if skipped is None else skipped.intersection(drop)
+
+        logging.info(f'Scan {db_name}/{df_name} once for {len(group)} '
+                     f'tasks: {len(features)} features, {len(skipped)} '
+                     f'rows skipped.')
+
+        group[0]._scan(features, skipped=skipped)
+        for task in group[1:]:
+            task._file_index = group[0]._file_index
+            task._df_scan = group[0]._df_scan
+            task._scan_skipped = skipped
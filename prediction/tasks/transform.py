@@ -1,24 +1,58 @@
 """Implement the Transform class."""
+import re
+import ast
 from dataclasses import dataclass, field
-from typing import Callable, List
+from typing import Callable, Dict, List
 import pandas as pd
+import numpy as np
 
 
 @dataclass(frozen=True)
 class Transform(object):
-    """Store a transformer on a dataframe."""
+    """Store a transformer on a dataframe.
+
+    The transformer is either a callable or expressions defining new
+    features from the features of the df, eg
+    {'SI': '`FC en phase hospitalière` / `Pression Artérielle Systolique`'}.
+    Features are named as in python or between backticks. Expressions may
+    use the features defined before them and +, -, *, /, ** and the
+    functions of `expression_functions`. The input features of expressions
+    are inferred and their output features default to the defined ones.
+    """
 
     transform: Callable[[pd.DataFrame], pd.DataFrame] = lambda x: x
     input_features: List[str] = field(default_factory=list)
     output_features: List[str] = field(default_factory=list)
     child_sep: str = '_'
+    expressions: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        """Derive the transform and its features from the expressions."""
+        if not self.expressions:
+            return
+
+        expressions = dict(self.expressions)
+        inputs = expression_inputs(expressions)
+
+        def transform(df):
+            return evaluate_expressions(df, expressions)
+
+        # The dataclass is frozen
+        object.__setattr__(self, 'transform', transform)
+        if not self.input_features:
+            object.__setattr__(self, 'input_features', inputs)
+        if not self.output_features:
+            object.__setattr__(self, 'output_features', list(expressions))
 
     def get_infos(self):
         """Return a dict containing infos on the object."""
-        return {
+        infos = {
             'input_features': self.input_features,
             'output_features': self.output_features,
         }
+        if self.expressions:
+            infos['expressions'] = dict(self.expressions)
+        return infos
 
     def get_parent(self, features):
         """From a set of features, derive the parent features."""
@@ -27,3 +61,157 @@ class Transform(object):
                 return f.split(self.child_sep)[0]
             return f
         return {parent(f) for f in features}
+
+
+# Functions usable in expressions, applied elementwise
+expression_functions = {
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'log': np.log,
+    'exp': np.exp,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+}
+
+_operators = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+}
+
+
+def _parse(expression):
+    """Parse an expression into an ast and the names of its features."""
+    names = []
+
+    def quoted(match):
+        names.append(match.group(1))
+        return f'__feature_{len(names)-1}__'
+
+    source = re.sub(r'`([^`]*)`', quoted, expression)
+
+    try:
+        tree = ast.parse(source.strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f'Invalid expression {expression!r}: {e.msg}.')
+
+    def name(node):
+        m = re.fullmatch(r'__feature_(\d+)__', node.id)
+        return names[int(m.group(1))] if m else node.id
+
+    # Replace the placeholders by the names and check the nodes
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            node.id = name(node)
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords or \
+                    node.func.id not in expression_functions:
+                raise ValueError(f'Invalid expression {expression!r}: only '
+                                 f'{list(expression_functions)} can be '
+                                 f'called.')
+        elif isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            if type(node.op) not in _operators:
+                raise ValueError(f'Invalid expression {expression!r}: '
+                                 f'unsupported operator.')
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)):
+                raise ValueError(f'Invalid expression {expression!r}: '
+                                 f'only numbers are allowed as constants.')
+        elif not isinstance(node, (ast.Load, ast.operator, ast.unaryop)):
+            raise ValueError(f'Invalid expression {expression!r}: '
+                             f'unsupported {type(node).__name__}.')
+
+    return tree
+
+
+def _features(tree):
+    """Names of the features used by an expression, in order of use."""
+    called = {id(n.func) for n in ast.walk(tree) if isinstance(n, ast.Call)}
+    names = [n.id for n in ast.walk(tree)
+             if isinstance(n, ast.Name) and id(n) not in called]
+    return list(dict.fromkeys(names))
+
+
+def expression_inputs(expressions):
+    """Give the features of the df used by expressions.
+
+    Parameters
+    ----------
+    expressions : dict
+        Names of the defined features as keys and expressions as values.
+
+    Returns
+    -------
+    list
+        The features used by the expressions, without the ones they define
+        before using them.
+
+    """
+    inputs, defined = [], set()
+    for output, expression in expressions.items():
+        for f in _features(_parse(expression)):
+            if f not in defined and f not in inputs:
+                inputs.append(f)
+        defined.add(output)
+
+    return inputs
+
+
+def evaluate_expressions(df, expressions):
+    """Evaluate expressions on the features of a df.
+
+    Only the features used are cast to float. Outputs are computed on the
+    numpy arrays of the features and gathered in one block in which the
+    infinite values (eg from divisions by 0) are replaced by nans.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The df holding the input features of the expressions.
+    expressions : dict
+        Names of the defined features as keys and expressions as values.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The defined features, in the order of the expressions.
+
+    """
+    values = np.empty((len(expressions), df.shape[0]), dtype=float)
+    env = {}
+
+    def column(name):
+        if name not in env:
+            if name not in df.columns:
+                raise ValueError(f'Feature {name!r} of expressions not '
+                                 f'found in df.')
+            env[name] = df[name].to_numpy(dtype=float)
+        return env[name]
+
+    def evaluate(node):
+        if isinstance(node, ast.Name):
+            return column(node.id)
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.BinOp):
+            return _operators[type(node.op)](evaluate(node.left),
+                                             evaluate(node.right))
+        if isinstance(node, ast.UnaryOp):
+            return _operators[type(node.op)](evaluate(node.operand))
+        if isinstance(node, ast.Call):
+            args = [evaluate(arg) for arg in node.args]
+            return expression_functions[node.func.id](*args)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for i, (output, expression) in enumerate(expressions.items()):
+            values[i, :] = evaluate(_parse(expression))
+            env[output] = values[i, :]  # Usable by the next expressions
+
+    values[np.isinf(values)] = np.nan
+
+    return pd.DataFrame(values.T, index=df.index,
+                        columns=list(expressions), copy=False)
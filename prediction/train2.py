@@ -73,6 +73,11 @@ def train(task, strategy, RS=None, **kwargs):
     """
     X, y = task.X, task.y
 
+    # Native categorical features (categorical_encoding 'native')
+    categorical_features = task.categorical_features
+    if categorical_features:
+        strategy.set_categorical_features(categorical_features)
+
     logger.info(f'Started task "{task.meta.tag}" '
                 f'using "{strategy.name}" strategy on "{task.meta.db}".')
     logger.info(f'X shape: {X.shape}')
@@ -2,8 +2,10 @@
 import logging
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import ShuffleSplit, StratifiedShuffleSplit
+from joblib import Parallel, delayed, effective_n_jobs, parallel_backend
 import time
 
+from . import imputation_cache
 from .DumpHelper import DumpHelper
 from .TimerStep import TimerStep
 
@@ -37,6 +39,11 @@ def train(task, strategy, RS=None, **kwargs):
 
     X, y = task.X, task.y  # Expensive data retrieval is hidden here
 
+    # Native categorical features (categorical_encoding 'native')
+    categorical_features = task.categorical_features
+    if categorical_features:
+        strategy.set_categorical_features(categorical_features)
+
     logger.info(f'Started task "{task.meta.tag}" '
                 f'using "{strategy.name}" strategy on "{task.meta.db}".')
     logger.info(f'X shape: {X.shape}')
@@ -73,7 +80,8 @@ def train(task, strategy, RS=None, **kwargs):
 
     estimator = Pipeline(steps)
 
-    # Size of the train set
+    # Draw the train and test sets of all the sizes
+    units = []
     for n in strategy.train_set_steps:
         n_tot = X.shape[0]
         if n_tot - n < strategy.min_test_set*n_tot:
@@ -89,52 +97,168 @@ def train(task, strategy, RS=None, **kwargs):
             ss = ShuffleSplit(n_splits=strategy.n_splits, test_size=n_tot-n,
                               random_state=RS)
 
-        # Repetedly draw train and test sets
         for i, (train_idx, test_idx) in enumerate(ss.split(X, y)):
-            X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-            y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+            units.append((n, i, train_idx, test_idx))
+
+    roc = strategy.is_classification() and strategy.roc
+    if not strategy.is_classification():
+        logger.info('ROC: not a classification.')
+    elif not strategy.roc:
+        logger.info('ROC: not wanted.')
+
+    # Imputed train and test sets are shared through the imputation cache
+    cache_keys = [None]*len(units)
+    if strategy.imputer is not None and imputation_cache.cache_enabled():
+        fingerprint = imputation_cache.data_fingerprint(X)
+        cache_keys = [
+            imputation_cache.imputation_key(fingerprint, strategy.imputer, RS,
+                                            n, train_idx, test_idx)
+            for n, _, train_idx, test_idx in units
+        ]
+
+    def dump(n, i, test_idx, result):
+        y_test = y.iloc[test_idx]
+        times, probas, y_pred = result
+
+        # Dump fit times
+        dh.dump_times(*times, fold=i, tag=str(n))
+
+        if probas is not None:
+            dh.dump_probas(y_test, probas, fold=i, tag=str(n))
+
+        # Dump results
+        logger.info(f'Fold {i}: Ended predict.')
+        dh.dump_prediction(y_pred, y_test, fold=i, tag=str(n))
 
+    n_workers = min(effective_n_jobs(strategy.n_outer_jobs), len(units))
+
+    if n_workers <= 1:
+        # Repetedly draw train and test sets
+        for (n, i, train_idx, test_idx), key in zip(units, cache_keys):
             logger.info(f'Fold {i}: Started fitting the estimator')
-            estimator.fit(X_train, y_train)
-            logger.info('Ended fitting the estimator')
-
-            # Retrieve fit times from timestamps
-            end_ts = time.time()  # Wall-clock time
-            start_ts = timer_start.last_fit_timestamp
-            mid_ts = timer_mid.last_fit_timestamp
-
-            end_pt = time.process_time()  # Process time (!= Wall-clock time)
-            start_pt = timer_start.last_fit_pt
-            mid_pt = timer_mid.last_fit_pt
-
-            imputation_time = round(mid_ts - start_ts, 6) if start_ts else None
-            tuning_time = round(end_ts - mid_ts, 6)
-            imputation_pt = round(mid_pt - start_pt, 6) if start_pt else None
-            tuning_pt = round(end_pt - mid_pt, 6)
-
-            # Dump fit times
-            dh.dump_times(imputation_time, tuning_time,
-                          imputation_pt, tuning_pt,
-                          fold=i, tag=str(n))
-
-            # Predict
-            if strategy.is_classification() and strategy.roc:  # ROC asked
-                # Compute probas for retrieving ROC curve
-                probas = estimator.predict_proba(X_test)
-                logger.info('Started predict_proba')
-                # y_pred = np.argmax(probas, axis=1)
-                dh.dump_probas(y_test, probas, fold=i, tag=str(n))
-                y_pred = estimator.predict(X_test)
-            else:
-                # No need for probas, only predictions
-                if not strategy.is_classification():
-                    logger.info('ROC: not a classification.')
-                elif not strategy.roc:
-                    logger.info('ROC: not wanted.')
-
-                logger.info('Started predict')
-                y_pred = estimator.predict(X_test)
-
-            # Dump results
-            logger.info(f'Fold {i}: Ended predict.')
-            dh.dump_prediction(y_pred, y_test, fold=i, tag=str(n))
+            result = _fit_predict(estimator, X, y, train_idx, test_idx, roc,
+                                  cache_key=key)
+            dump(n, i, test_idx, result)
+        return
+
+    # Share the cpus between the workers, and within each worker between the
+    # jobs of the search and the OpenMP threads of the estimator
+    n_cpus = effective_n_jobs(strategy.n_cpus)
+    n_worker_cpus = max(1, n_cpus // n_workers)
+    n_search_jobs = max(1, min(effective_n_jobs(strategy.search.n_jobs),
+                               n_worker_cpus))
+    n_threads = max(1, n_worker_cpus // n_search_jobs)
+
+    logger.info(f'Fitting {len(units)} folds on {n_workers} workers with '
+                f'{n_search_jobs} search jobs of {n_threads} threads each.')
+
+    # Each worker fits its own copy of the estimator. The results are yielded
+    # in the order of the sequential loop and dumped by this process as soon
+    # as they are available.
+    with parallel_backend('loky', inner_max_num_threads=n_threads):
+        results = Parallel(n_jobs=n_workers, return_as='generator')(
+            delayed(_fit_predict)(estimator, X, y, train_idx, test_idx, roc,
+                                  key, n_search_jobs, n_threads)
+            for (_, _, train_idx, test_idx), key in zip(units, cache_keys)
+        )
+
+        for (n, i, _, test_idx), result in zip(units, results):
+            dump(n, i, test_idx, result)
+
+
+def _fit_predict(estimator, X, y, train_idx, test_idx, roc, cache_key=None,
+                 n_search_jobs=None, n_threads=None):
+    """Fit the estimator on a train set and predict on its test set.
+
+    Parameters
+    ----------
+    estimator : sklearn.pipeline.Pipeline
+        The pipeline built by train, with its timer steps.
+    X, y : pandas.DataFrame, pandas.Series
+        The data of the task.
+    train_idx, test_idx : np.ndarray
+        Positions of the train and test sets in X and y.
+    roc : bool
+        Whether to compute the probas.
+    cache_key : str
+        If given, the key of the imputation of the fold in the imputation
+        cache. The imputer step is then skipped on a cache hit.
+    n_search_jobs : int
+        If given, the number of jobs of the hyper-parameter search.
+    n_threads : int
+        If given, the number of threads of the fits of the search jobs.
+
+    Returns
+    -------
+    tuple
+        The fit times (imputation and tuning, wall-clock and process, and
+        whether the imputation was cached), the probas (None if not roc)
+        and the predictions on the test set.
+
+    """
+    if n_search_jobs is not None:
+        search = estimator.named_steps['searchCV_estimator']
+        search.set_params(n_jobs=n_search_jobs)
+        with parallel_backend('loky', inner_max_num_threads=n_threads):
+            return _fit_predict(estimator, X, y, train_idx, test_idx, roc,
+                                cache_key)
+
+    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+    y_train = y.iloc[train_idx]
+
+    imputed = None
+    predictor = estimator
+    if cache_key is None:
+        estimator.fit(X_train, y_train)
+    else:
+        # Fit the steps of the pipeline one by one as Pipeline.fit does, the
+        # imputer being replaced by the cached imputation if any
+        steps = list(estimator.named_steps)
+        imputer = estimator.named_steps['imputer']
+        predictor = estimator[steps.index('imputer')+1:]
+
+        estimator.named_steps['timer_start'].fit(X_train, y_train)
+        imputed = imputation_cache.load(cache_key)
+        if imputed is None:
+            X_train_imputed = imputer.fit_transform(X_train, y_train)
+        else:
+            X_train_imputed, X_test_imputed = imputed
+        predictor.fit(X_train_imputed, y_train)
+
+    logger.info('Ended fitting the estimator')
+
+    # Retrieve fit times from timestamps
+    end_ts = time.time()  # Wall-clock time
+    end_pt = time.process_time()  # Process time (!= Wall-clock time)
+    timer_start = estimator.named_steps.get('timer_start', None)
+    timer_mid = estimator.named_steps['timer_mid']
+
+    start_ts = timer_start.last_fit_timestamp if timer_start else None
+    mid_ts = timer_mid.last_fit_timestamp
+    start_pt = timer_start.last_fit_pt if timer_start else None
+    mid_pt = timer_mid.last_fit_pt
+
+    imputation_time = round(mid_ts - start_ts, 6) if start_ts else None
+    tuning_time = round(end_ts - mid_ts, 6)
+    imputation_pt = round(mid_pt - start_pt, 6) if start_pt else None
+    tuning_pt = round(end_pt - mid_pt, 6)
+    times = (imputation_time, tuning_time, imputation_pt, tuning_pt,
+             imputed is not None)
+
+    if cache_key is not None:
+        if imputed is None:
+            X_test_imputed = imputer.transform(X_test)
+            imputation_cache.dump(cache_key, (X_train_imputed, X_test_imputed))
+        X_test = X_test_imputed
+
+    # Predict
+    probas = None
+    if roc:
+        # Compute probas for retrieving ROC curve
+        logger.info('Started predict_proba')
+        probas = predictor.predict_proba(X_test)
+
+    logger.info('Started predict')
+    y_pred = predictor.predict(X_test)
+
+    return times, probas, y_pred
@@ -0,0 +1,179 @@
+"""Store the pvals and the used indexes of the tasks in a SQLite database.
+
+The pvals of a task are computed once per RS and T (see selection.py) and
+dumped in csv files in pvals/. Each task construction used to parse the
+whole file and sort it to keep the top n_top_pvals features. The files are
+now imported once in store_path, the pvals ranked, so that the top features
+are a query on an index and the used indexes a lookup.
+
+The entries are keyed by (db, task, RS, T, kind), from the path of the csv
+file (pvals/<db>/<task>/RS<RS>-T<T>-<kind>.csv), and reimported whenever the
+size or the modification time of the file changes.
+"""
+import os
+import re
+import sqlite3
+import logging
+import pandas as pd
+
+from io_utils import fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+store_path = 'cache/pvals.sqlite'
+
+_schema = """
+CREATE TABLE IF NOT EXISTS sources (
+    db TEXT, task TEXT, RS INTEGER, T INTEGER, kind TEXT,
+    size INTEGER, mtime INTEGER,
+    PRIMARY KEY (db, task, RS, T, kind)
+);
+CREATE TABLE IF NOT EXISTS pvals (
+    db TEXT, task TEXT, RS INTEGER, T INTEGER, kind TEXT,
+    rank INTEGER, feature TEXT, pval REAL,
+    PRIMARY KEY (db, task, RS, T, kind, rank)
+);
+CREATE TABLE IF NOT EXISTS used_idx (
+    db TEXT, task TEXT, RS INTEGER, T INTEGER, kind TEXT,
+    position INTEGER, idx,
+    PRIMARY KEY (db, task, RS, T, kind, position)
+);
+"""
+
+_n_columns = {'pvals': 8, 'used_idx': 7}
+
+
+def _connect():
+    os.makedirs(os.path.dirname(store_path) or '.', exist_ok=True)
+    connection = sqlite3.connect(store_path, timeout=60)
+    connection.executescript(_schema)
+    return connection
+
+
+def _key(path):
+    """Give the (db, task, RS, T, kind) key of a pvals or used idx file."""
+    task_dir, filename = os.path.split(os.path.normpath(path))
+    db_dir, task = os.path.split(task_dir)
+    db = os.path.basename(db_dir)
+    match = re.fullmatch(r'RS(-?\d+)-T(-?\d+)-(.+)\.csv', filename)
+    if match is None:
+        raise ValueError(f'Expected a file named RS<RS>-T<T>-<kind>.csv, '
+                         f'got {path}.')
+
+    RS, T, kind = match.groups()
+    return db, task, int(RS), int(T), kind
+
+
+def _sync(connection, path, read):
+    """Import a file in the store if not there or changed since.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+    path : str
+        The path of the csv file.
+    read : callable
+        Called on the path, gives the table and the rows to insert (the key
+        excluded).
+
+    Returns
+    -------
+    tuple
+        The key of the file.
+
+    """
+    key = _key(path)
+    size, mtime = fingerprint(path)
+
+    row = connection.execute(
+        'SELECT size, mtime FROM sources WHERE db=? AND task=? AND RS=? '
+        'AND T=? AND kind=?', key).fetchone()
+    if row == (size, mtime):
+        return key
+
+    table, rows = read(path)
+    logger.info(f'Pvals store: importing {path} ({len(rows)} rows).')
+
+    with connection:  # One transaction
+        connection.execute(f'DELETE FROM {table} WHERE db=? AND task=? '
+                           f'AND RS=? AND T=? AND kind=?', key)
+        placeholders = ', '.join(['?']*_n_columns[table])
+        connection.executemany(f'INSERT INTO {table} VALUES ({placeholders})',
+                               [key + r for r in rows])
+        connection.execute('INSERT OR REPLACE INTO sources VALUES '
+                           '(?, ?, ?, ?, ?, ?, ?)', key + (size, mtime))
+
+    return key
+
+
+def _read_pvals(path):
+    """Read a pvals file, ranked by increasing pval (ties in file order)."""
+    pvals = pd.read_csv(path, header=None, index_col=0).iloc[:, 0]
+    pvals.index = pvals.index.astype(str)
+    pvals = pvals.sort_values(kind='mergesort')
+
+    rows = [(rank, f, None if pd.isna(p) else float(p))
+            for rank, (f, p) in enumerate(pvals.items())]
+    return 'pvals', rows
+
+
+def _read_used_idx(path):
+    """Read a used idx file as the tasks did (first line as header)."""
+    index = pd.read_csv(path, index_col=0).index
+    rows = [(position, i.item() if hasattr(i, 'item') else i)
+            for position, i in enumerate(index)]
+    return 'used_idx', rows
+
+
+def top_pvals(path, n_top_pvals, drop_features=None):
+    """Give the features of a pvals file with the lowest pvals.
+
+    Parameters
+    ----------
+    path : str
+        The path of the pvals file.
+    n_top_pvals : int
+        The number of features to give.
+    drop_features : list of str
+        Features not to give, with their categories if categorical (ie the
+        feature followed by '_' and the category).
+
+    Returns
+    -------
+    list of str
+        The features by increasing pval.
+
+    """
+    regexes = [re.compile(f'(^{f}$|^{f}_)') for f in drop_features or []]
+
+    with _connect() as connection:
+        key = _sync(connection, path, _read_pvals)
+        cursor = connection.execute(
+            'SELECT feature FROM pvals WHERE db=? AND task=? AND RS=? AND T=? '
+            'AND kind=? ORDER BY rank', key)
+
+        features = []
+        for feature, in cursor:
+            if len(features) >= n_top_pvals:
+                break
+            if any(r.match(feature) for r in regexes):
+                continue
+            features.append(feature)
+
+    connection.close()
+
+    return features
+
+
+def used_idx(path):
+    """Give the indexes of a used idx file, as a pandas.Index."""
+    with _connect() as connection:
+        key = _sync(connection, path, _read_used_idx)
+        rows = connection.execute(
+            'SELECT idx FROM used_idx WHERE db=? AND task=? AND RS=? AND T=? '
+            'AND kind=? ORDER BY position', key).fetchall()
+
+    connection.close()
+
+    return pd.Index([r[0] for r in rows])
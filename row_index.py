@@ -0,0 +1,307 @@
+"""Persisted row index of the csv files: id -> line number -> byte offset.
+
+The index is built once per file (and per index column) and dumped in
+row_index_folder, keyed by the source path, its size and its modification
+time. It maps the ids of the index column to line numbers in a vectorized
+way and allows to read only some rows of the file by seeking directly to
+them instead of parsing the skipped ones. The kept rows can also be split
+in byte ranges parsed in parallel.
+"""
+import os
+import io
+import mmap
+import logging
+import pandas as pd
+import numpy as np
+from joblib import Parallel, delayed
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, infer_dtype
+
+from io_utils import fingerprint, _cache_dir
+
+
+logger = logging.getLogger(__name__)
+
+row_index_folder = 'cache/row_index/'
+
+# Use the row index to skip rows only if at least this fraction is skipped
+min_skip_fraction = 0.1
+
+# Keep the loaded row indexes in memory
+_row_indexes = dict()
+
+
+def _dump_path(path, sep, encoding):
+    """Return the path of the dumped row index of a file in its state."""
+    size, mtime = fingerprint(path)
+    cache_dir = _cache_dir(path, sep, encoding, folder=row_index_folder)
+    return f'{cache_dir}{size}-{mtime}.pkl'
+
+
+def _kind(series):
+    """Give the kind of a column parsed from a chunk of a csv."""
+    if series.isna().all():
+        return 'na'
+    if is_bool_dtype(series):
+        return 'bool'
+    if is_numeric_dtype(series):
+        return 'numeric'
+    inferred = infer_dtype(series, skipna=True)
+    if inferred == 'boolean':
+        return 'bool'
+    if inferred in ['mixed', 'mixed-integer', 'mixed-integer-float']:
+        return 'mixed'  # Eg numbers and str from a low memory parse
+    return 'str'
+
+
+def _parse_lines(path, header, starts, ends, sep, encoding, **kwargs):
+    """Parse the lines of a file given their byte offsets (header included).
+
+    Consecutive lines are grouped in runs to limit the number of slices. The
+    types are inferred on the whole columns of the lines (low_memory=False).
+    """
+    if len(starts) > 0:
+        breaks = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+        run_starts = starts[np.r_[0, breaks]]
+        run_ends = ends[np.r_[breaks - 1, len(ends) - 1]]
+    else:
+        run_starts, run_ends = [], []
+
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            chunks = [mm[header[0]:header[1]]]
+            for start, end in zip(run_starts, run_ends):
+                chunks.append(mm[start:end])
+
+    # The last line of the file may not end with a line break
+    data = b''.join(c if c.endswith(b'\n') else c + b'\n' for c in chunks)
+
+    kwargs['low_memory'] = False
+    return pd.read_csv(io.BytesIO(data), sep=sep, encoding=encoding, **kwargs)
+
+
+def _line_offsets(path, block_size=2**24):
+    """Return the byte offsets of the start of each line of a file.
+
+    The last element is the size of the file so that line i spans
+    offsets[i]:offsets[i+1].
+    """
+    offsets = [np.array([0], dtype=np.int64)]
+    position = 0
+
+    with open(path, 'rb') as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            offsets.append(newlines.astype(np.int64) + position + 1)
+            position += len(block)
+
+    offsets = np.concatenate(offsets)
+
+    # No empty line at the end of the file
+    if offsets[-1] != position:
+        offsets = np.append(offsets, position)
+
+    return offsets
+
+
+class RowIndex(object):
+    """Map the ids of a csv file to its lines and read some of its rows."""
+
+    def __init__(self, path, sep=',', encoding=None):
+        """Init."""
+        self.path = path
+        self.sep = sep
+        self.encoding = encoding
+        self.fingerprint = fingerprint(path)
+        self.offsets = _line_offsets(path)
+        self.ids = dict()
+        self._seekable = None
+
+    @property
+    def n_rows(self):
+        """Number of data rows (header excluded)."""
+        return len(self.offsets) - 2
+
+    def index(self, index_col):
+        """Return the ids of the given index column as a pandas.Index."""
+        if index_col not in self.ids:
+            df = pd.read_csv(self.path, sep=self.sep, encoding=self.encoding,
+                             usecols=[index_col], index_col=index_col)
+            self.ids[index_col] = df.index
+            self.dump()
+
+        return self.ids[index_col]
+
+    def seekable(self):
+        """Tell whether lines and rows match (eg no line break in a field)."""
+        if self._seekable is None:
+            if self.ids:
+                n_rows = len(next(iter(self.ids.values())))
+            else:
+                n_rows = pd.read_csv(self.path, sep=self.sep, usecols=[0],
+                                     encoding=self.encoding).shape[0]
+            self._seekable = bool(n_rows == self.n_rows)
+            if not self._seekable:
+                logger.warning(f'Row index: lines and rows of {self.path} '
+                               f'do not match, seeking disabled.')
+            self.dump()
+
+        return self._seekable
+
+    def rows(self, idx, index_col):
+        """Give the line numbers (header is 0) of the given ids."""
+        rows = self.index(index_col).get_indexer(pd.Index(idx))
+        if (rows < 0).any():
+            raise KeyError(f'Some ids not found in {index_col} '
+                           f'of {self.path}.')
+        return rows + 1
+
+    def read(self, skiprows=None, n_jobs=1, usecols=None, index_col=None,
+             **kwargs):
+        """Read the file without the given lines, seeking to the kept ones.
+
+        The kept lines are split in byte ranges which are parsed separately,
+        in parallel if n_jobs > 1. The types of the chunks are then
+        reconciled so that the result is the same as if the whole file were
+        parsed at once (see _reconcile).
+
+        Parameters
+        ----------
+        skiprows : list-like of int
+            Line numbers of the rows to skip (the header is line 0).
+        n_jobs : int
+            Number of processes parsing the chunks.
+        usecols : list-like
+            Names of the columns to load. All columns loaded if None.
+        index_col : str or list of str
+            Name(s) of the column(s) to use as index.
+        **kwargs : dict
+            Passed to pandas.read_csv.
+
+        Returns
+        -------
+        pandas.DataFrame
+
+        """
+        skip = np.zeros(self.n_rows, dtype=bool)
+        if skiprows is not None:
+            skiprows = np.asarray(list(skiprows), dtype=int) - 1
+            skip[skiprows[(skiprows >= 0) & (skiprows < self.n_rows)]] = True
+        kept = np.flatnonzero(~skip) + 1  # Line numbers of the kept rows
+
+        # Split the kept lines in chunks of about the same number of bytes
+        sizes = self.offsets[kept+1] - self.offsets[kept]
+        n_chunks = max(min(n_jobs, len(kept)), 1)
+        bounds = np.searchsorted(np.cumsum(sizes),
+                                 np.linspace(0, sizes.sum(), n_chunks+1)[1:-1])
+        chunks = np.split(kept, bounds)
+
+        if isinstance(index_col, str):
+            index_col = [index_col]
+        if usecols is not None and index_col:
+            usecols = set(usecols).union(index_col)
+
+        kwargs['usecols'] = usecols
+        dfs = self._parse(chunks, n_jobs, **kwargs)
+        df = self._reconcile(dfs, chunks, n_jobs, **kwargs)
+
+        logger.info(f'Row index: read {len(kept)}/{self.n_rows} rows of '
+                    f'{self.path} in {n_chunks} chunks.')
+
+        if index_col:
+            df.set_index(index_col if len(index_col) > 1 else index_col[0],
+                         inplace=True)
+
+        return df
+
+    def _parse(self, chunks, n_jobs, **kwargs):
+        """Parse the chunks of lines, in parallel if n_jobs > 1."""
+        args = [(self.path, self.offsets[[0, 1]], self.offsets[lines],
+                 self.offsets[lines+1], self.sep, self.encoding)
+                for lines in chunks]
+
+        if n_jobs > 1 and len(chunks) > 1:
+            return Parallel(n_jobs=n_jobs)(
+                delayed(_parse_lines)(*a, **kwargs) for a in args)
+
+        return [_parse_lines(*a, **kwargs) for a in args]
+
+    def _reconcile(self, dfs, chunks, n_jobs, **kwargs):
+        """Concatenate the chunks with the types of a whole file parse.
+
+        Deterministic rule: a column numeric in every chunk is concatenated
+        (upcasted to float if needed), as is a column boolean in every chunk.
+        Categorical columns are given the union of the chunks' categories.
+        Otherwise the column holds strings in the whole file parse: the
+        chunks where it has been parsed as numbers or booleans are parsed
+        again as raw strings, so that eg 1 and 1.0 stay as written in the
+        file and are never merged or split across chunks. So are the chunks
+        where a column mixes numbers and strings.
+        """
+        to_reparse = set()
+        for c in dfs[0].columns:
+            if isinstance(dfs[0][c].dtype, pd.CategoricalDtype):
+                if len(dfs) > 1:
+                    # Parsed as category in every chunk: same sorted categories
+                    categories = pd.Index(sorted(set().union(
+                        *(df[c].cat.categories for df in dfs))))
+                    for df in dfs:
+                        df[c] = df[c].cat.set_categories(categories)
+                continue
+
+            kinds = [_kind(df[c]) for df in dfs]
+            if set(kinds) <= {'numeric', 'na'} or set(kinds) <= {'bool', 'na'}:
+                continue
+            to_reparse.add(c)
+
+        ids = [i for i, df in enumerate(dfs)
+               if any(_kind(df[c]) != 'str' for c in to_reparse)]
+        if ids:
+            logger.info(f'Row index: reparse as str {len(to_reparse)} '
+                        f'columns with mixed types in {len(ids)} chunks.')
+            kwargs['usecols'] = to_reparse
+            kwargs['dtype'] = str
+            reparsed = self._parse([chunks[i] for i in ids], n_jobs, **kwargs)
+            for i, df_str in zip(ids, reparsed):
+                for c in to_reparse:
+                    dfs[i][c] = df_str[c].values
+
+        if len(dfs) == 1:
+            return dfs[0]
+
+        return pd.concat(dfs, axis=0, ignore_index=True)
+
+    def dump(self):
+        """Dump the row index, removing the stale ones of the same file."""
+        dump_path = _dump_path(self.path, self.sep, self.encoding)
+        dump_dir = os.path.dirname(dump_path)
+        os.makedirs(dump_dir, exist_ok=True)
+        for filename in os.listdir(dump_dir):
+            if filename != os.path.basename(dump_path):
+                os.remove(os.path.join(dump_dir, filename))
+        pd.to_pickle(self, dump_path)
+
+
+def get_row_index(path, sep=',', encoding=None):
+    """Load the row index of a file, building and dumping it if needed."""
+    key = (os.path.abspath(path), sep, encoding)
+    row_index = _row_indexes.get(key, None)
+
+    if row_index is not None and row_index.fingerprint == fingerprint(path):
+        return row_index
+
+    dump_path = _dump_path(path, sep, encoding)
+
+    if os.path.exists(dump_path):
+        logger.info(f'Row index: loading {dump_path}.')
+        row_index = pd.read_pickle(dump_path)
+    else:
+        logger.info(f'Row index: building row index of {path}.')
+        row_index = RowIndex(path, sep=sep, encoding=encoding)
+        row_index.dump()
+
+    _row_indexes[key] = row_index
+
+    return row_index
@@ -5,21 +5,25 @@ import pandas as pd
 import numpy as np
 
 from missing_values import get_missing_values
+from missing_mask import MissingMask
 from prediction.tasks import tasks
 from database import dbs
 
 
 def get_indicators_mv(df_mv):
+    # Counts are derived from the compact mask without boolean data frames
+    if not isinstance(df_mv, MissingMask):
+        df_mv = MissingMask.from_frame(df_mv)
+
     # 1: Statistics on the full database
     n_rows, n_cols = df_mv.shape
     n_values = n_rows*n_cols
-    df_mv1 = df_mv == 1
-    df_mv2 = df_mv == 2
-    df_mv_bool = df_mv != 0
+    n_mv1_f = df_mv.count(1)  # Number of MV 1 by feature
+    n_mv2_f = df_mv.count(2)  # Number of MV 2 by feature
 
     # Number of missing values in the DB
-    n_mv1 = df_mv1.values.sum()
-    n_mv2 = df_mv2.values.sum()
+    n_mv1 = n_mv1_f.sum()
+    n_mv2 = n_mv2_f.sum()
     n_mv = n_mv1 + n_mv2
     n_not_mv = n_values - n_mv
 
@@ -46,9 +50,9 @@ def get_indicators_mv(df_mv):
 
     # 2: Number of features with missing values
     # For each feature, tells if it contains MV of type 1
-    df_f_w_mv1 = df_mv1.any().rename('MV1')
+    df_f_w_mv1 = (n_mv1_f > 0).rename('MV1')
     # For each feature, tells if it contains MV of type 2
-    df_f_w_mv2 = df_mv2.any().rename('MV2')
+    df_f_w_mv2 = (n_mv2_f > 0).rename('MV2')
     # Concat previous series
     df_f_w_mv = pd.concat([df_f_w_mv1, df_f_w_mv2], axis=1)
 
@@ -90,8 +94,8 @@ def get_indicators_mv(df_mv):
     })
 
     # 3: Statistics feature-wise
-    n_mv1_fw = df_mv1.sum().to_frame('N MV1')  # Number of MV 1 by feature
-    n_mv2_fw = df_mv2.sum().to_frame('N MV2')  # Number of MV 2 by feature
+    n_mv1_fw = n_mv1_f.to_frame('N MV1')  # Number of MV 1 by feature
+    n_mv2_fw = n_mv2_f.to_frame('N MV2')  # Number of MV 2 by feature
 
     n_mv_fw = pd.concat([n_mv1_fw, n_mv2_fw], axis=1)
     n_mv_fw['N MV'] = n_mv_fw['N MV1'] + n_mv_fw['N MV2']
@@ -110,9 +114,9 @@ def get_indicators_mv(df_mv):
 
     # 4: Rows without missing values
     # For each row, tells if it contains MV of type 1
-    df_r_w_mv1 = df_mv1.any(axis=1).rename('MV1')
+    df_r_w_mv1 = df_mv.any(1, axis=1).rename('MV1')
     # For each row, tells if it contains MV of type 2
-    df_r_w_mv2 = df_mv2.any(axis=1).rename('MV2')
+    df_r_w_mv2 = df_mv.any(2, axis=1).rename('MV2')
     # Concat previous series
     df_r_w_mv = pd.concat([df_r_w_mv1, df_r_w_mv2], axis=1)
 
@@ -170,20 +174,20 @@ def get_indicators_mv(df_mv):
     features_to_drop_mv2_o = df_features.loc[~df_f_w_mv2_o].index
     features_to_drop_mv_1a2 = df_features.loc[~df_f_w_mv_1a2].index
 
-    df_mv1_dropped = df_mv_bool.drop(features_to_drop_mv1, 1)
-    df_mv2_dropped = df_mv_bool.drop(features_to_drop_mv2, 1)
-    df_mv_1o2_dropped = df_mv_bool.drop(features_to_drop_mv_1o2, 1)
-    df_mv1_o_dropped = df_mv_bool.drop(features_to_drop_mv1_o, 1)
-    df_mv2_o_dropped = df_mv_bool.drop(features_to_drop_mv2_o, 1)
-    df_mv_1a2_dropped = df_mv_bool.drop(features_to_drop_mv_1a2, 1)
+    df_mv1_dropped = df_mv.drop(features_to_drop_mv1, 1)
+    df_mv2_dropped = df_mv.drop(features_to_drop_mv2, 1)
+    df_mv_1o2_dropped = df_mv.drop(features_to_drop_mv_1o2, 1)
+    df_mv1_o_dropped = df_mv.drop(features_to_drop_mv1_o, 1)
+    df_mv2_o_dropped = df_mv.drop(features_to_drop_mv2_o, 1)
+    df_mv_1a2_dropped = df_mv.drop(features_to_drop_mv_1a2, 1)
 
     # Number of rows affected if we remove feature having MV of type:
-    n_r_a_rm_mv1 = (~df_mv1_dropped).any(axis=1).sum()  # MV1
-    n_r_a_rm_mv2 = (~df_mv2_dropped).any(axis=1).sum()  # MV2
-    n_r_a_rm_mv_1o2 = (~df_mv_1o2_dropped).any(axis=1).sum()  # MV1 or MV2
-    n_r_a_rm_mv1_o = (~df_mv1_o_dropped).any(axis=1).sum()  # MV1 only
-    n_r_a_rm_mv2_o = (~df_mv2_o_dropped).any(axis=1).sum()  # MV2 only
-    n_r_a_rm_mv_1a2 = (~df_mv_1a2_dropped).any(axis=1).sum()  # MV1 and MV2
+    n_r_a_rm_mv1 = df_mv1_dropped.any(0, axis=1).sum()  # MV1
+    n_r_a_rm_mv2 = df_mv2_dropped.any(0, axis=1).sum()  # MV2
+    n_r_a_rm_mv_1o2 = df_mv_1o2_dropped.any(0, axis=1).sum()  # MV1 or MV2
+    n_r_a_rm_mv1_o = df_mv1_o_dropped.any(0, axis=1).sum()  # MV1 only
+    n_r_a_rm_mv2_o = df_mv2_o_dropped.any(0, axis=1).sum()  # MV2 only
+    n_r_a_rm_mv_1a2 = df_mv_1a2_dropped.any(0, axis=1).sum()  # MV1 and MV2
 
     # Frequencies of rows affected if we remove feature having MV of type:
     f_r_a_rm_mv1 = 100*n_r_a_rm_mv1/n_rows  # MV1
@@ -211,12 +215,12 @@ def get_indicators_mv(df_mv):
 
     # 6: Proportion of information lost when removing features with MV
     # Number
-    n_v_lost_mv1 = (~df_mv1_dropped).sum().sum()
-    n_v_lost_mv2 = (~df_mv2_dropped).sum().sum()
-    n_v_lost_mv_1o2 = (~df_mv_1o2_dropped).sum().sum()
-    n_v_lost_mv1_o = (~df_mv1_o_dropped).sum().sum()
-    n_v_lost_mv2_o = (~df_mv2_o_dropped).sum().sum()
-    n_v_lost_mv_1a2 = (~df_mv_1a2_dropped).sum().sum()
+    n_v_lost_mv1 = df_mv1_dropped.count(0).sum()
+    n_v_lost_mv2 = df_mv2_dropped.count(0).sum()
+    n_v_lost_mv_1o2 = df_mv_1o2_dropped.count(0).sum()
+    n_v_lost_mv1_o = df_mv1_o_dropped.count(0).sum()
+    n_v_lost_mv2_o = df_mv2_o_dropped.count(0).sum()
+    n_v_lost_mv_1a2 = df_mv_1a2_dropped.count(0).sum()
 
     # Frequencies
     f_v_lost_mv1 = 100*n_v_lost_mv1/n_values
@@ -8,7 +8,7 @@ matplotlib.use('MacOSX')
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-from prediction.tasks import tasks
+from prediction.tasks import tasks, scan_together
 
 index_sizes_dir = 'sandbox/'
 index_sizes_path = f'{index_sizes_dir}index_sizes.csv'
@@ -17,16 +17,26 @@ index_sizes_path = f'{index_sizes_dir}index_sizes.csv'
 def compute_index_sizes():
     """Compute index sizes of all tasks."""
     rows = []
+    task_list = {}
 
     for tag in tasks.keys():
+        try:
+            task_list[tag] = tasks.get(tag, n_top_pvals=None)
+        except AssertionError:
+            task_list[tag] = None
+
+    # Tasks on the same df share one read of the features needed by y
+    scan_together([t for t in task_list.values() if t is not None],
+                  y_only=True)
+
+    for tag, task in task_list.items():
         db, name = tag.split('/')
         print(tag)
-        try:
-            task = tasks.get(tag, n_top_pvals=None)
+        if task is not None:
             y = task.y
             s = int(2/3*y.shape[0])
             print(f'\t{s}')
-        except AssertionError:
+        else:
             s = None
             print(f'\tpvals file not found')
 
@@ -0,0 +1,64 @@
+import logging
+import argparse
+from time import time
+import numpy as np
+import pandas as pd
+import os
+
+from prediction.tasks import tasks
+
+
+logger = logging.getLogger(__name__)
+
+# Parser config
+parser = argparse.ArgumentParser(description='Test X width and memory.')
+parser.add_argument('program')
+parser.add_argument('task_names', nargs='*', default=None)
+parser.add_argument('--modes', nargs='*', dest='modes',
+                    default=['one_hot', 'sparse', 'native'])
+
+
+def run(argv=None):
+    """Report the width and memory of X for the categorical encodings."""
+    args = parser.parse_args(argv)
+
+    task_names = args.task_names
+    if not task_names:
+        logger.info('No task given, all TB and UKBB tasks used.')
+        task_names = [t for t in tasks.keys() if t.split('/')[0] in
+                      ['TB', 'UKBB']]
+
+    rows = []
+    for task_name in task_names:
+        for mode in args.modes:
+            logger.info(f'Loading X of {task_name} ({mode}).')
+            task = tasks.get(task_name, categorical_encoding=mode)
+            t0 = time()
+            X = task.X
+            t_X_ready = time() - t0
+
+            rows.append({
+                'task_tag': task.meta.tag,
+                'categorical_encoding': mode,
+                'X_shape': repr(X.shape),
+                'X_width': X.shape[1],
+                'n_categorical': len(task.categorical_features),
+                'X_memory_MB': np.around(
+                    X.memory_usage(deep=True).sum()/1e6, 2),
+                'time_X_ready': np.around(t_X_ready, 2),
+            })
+            logger.info(rows[-1])
+
+    new_df = pd.DataFrame(rows)
+    print(new_df)
+
+    df = None
+    filepath = 'results/X_size.csv'
+    if os.path.exists(filepath):
+        df = pd.read_csv(filepath, index_col=0)
+
+    if df is not None:
+        new_df = pd.concat([df, new_df])
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    new_df.to_csv(filepath)
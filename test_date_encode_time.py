@@ -0,0 +1,111 @@
+import logging
+import argparse
+from time import time
+import numpy as np
+import pandas as pd
+import os
+
+from database import dbs, _load_feature_types
+from database.constants import DATE_EXPLODED, DATE_TIMESTAMP, NOT_MISSING
+import encode
+from encode import date_encode
+from df_utils import fill_df
+from io_utils import read_csv
+from missing_values import get_missing_values
+
+
+logger = logging.getLogger(__name__)
+
+# Parser config
+parser = argparse.ArgumentParser(description='Test date encode time.')
+parser.add_argument('program')
+parser.add_argument('df_names', nargs='*', default=None)
+
+
+def _generic_date_encode(df, method):
+    """Previous implementation: generic parsing of every cell."""
+    data = dict()
+    for feature_name in df.columns:
+        dt_series = pd.to_datetime(df[feature_name], dayfirst=True)
+        if method == 'timestamp':
+            dt_min = np.datetime64(dt_series.min())
+            tdt = np.timedelta64(1, 'D')
+            data[feature_name] = np.subtract(dt_series.values, dt_min)/tdt
+        else:
+            data[f'{feature_name}_year'] = dt_series.dt.year
+            data[f'{feature_name}_month'] = dt_series.dt.month
+            data[f'{feature_name}_day'] = dt_series.dt.day
+
+    return pd.DataFrame(data, index=df.index).astype(float)
+
+
+def run(argv=None):
+    """Time the encoding of all the date columns of UKBB."""
+    args = parser.parse_args(argv)
+
+    db = dbs['UKBB']
+    df_names = args.df_names or list(db.available_paths.keys())
+
+    rows = []
+    for df_name in df_names:
+        try:
+            types = _load_feature_types(db, df_name, anonymized=False)
+        except FileNotFoundError:
+            logger.info(f'{df_name}: no feature types, skipped.')
+            continue
+
+        types = types[types.isin([DATE_EXPLODED, DATE_TIMESTAMP])]
+        if types.empty:
+            logger.info(f'{df_name}: no date columns, skipped.')
+            continue
+
+        df = read_csv(db.frame_paths[df_name], sep=db._sep,
+                      encoding=db._encoding, usecols=list(types.index))
+        types = types[df.columns]
+        mv = get_missing_values(df, db.heuristic)
+        df = fill_df(df, mv != NOT_MISSING, np.nan)
+        parent = pd.Series(df.columns, index=df.columns)
+        logger.info(f'{df_name}: encoding {df.shape[1]} date columns of '
+                    f'{df.shape[0]} rows.')
+
+        for method in ['timestamp', 'explode']:
+            t0 = time()
+            expected = _generic_date_encode(df, method)
+            t_generic = time() - t0
+
+            encode._date_formats.clear()
+            t0 = time()
+            df_encoded, _, _, _ = date_encode(df, mv, types, parent,
+                                              method=method, dayfirst=True)
+            t_detect = time() - t0
+
+            pd.testing.assert_frame_equal(df_encoded, expected,
+                                          check_dtype=False)
+
+            formats = pd.Series([f for (_, _), f in
+                                 encode._date_formats.items()])
+            logger.info(f'{df_name} {method}: generic {t_generic:.2f}s, '
+                        f'detected formats {t_detect:.2f}s.')
+            rows.append({
+                'df_name': df_name,
+                'method': method,
+                'shape': repr(df.shape),
+                'formats': repr(formats.value_counts().to_dict()),
+                'time_generic': np.around(t_generic, 2),
+                'time_detect': np.around(t_detect, 2),
+                'speedup': np.around(t_generic/t_detect, 1),
+            })
+
+    new_df = pd.DataFrame(rows)
+    print(new_df)
+
+    df = None
+    filepath = 'results/date_encode_time.csv'
+    if os.path.exists(filepath):
+        df = pd.read_csv(filepath, index_col=0)
+
+    if df is not None:
+        new_df = pd.concat([df, new_df])
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    new_df.to_csv(filepath)
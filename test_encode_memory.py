@@ -0,0 +1,93 @@
+import logging
+import argparse
+import tracemalloc
+from time import time
+import numpy as np
+import pandas as pd
+import os
+
+from prediction.tasks import tasks
+from database import dbs, _load_feature_types
+
+
+logger = logging.getLogger(__name__)
+
+# Parser config
+parser = argparse.ArgumentParser(description='Test encode peak memory.')
+parser.add_argument('program')
+parser.add_argument('task_names', nargs='*', default=None)
+parser.add_argument('--modes', nargs='*', dest='modes',
+                    default=['one_hot', 'sparse', 'native'])
+
+
+def run(argv=None):
+    """Report the peak memory of the encoding of X of the pvals tasks."""
+    args = parser.parse_args(argv)
+
+    # The unencoded features are only kept by the tasks built without the
+    # task cache and its steps (see Task._load_X_base_steps)
+    os.environ['TASK_CACHE'] = '0'
+    os.environ['TASK_SHARED'] = '0'
+
+    task_names = args.task_names
+    if not task_names:
+        logger.info('No task given, TB and UKBB pvals tasks used.')
+        task_names = [t for t in tasks.keys() if t.split('/')[0] in
+                      ['TB', 'UKBB'] and t.endswith('_pvals')]
+
+    rows = []
+    for task_name in task_names:
+        for mode in args.modes:
+            task = tasks.get(task_name, categorical_encoding=mode)
+            task.X  # Load the unencoded features
+            df = task._X_select_unenc
+            if df is None or not task.meta.encode_select:
+                logger.info(f'{task_name}: no features to encode, skipped.')
+                break
+
+            db = dbs[task.meta.db]
+            mv = task._filled_missing_values(df)
+            types = _load_feature_types(db, task.meta.df_name,
+                                        anonymized=False)
+            db._load_ordinal_orders(task.meta)
+            order = db.ordinal_orders.get(task.meta.tag, None)
+            encode = task._encode_mode(task.meta.encode_select)
+            vocabulary = task._vocabulary(df)
+
+            tracemalloc.start()
+            t0 = time()
+            encoded = db._encode_df(df, mv, types, order=order,
+                                    encode=encode, vocabulary=vocabulary)
+            t_encode = time() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            in_size = df.memory_usage(deep=True).sum()
+            out_size = encoded[0].memory_usage(deep=True).sum() + \
+                encoded[1].memory_usage(deep=True).sum()
+
+            rows.append({
+                'task_tag': task.meta.tag,
+                'categorical_encoding': mode,
+                'X_shape': repr(encoded[0].shape),
+                'input_MB': np.around(in_size/1e6, 2),
+                'output_MB': np.around(out_size/1e6, 2),
+                'peak_MB': np.around(peak/1e6, 2),
+                'peak_over_output': np.around(peak/out_size, 2),
+                'time_encode': np.around(t_encode, 2),
+            })
+            logger.info(rows[-1])
+
+    new_df = pd.DataFrame(rows)
+    print(new_df)
+
+    df = None
+    filepath = 'results/encode_memory.csv'
+    if os.path.exists(filepath):
+        df = pd.read_csv(filepath, index_col=0)
+
+    if df is not None:
+        new_df = pd.concat([df, new_df])
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    new_df.to_csv(filepath)
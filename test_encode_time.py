@@ -0,0 +1,109 @@
+import logging
+import argparse
+from time import time
+import numpy as np
+import pandas as pd
+import os
+from sklearn.preprocessing import OrdinalEncoder
+
+from database.constants import NOT_MISSING, NOT_AVAILABLE, MV_PLACEHOLDER
+from encode import ordinal_encode
+from df_utils import fill_df
+
+
+logger = logging.getLogger(__name__)
+
+# Parser config
+parser = argparse.ArgumentParser(description='Test ordinal encode time.')
+parser.add_argument('program')
+parser.add_argument('--n-rows', default=20000, dest='n_rows', type=int)
+parser.add_argument('--n-cols', default=300, dest='n_cols', type=int)
+parser.add_argument('--n-categories', default=10, dest='n_categories',
+                    type=int)
+parser.add_argument('--mv-rate', default=0.2, dest='mv_rate', type=float)
+
+
+def _sklearn_ordinal_encode(df, mv):
+    """Previous implementation: cast to str and fit an OrdinalEncoder."""
+    enc = OrdinalEncoder()
+    df = df.astype(str)
+    df = fill_df(df, mv != NOT_MISSING, MV_PLACEHOLDER)
+    data_encoded = enc.fit_transform(df)
+
+    return pd.DataFrame(data_encoded, index=df.index, columns=df.columns)
+
+
+def _generate(n_rows, n_cols, n_categories, mv_rate, seed=0):
+    """Generate a TB-like df of categorical features with missing values.
+
+    A third of the columns hold numbers, a third strings written as numbers
+    and a third strings, as parsed from the csv or typed as category.
+    """
+    rng = np.random.RandomState(seed)
+    data = dict()
+    for j in range(n_cols):
+        values = rng.randint(n_categories, size=n_rows)
+        if j % 3 == 0:
+            data[f'F{j}'] = values.astype(float)
+        elif j % 3 == 1:
+            data[f'F{j}'] = values.astype(str)
+        else:
+            data[f'F{j}'] = np.char.add('cat_', values.astype(str))
+
+    df = pd.DataFrame(data)
+    mv = pd.DataFrame(
+        np.where(rng.uniform(size=df.shape) < mv_rate, NOT_AVAILABLE,
+                 NOT_MISSING).astype(np.int8), columns=df.columns)
+    df = fill_df(df, mv != NOT_MISSING, np.nan)
+
+    return df, mv
+
+
+def run(argv=None):
+    """Time the ordinal encoding of a TB-sized df, object and categorical."""
+    args = parser.parse_args(argv)
+
+    df, mv = _generate(args.n_rows, args.n_cols, args.n_categories,
+                       args.mv_rate)
+    logger.info(f'Ordinal encode df of shape {df.shape}.')
+
+    rows = []
+    for dtype in [None, 'category']:
+        df_typed = df if dtype is None else df.astype(dtype)
+
+        t0 = time()
+        _sklearn_ordinal_encode(df_typed, mv)
+        t_sklearn = time() - t0
+
+        t0 = time()
+        df_encoded, _ = ordinal_encode(df_typed, mv)
+        t_native = time() - t0
+
+        # Same partition of the non missing values and Nans for missing ones
+        assert df_encoded.isna().equals(mv != NOT_MISSING)
+
+        logger.info(f'dtype {dtype}: sklearn {t_sklearn:.2f}s, '
+                    f'native {t_native:.2f}s.')
+        rows.append({
+            'shape': repr(df.shape),
+            'n_categories': args.n_categories,
+            'mv_rate': args.mv_rate,
+            'dtype': str(dtype),
+            'time_sklearn': np.around(t_sklearn, 2),
+            'time_native': np.around(t_native, 2),
+            'speedup': np.around(t_sklearn/t_native, 1),
+        })
+
+    new_df = pd.DataFrame(rows)
+    print(new_df)
+
+    df = None
+    filepath = 'results/encode_time.csv'
+    if os.path.exists(filepath):
+        df = pd.read_csv(filepath, index_col=0)
+
+    if df is not None:
+        new_df = pd.concat([df, new_df])
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    new_df.to_csv(filepath)
@@ -0,0 +1,96 @@
+"""Fixtures shared by the tests."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import database
+from database.base import Database
+from database.constants import METADATA_PATH, NOT_AVAILABLE, CATEGORICAL, \
+    ORDINAL, CONTINUE_R, CONTINUE_I, BINARY, NOT_A_FEATURE
+from missing_values import HeuristicSpec
+from prediction.tasks import tasks
+from prediction.tasks.task import TaskMeta
+from prediction.tasks.transform import Transform
+
+
+class SyntheticDB(Database):
+    """A small database of one df in the working directory."""
+
+    heuristic = HeuristicSpec(na=NOT_AVAILABLE,
+                              tokens={NOT_AVAILABLE: ['NA', 'ND', 'NR']})
+
+    def __init__(self):
+        """Init."""
+        super().__init__(name='Synthetic', acronym='SYN',
+                         paths={'main': 'data.csv'}, sep=';')
+
+
+@pytest.fixture
+def synthetic_tasks(tmp_path, monkeypatch):
+    """Register a synthetic db and its task metas, by name as in tasks.
+
+    The working directory is a temporary one, so that the metadata and
+    the caches are written in it.
+    """
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.RandomState(0)
+    n = 300
+    df = pd.DataFrame({
+        'ID': np.arange(1000, 1000+n),
+        'Y': rng.choice(['0', '1', 'NA'], n),
+        'R': rng.choice(['1', '2', '3', 'ND', 'NA'], n),
+        'A': rng.normal(size=n).round(3),
+        'B': rng.choice(['x', 'y', 'z', 'NR'], n),
+        'C': rng.randint(0, 5, n).astype(float),
+        'S': rng.choice(['1', '0'], n),
+    })
+    df.loc[rng.choice(n, 20), 'A'] = np.nan
+    df.to_csv('data.csv', sep=';', index=False)
+
+    types = pd.Series({'ID': NOT_A_FEATURE, 'Y': BINARY, 'R': ORDINAL,
+                       'A': CONTINUE_R, 'B': CATEGORICAL, 'C': CONTINUE_I,
+                       'S': BINARY})
+    folder = f'{METADATA_PATH}features_types/SYN/'
+    tmp_path.joinpath(folder).mkdir(parents=True)
+    types.to_csv(f'{folder}data.csv', header=False)
+
+    monkeypatch.setitem(database.dbs._dbs, 'SYN', SyntheticDB())
+
+    dropped = df['ID'][rng.choice(n, 50, replace=False)]
+
+    def drop(**kwargs):
+        return TaskMeta(
+            name='drop', db='SYN', df_name='main', classif=True,
+            idx_column='ID',
+            idx_selection=Transform(
+                input_features=[],
+                transform=lambda df: df.drop(dropped, axis=0)),
+            predict=Transform(input_features=['Y'], output_features=['Y']),
+            select=Transform(output_features=['A', 'B', 'C']),
+            encode_select='all',
+        )
+
+    def subset(**kwargs):
+        return TaskMeta(
+            name='subset', db='SYN', df_name='main', classif=False,
+            idx_column='ID',
+            idx_selection=Transform(
+                input_features=['S'], transform=lambda df: df[df['S'] == 1]),
+            predict=Transform(input_features=['C'], output_features=['C']),
+            transform=Transform(expressions={'AC': 'A * C'}),
+            select=Transform(input_features=['R', 'B']),
+            encode_select='all',
+        )
+
+    def whole(**kwargs):
+        return TaskMeta(
+            name='whole', db='SYN', df_name='main', classif=True,
+            idx_column='ID',
+            predict=Transform(input_features=['Y'], output_features=['Y']),
+            encode_select='all',
+        )
+
+    metas = {'drop': drop, 'subset': subset, 'whole': whole}
+    monkeypatch.setitem(tasks.task_metas, 'SYN', metas)
+
+    return metas
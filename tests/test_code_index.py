@@ -0,0 +1,44 @@
+"""Test the inverted index of the codes of the csv files."""
+import numpy as np
+import pandas as pd
+
+import code_index
+from code_index import get_code_index
+
+
+def test_rows_with_any(tmp_path, monkeypatch):
+    """Test that the bitmaps match the comparisons of the columns."""
+    monkeypatch.setattr(code_index, 'code_index_folder', f'{tmp_path}/idx/')
+    path = f'{tmp_path}/data.csv'
+    rng = np.random.RandomState(0)
+    n = 200
+    df = pd.DataFrame({
+        'id': rng.permutation(np.arange(n)) + 1000,
+        'a': rng.choice(['C500', 'C501', 'E282', None], n),
+        'b': rng.choice(['C500', '1740', None], n),
+        'c': rng.choice([1, 2], n),
+        'd': rng.choice(['1740', 'V01', '174', None], n),  # Mixed ICD9
+    })
+    df.to_csv(path, index=False)
+    df = pd.read_csv(path, index_col='id')
+
+    index = get_code_index(path, ['a', 'b', 'c', 'd'], index_col='id')
+    idx = df.index[rng.permutation(n)[:50]]
+
+    for codes, columns in [(['C500'], None), (['C501', '1740'], ['a', 'b']),
+                           (['E282', 'X'], ['b']), (['1740', 'V01'], ['d']),
+                           (['174'], ['b', 'd'])]:
+        columns = columns or ['a', 'b', 'c', 'd']
+        expected = df[columns].isin(codes).any(axis=1)[idx]
+        bitmap = index.rows_with_any(codes, columns)
+        pd.testing.assert_series_equal(index.take(bitmap, idx), expected)
+
+    # Codes read as str in mixed columns, '174' not matching '1740'
+    bitmap = index.rows_with_any(['174'], ['d'])
+    assert 0 < bitmap.sum() < df['d'].str.startswith('174').sum()
+    assert bitmap.sum() == (df['d'] == '174').sum()
+
+    # Loaded from the dump
+    code_index._code_indexes.clear()
+    loaded = get_code_index(path, ['d', 'c', 'b', 'a'], index_col='id')
+    assert loaded.ids.equals(index.ids)
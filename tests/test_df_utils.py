@@ -0,0 +1,32 @@
+"""Test the operations on data frames."""
+import io
+import numpy as np
+import pandas as pd
+
+from df_utils import cast_dtypes, untyped_memory_usage
+
+
+def test_cast_dtypes():
+    """Test that typed columns keep the values of the untyped parse."""
+    data = 'a;b;c;d;e\n1;1.5;1;x;3\n2;;NA;ND;4\n1;2;2;x;NA\n'
+    dtype = {'a': 'category', 'b': np.float32, 'c': 'category',
+             'd': 'category', 'e': 'Int32'}
+    df = pd.read_csv(io.StringIO(data), sep=';')
+    df_typed = pd.read_csv(io.StringIO(data), sep=';',
+                           dtype={'a': 'category', 'c': 'category',
+                                  'd': 'category'})
+    df_typed = cast_dtypes(df_typed, dtype)
+
+    assert df_typed['b'].dtype == np.float32
+    assert df_typed['e'].dtype == 'Int32'
+    assert list(df_typed['a'].cat.categories) == [1, 2]
+    assert list(df_typed['c'].cat.categories) == [1.0, 2.0]
+    assert list(df_typed['d'].cat.categories) == ['ND', 'x']
+
+    # Same values as strings, as used by the encoders
+    for f in ['a', 'c', 'd']:
+        pd.testing.assert_series_equal(df_typed[f].astype(str),
+                                       df[f].astype(str))
+
+    assert untyped_memory_usage(df_typed[['a', 'd']]) == \
+        df[['a', 'd']].memory_usage(index=False, deep=True).sum()
@@ -0,0 +1,79 @@
+"""Test the encoders of the features."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from database.constants import NOT_MISSING, DATE_EXPLODED
+from encode import ordinal_encode, date_encode
+
+
+def test_ordinal_encode():
+    """Test that 1, 1.0 and '1' are the same category, whatever the dtype."""
+    df = pd.DataFrame({
+        'a': [1, 1.0, 10, 2, np.nan],
+        'b': ['1', '1.0', '10', '2', 'NA'],
+        'c': ['y', 'x', 'NA', 'y', 'x'],
+    })
+    mv = pd.DataFrame({'a': [0, 0, 0, 0, 2], 'b': [0, 0, 0, 0, 2],
+                       'c': [0, 0, 2, 0, 0]}, dtype=np.int8)
+
+    for df_typed in [df, df.astype('category')]:
+        df_encoded, mv_encoded = ordinal_encode(df_typed, mv)
+
+        assert mv_encoded is mv
+        # Numbers sorted by value, missing values as Nans
+        expected = [0, 0, 2, 1, np.nan]
+        assert np.allclose(df_encoded['a'], expected, equal_nan=True)
+        assert np.allclose(df_encoded['b'], expected, equal_nan=True)
+        assert np.allclose(df_encoded['c'], [1, 0, np.nan, 1, 0],
+                           equal_nan=True)
+
+    # Categories given by the order
+    df_encoded, _ = ordinal_encode(df, mv, order={'a': ['10', '2', '1'],
+                                                  'c': ['y', 'x']})
+    assert np.allclose(df_encoded['a'], [2, 2, 0, 1, np.nan], equal_nan=True)
+    assert np.allclose(df_encoded['c'], [0, 1, np.nan, 0, 1], equal_nan=True)
+
+    with pytest.raises(ValueError):
+        ordinal_encode(df, mv, order={'c': ['y']})
+
+    # Only the canonical forms of the numbers are numbers
+    df = pd.DataFrame({'a': ['0389', '389', '01', '1', '1e3', '1000'],
+                       'b': ['9007199254740993', 9007199254740992, '2', '2',
+                             '2', '2']})
+    mv = pd.DataFrame(0, index=df.index, columns=df.columns, dtype=np.int8)
+    df_encoded, _ = ordinal_encode(df, mv)
+    assert np.allclose(df_encoded['a'], [4, 1, 3, 0, 5, 2])
+    assert np.allclose(df_encoded['b'], [2, 1, 0, 0, 0, 0])
+
+    # Dict of df, only the given keys encoded
+    df_encoded, _ = ordinal_encode({0: df, 1: df}, {0: mv, 1: mv}, keys=[0])
+    assert df_encoded[1].equals(df)
+    assert df_encoded[0].isna().equals(mv != NOT_MISSING)
+
+
+def test_date_encode():
+    """Test that the detected formats give the dates of pd.to_datetime."""
+    df = pd.DataFrame({
+        'a': ['2010-01-31', '2012-02-29', np.nan, '2010-01-31'] * 30,
+        'b': ['03/04/2010', '31/12/2011', '01/02/2003', np.nan] * 30,
+        # Not in the format detected on the sample
+        'c': ['03/04/2010'] * 119 + ['2010-05-06'],
+    }).astype({'b': 'category'})
+    mv = pd.DataFrame(NOT_MISSING, index=df.index, columns=df.columns)
+    types = pd.Series(DATE_EXPLODED, index=df.columns)
+    parent = pd.Series(df.columns, index=df.columns)
+
+    df_encoded, _, _, _ = date_encode(df, mv, types, parent, method='explode',
+                                      dayfirst=True)
+    for f in df.columns:
+        dt = pd.to_datetime(df[f].astype(object), dayfirst=True).dt
+        assert np.allclose(df_encoded[f'{f}_year'], dt.year, equal_nan=True)
+        assert np.allclose(df_encoded[f'{f}_month'], dt.month, equal_nan=True)
+        assert np.allclose(df_encoded[f'{f}_day'], dt.day, equal_nan=True)
+
+    df_encoded, _, _, _ = date_encode(df, mv, types, parent,
+                                      method='timestamp', dayfirst=True)
+    dt = pd.to_datetime(df['b'].astype(object), dayfirst=True)
+    assert np.allclose(df_encoded['b'], (dt - dt.min()).dt.days,
+                       equal_nan=True)
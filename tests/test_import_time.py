@@ -0,0 +1,28 @@
+"""Test that importing the entry point does no heavy work."""
+import os
+import sys
+import subprocess
+
+
+# Budget in seconds for importing main in a fresh interpreter
+budget = float(os.environ.get('IMPORT_TIME_BUDGET', '5'))
+
+
+def test_import_time():
+    """Test that import main is fast and loads neither data nor dask."""
+    code = (
+        'import time\n'
+        't0 = time.perf_counter()\n'
+        'import main\n'
+        'print(time.perf_counter() - t0)\n'
+        'import sys\n'
+        'from database import dbs\n'
+        'print(int("dask" in sys.modules), len(dbs._dbs))\n'
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    res = subprocess.run([sys.executable, '-c', code], cwd=root,
+                         capture_output=True, text=True, check=True)
+    duration, loaded = res.stdout.strip().split('\n')[-2:]
+
+    assert float(duration) < budget
+    assert loaded == '0 0'
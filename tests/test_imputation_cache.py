@@ -0,0 +1,67 @@
+"""Test the cache of the imputed folds of train4."""
+import os
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+from sklearn.pipeline import Pipeline
+
+from prediction import imputation_cache
+from prediction.TimerStep import TimerStep
+from prediction.train4 import _fit_predict
+
+
+def test_fit_predict_cached(tmp_path, monkeypatch):
+    """Test that cached imputations give the predictions of the pipeline."""
+    monkeypatch.setattr(imputation_cache, 'cache_folder', f'{tmp_path}/')
+    rng = np.random.RandomState(0)
+    X = pd.DataFrame(rng.normal(size=(100, 3)), columns=['a', 'b', 'c'])
+    X = X.mask(rng.uniform(size=X.shape) < 0.2)
+    y = pd.Series(rng.randint(2, size=100))
+    train_idx, test_idx = np.arange(70), np.arange(70, 100)
+
+    def pipeline():
+        search = GridSearchCV(LogisticRegression(), {'C': [0.1, 1]}, cv=2)
+        return Pipeline([
+            ('timer_start', TimerStep('start')),
+            ('imputer', SimpleImputer(add_indicator=True)),
+            ('timer_mid', TimerStep('mid')),
+            ('searchCV_estimator', search),
+        ])
+
+    imputer = SimpleImputer(add_indicator=True)
+    fingerprint = imputation_cache.data_fingerprint(X)
+    key = imputation_cache.imputation_key(fingerprint, imputer, 0, 70,
+                                          train_idx, test_idx)
+    assert key != imputation_cache.imputation_key(
+        fingerprint, SimpleImputer(), 0, 70, train_idx, test_idx)
+
+    times, probas, y_pred = _fit_predict(pipeline(), X, y, train_idx,
+                                         test_idx, roc=True)
+    results = [_fit_predict(pipeline(), X, y, train_idx, test_idx, roc=True,
+                            cache_key=key) for _ in range(2)]
+
+    assert not times[4]
+    assert [r[0][4] for r in results] == [False, True]  # Miss then hit
+    for _, cached_probas, cached_y_pred in results:
+        np.testing.assert_array_equal(cached_probas, probas)
+        np.testing.assert_array_equal(cached_y_pred, y_pred)
+
+
+def test_evict(tmp_path, monkeypatch):
+    """Test that the least recently used imputations are evicted."""
+    monkeypatch.setattr(imputation_cache, 'cache_folder', f'{tmp_path}/')
+    monkeypatch.setenv('IMPUTATION_CACHE_MAX_MB', '1')
+    data = (np.zeros((25000, 2)), np.zeros((1, 2)))  # 0.4 MB
+
+    imputation_cache.dump('k1', data)
+    imputation_cache.dump('k2', data)
+    os.utime(imputation_cache._entry_path('k1'), ns=(0, 0))
+    os.utime(imputation_cache._entry_path('k2'), ns=(1, 1))
+    assert imputation_cache.load('k1') is not None  # Now the most recent
+    imputation_cache.dump('k3', data)
+
+    assert imputation_cache.load('k2') is None
+    assert imputation_cache.load('k1') is not None
+    assert imputation_cache.load('k3') is not None
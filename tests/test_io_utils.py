@@ -0,0 +1,49 @@
+"""Test the csv reader and its columnar cache."""
+import os
+import pandas as pd
+
+import io_utils
+from io_utils import read_csv
+
+
+def write_csv(path):
+    """Write a small csv with missing values and mixed types."""
+    with open(path, 'w') as file:
+        file.write('id;a;b;c\n1;1;x;2.5\n2;NA;y;\n3;3;NA;1\n4;4;z;0\n')
+
+
+def test_cache(tmp_path, monkeypatch):
+    """Test that the cache gives the same result as read_csv."""
+    monkeypatch.setattr(io_utils, 'cache_folder', f'{tmp_path}/cache/')
+    path = f'{tmp_path}/data.csv'
+    write_csv(path)
+    kwargs = {'sep': ';', 'encoding': 'utf-8'}
+
+    monkeypatch.setenv('CSV_CACHE', '0')
+    df = read_csv(path, **kwargs)
+    header = read_csv(path, nrows=0, index_col='id', **kwargs)
+    b = read_csv(path, usecols=['b'], squeeze=True, **kwargs)
+
+    monkeypatch.setenv('CSV_CACHE', '1')
+    hits, misses = io_utils.cache_stats['hits'], io_utils.cache_stats['misses']
+
+    pd.testing.assert_frame_equal(read_csv(path, **kwargs), df)
+    assert list(read_csv(path, nrows=0, index_col='id', **kwargs).columns) \
+        == list(header.columns)
+    pd.testing.assert_series_equal(
+        read_csv(path, usecols=['b'], squeeze=True, **kwargs), b)
+
+    df_cached = read_csv(path, usecols=['c', 'id'], index_col='id',
+                         skiprows=[2, 4], **kwargs)
+    assert list(df_cached.index) == [1, 3]
+    assert list(df_cached.columns) == ['c']
+
+    assert io_utils.cache_stats['misses'] == misses + 1
+    assert io_utils.cache_stats['hits'] == hits + 3
+
+    # Changing the source file invalidates the cache
+    with open(path, 'a') as file:
+        file.write('5;5;w;1\n')
+    os.utime(path, ns=(0, 0))
+    assert read_csv(path, **kwargs).shape == (5, 4)
+    assert io_utils.cache_stats['misses'] == misses + 2
@@ -0,0 +1,36 @@
+"""Test the compact storage of the types of missing values."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import missing_mask
+from missing_mask import MissingMask
+
+
+@pytest.mark.parametrize('n_rows', [1, 4, 7, 30])
+def test_mask(monkeypatch, n_rows):
+    """Test that the mask behaves as the int data frame it stores."""
+    monkeypatch.setattr(missing_mask, '_chunk_size', 2)
+    rng = np.random.RandomState(0)
+    mv = pd.DataFrame(rng.choice(3, (n_rows, 5)), columns=list('abcde'),
+                      index=np.arange(n_rows) + 10)
+    mask = MissingMask.from_frame(mv)
+
+    assert mask.shape == mv.shape
+    assert mask.memory_usage() == 5*(-(-n_rows // 4))
+    pd.testing.assert_frame_equal(mask.to_frame(), mv, check_dtype=False)
+    pd.testing.assert_frame_equal(mask != 0, mv != 0)
+    pd.testing.assert_frame_equal(mask == 2, mv == 2)
+
+    for code in range(3):
+        pd.testing.assert_series_equal(mask.count(code), (mv == code).sum())
+        pd.testing.assert_series_equal(mask.count(code, axis=1),
+                                       (mv == code).sum(axis=1))
+
+    pd.testing.assert_frame_equal(mask[['d', 'b']].to_frame(),
+                                  mv[['d', 'b']], check_dtype=False)
+    pd.testing.assert_series_equal(mask['c'], mv['c'], check_dtype=False)
+    assert list(mask.drop(['a']).columns) == list('bcde')
+
+    with pytest.raises(ValueError):
+        MissingMask.from_frame(mv + 3)
@@ -0,0 +1,94 @@
+"""Test the declarative heuristics against their column-wise versions."""
+import numpy as np
+import pandas as pd
+
+from database.constants import NOT_APPLICABLE, NOT_AVAILABLE, NOT_MISSING
+from database.TB import TB
+from database.NHIS import NHIS
+import missing_values
+from missing_values import get_missing_values, get_missing_values_cached, \
+    filled_missing_values
+from df_utils import fill_df
+
+
+def TB_heuristic(series):
+    """Column-wise TB heuristic (subset of the special columns)."""
+    series_mv = pd.Series(NOT_MISSING, index=series.index, name=series.name)
+    series_mv[series.isna()] = NOT_AVAILABLE
+    for token in ['NA', 'ND', 'NR', 'NF', 'NDC', 'IMP']:
+        series_mv[series == token] = NOT_AVAILABLE
+    if series.name == 'Nombre de pneumopathies':
+        series_mv[series == 'Non'] = NOT_APPLICABLE
+        series_mv[series == 'Oui'] = NOT_AVAILABLE
+    return series_mv
+
+
+def NHIS_heuristic(series):
+    """Column-wise NHIS heuristic."""
+    series_mv = pd.Series(NOT_MISSING, index=series.index, name=series.name)
+    series_mv[series.isna()] = NOT_APPLICABLE
+    if series.dtype == object:
+        return series_mv
+    val_max = series.max()
+    if val_max < 10:
+        for code in [7, 8, 9]:
+            series_mv[series == code] = NOT_AVAILABLE
+    if val_max < 100:
+        for code in [97, 98, 99]:
+            series_mv[series == code] = NOT_AVAILABLE
+    return series_mv
+
+
+def test_heuristics():
+    """Test that the specs give the output of the column-wise heuristics."""
+    rng = np.random.RandomState(0)
+    n = 200
+    df = pd.DataFrame({
+        'a': rng.choice(['1', 'NA', 'ND', 'Non', 'x', np.nan], n),
+        'Nombre de pneumopathies': rng.choice(['Non', 'Oui', 'NR', '2'], n),
+        'b': rng.choice([1., 7, 9, 8.5, np.nan], n),
+        'c': rng.choice([1, 7, 97, 99, 50], n),
+        'd': rng.choice([1, 7, 97, 150], n),
+        'e': rng.choice([1, 7, 'z'], n).astype(object),
+    })
+
+    for db_class, heuristic in [(TB, TB_heuristic), (NHIS, NHIS_heuristic)]:
+        mv = get_missing_values(df, db_class.heuristic)
+        assert (mv.dtypes == np.int8).all()
+        pd.testing.assert_frame_equal(mv, get_missing_values(df, heuristic),
+                                      check_dtype=False)
+        pd.testing.assert_series_equal(db_class.heuristic(df['b']),
+                                       heuristic(df['b']), check_dtype=False)
+
+
+def test_cache(monkeypatch):
+    """Test that the memoized types are the ones of get_missing_values."""
+    monkeypatch.setattr(missing_values, '_mv_cache', dict())
+    stats = {'hits': 0, 'misses': 0}
+    monkeypatch.setattr(missing_values, 'mv_cache_stats', stats)
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({
+        'a': rng.choice(['1', 'NA', 'ND', np.nan], 50),
+        'b': rng.choice([1., np.nan], 50),
+    }, index=rng.permutation(50) + 100)
+    source = ('TB', '20000', (0, 0))
+
+    for rows, columns in [(slice(0, 30), ['a']), (slice(10, 50), ['a', 'b']),
+                          (slice(0, 50), ['b', 'a'])]:
+        sub = df.iloc[rows][columns]
+        mv = get_missing_values_cached(sub, TB.heuristic, source)
+        pd.testing.assert_frame_equal(mv, get_missing_values(sub, TB.heuristic))
+
+    # Computed: rows 0-30 then 30-50 of a, rows 10-50 then 0-10 of b
+    assert stats == {'hits': 110, 'misses': 100}
+
+    # Not memoized: sentinels depend on the other rows of the column
+    assert not NHIS.heuristic.cell_wise
+    mv = get_missing_values_cached(df, NHIS.heuristic, source)
+    pd.testing.assert_frame_equal(mv, get_missing_values(df, NHIS.heuristic))
+    assert filled_missing_values(mv, NHIS.heuristic) is None
+
+    mv = get_missing_values(df, TB.heuristic)
+    df_filled = fill_df(df, mv != 0, np.nan)
+    pd.testing.assert_frame_equal(filled_missing_values(mv, TB.heuristic),
+                                  get_missing_values(df_filled, TB.heuristic))
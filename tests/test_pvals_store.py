@@ -0,0 +1,30 @@
+"""Test the store of the pvals of the tasks."""
+import os
+import numpy as np
+import pandas as pd
+
+import pvals_store
+
+
+def test_top_pvals(tmp_path, monkeypatch):
+    """Test that the top features are the ones of the sorted pvals file."""
+    monkeypatch.setattr(pvals_store, 'store_path', f'{tmp_path}/pvals.sqlite')
+    os.makedirs(f'{tmp_path}/DB/task_pvals')
+    path = f'{tmp_path}/DB/task_pvals/RS0-T1-pvals.csv'
+    rng = np.random.RandomState(0)
+    features = [f'F{i}' for i in range(50)] + ['G_a', 'G_b', 'GH']
+    pvals = pd.Series(rng.uniform(size=len(features)), index=features)
+    pvals.to_csv(path, header=False)
+
+    for n_top_pvals, drop in [(10, None), (0, None), (60, ['G', 'F1'])]:
+        expected = pvals.sort_values()
+        for f in drop or []:
+            expected = expected[~expected.index.str.match(f'(^{f}$|^{f}_)')]
+        expected = list(expected.index[:n_top_pvals])
+        assert pvals_store.top_pvals(path, n_top_pvals, drop) == expected
+
+    # Reimported when the file changes
+    pvals['F0'] = -1
+    pvals.to_csv(path, header=False)
+    os.utime(path, ns=(0, 0))
+    assert pvals_store.top_pvals(path, 1) == ['F0']
@@ -0,0 +1,94 @@
+"""Test the row index of the csv files."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import row_index
+from row_index import get_row_index
+
+
+@pytest.mark.parametrize('eol,last_eol', [('\n', True), ('\n', False),
+                                          ('\r\n', True)])
+def test_read(tmp_path, monkeypatch, eol, last_eol):
+    """Test that seeking to the kept rows gives the same df as skiprows."""
+    monkeypatch.setattr(row_index, 'row_index_folder', f'{tmp_path}/idx/')
+    path = f'{tmp_path}/data.csv'
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({
+        'id': rng.permutation(np.arange(100, 150)),
+        'a': rng.choice(['x', 'y', 'NA'], 50),
+        'b': rng.normal(size=50),
+    })
+    content = eol.join(df.to_csv(index=False).splitlines())
+    with open(path, 'w', newline='') as file:
+        file.write(content + (eol if last_eol else ''))
+
+    ri = get_row_index(path)
+    assert ri.n_rows == 50
+    assert ri.seekable()
+
+    # Vectorized id -> line mapping
+    ids = [df['id'][3], df['id'][0], df['id'][49]]
+    assert list(ri.rows(ids, 'id')) == [4, 1, 50]
+    with pytest.raises(KeyError):
+        ri.rows([0], 'id')
+
+    skiprows = [1, 2, 3, 10, 25, 26, 50]
+    expected = pd.read_csv(path, skiprows=skiprows, index_col='id',
+                           usecols=['id', 'b'])
+    pd.testing.assert_frame_equal(
+        ri.read(skiprows, index_col='id', usecols=['id', 'b']), expected)
+
+    # The row index is persisted and reloaded from the dump
+    row_index._row_indexes.clear()
+    assert get_row_index(path).ids['id'].equals(ri.ids['id'])
+
+
+def test_read_parallel(tmp_path, monkeypatch):
+    """Test that the chunks are parsed with the types of a whole parse."""
+    monkeypatch.setattr(row_index, 'row_index_folder', f'{tmp_path}/idx/')
+    path = f'{tmp_path}/data.csv'
+    n = 40
+    df = pd.DataFrame({
+        'id': np.arange(n),
+        # Numbers in the first chunks, strings in the last one
+        'a': ['1'] * 10 + ['1.0'] * 10 + ['2'] * 10 + ['x'] * 10,
+        # Integers then floats then missing
+        'b': ['3'] * 20 + ['2.5'] * 10 + [''] * 10,
+        'c': ['True', 'False'] * 15 + [''] * 10,
+        'd': [''] * 30 + ['y'] * 10,
+    })
+    df.to_csv(path, index=False)
+
+    expected = pd.read_csv(path, index_col='id', low_memory=False)
+    ri = get_row_index(path)
+    for n_jobs in [1, 4]:
+        pd.testing.assert_frame_equal(
+            ri.read(n_jobs=n_jobs, index_col='id'), expected)
+
+    dtype = {'a': 'category', 'd': 'category'}
+    expected = pd.read_csv(path, index_col='id', dtype=dtype)
+    pd.testing.assert_frame_equal(
+        ri.read(n_jobs=4, index_col='id', dtype=dtype), expected)
+
+
+def test_read_low_memory(tmp_path, monkeypatch):
+    """Test that a chunk larger than a low memory block is not mixed."""
+    monkeypatch.setattr(row_index, 'row_index_folder', f'{tmp_path}/idx/')
+    path = f'{tmp_path}/data.csv'
+    n = 400000
+    df = pd.DataFrame({
+        'id': np.arange(n),
+        # Integers, strings only in the last rows
+        'a': np.r_[np.arange(n - 10) % 100, ['x'] * 10],
+    })
+    df.to_csv(path, index=False)
+
+    ri = get_row_index(path)
+    skiprows = np.arange(1, n//5)  # Seek path, one chunk
+    for skip, n_jobs in [(skiprows, 1), (None, 2)]:
+        expected = pd.read_csv(path, skiprows=skip, index_col='id',
+                               low_memory=False)
+        read = ri.read(skip, n_jobs=n_jobs, index_col='id')
+        assert set(map(type, read['a'])) == {str}
+        pd.testing.assert_frame_equal(read, expected)
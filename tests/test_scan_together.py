@@ -0,0 +1,20 @@
+"""Test the tasks on the same df scanned together."""
+import pandas as pd
+import pytest
+
+from prediction.tasks import tasks
+
+
+@pytest.mark.parametrize('y_only', [False, True])
+def test_get_many(synthetic_tasks, y_only):
+    """Test that tasks scanned together are loaded as one at a time."""
+    tags = [f'SYN/{name}' for name in synthetic_tasks]
+    expected = [tasks.get(tag) for tag in tags]
+    loaded = tasks.get_many(tags, y_only=y_only)
+
+    # Scanned once for all the tasks
+    assert all(t._df_scan is loaded[0]._df_scan for t in loaded)
+
+    for task, expected_task in zip(loaded, expected):
+        pd.testing.assert_frame_equal(task.X, expected_task.X)
+        pd.testing.assert_series_equal(task.y, expected_task.y)
@@ -0,0 +1,29 @@
+"""Test the sharing of the X of the tasks between processes."""
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+from prediction.tasks import shared
+
+
+def test_publish_attach(tmp_path, monkeypatch):
+    """Test that attached X is a read only view on the published file."""
+    monkeypatch.setenv('TASK_SHARED_FOLDER', str(tmp_path))
+    monkeypatch.setattr(shared.task_cache, 'task_key', lambda task: 'key')
+    X = pd.DataFrame({'a': [1., 2., np.nan], 'b': [0, 1, 0]},
+                     index=[10, 11, 12])
+    y = pd.Series([0, 1, 1], index=X.index, name='y')
+    task = SimpleNamespace(X=X, y=y, meta=SimpleNamespace(tag='DB/task'),
+                           _f_categorical=['b'])
+
+    assert shared.attach('key') is None
+    assert shared.publish(task) == 'key'
+
+    attached = shared.attach('key')
+    pd.testing.assert_frame_equal(attached['X'], X.astype(np.float32))
+    pd.testing.assert_series_equal(attached['y'], y)
+    assert attached['f_categorical'] == ['b']
+    assert not attached['X'].values.flags.writeable
+
+    shared.unpublish('key')
+    assert shared.attach('key') is None
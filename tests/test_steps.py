@@ -0,0 +1,75 @@
+"""Test the cached steps of the loading of the tasks."""
+import os
+import dataclasses
+import numpy as np
+import pandas as pd
+import pytest
+
+from database.base import Database
+from database.constants import CATEGORICAL, ORDINAL, CONTINUE_R, \
+    DATE_EXPLODED, NOT_A_FEATURE
+from prediction.tasks import cache as task_cache
+from prediction.tasks.steps import split_encoded, assemble_encoded
+from prediction.tasks.task import Task
+from prediction.tasks.transform import Transform
+
+
+def test_assemble_encoded():
+    """Test that features encoded together give the encoding of a subset."""
+    rng = np.random.RandomState(0)
+    n = 50
+    df = pd.DataFrame({
+        'a': rng.normal(size=n),
+        'b': rng.choice(['x', 'y', 'z'], n),
+        'c': rng.choice(['01/02/2010', '03/04/2011'], n),
+        'd': rng.choice([1, 2, 3], n),
+        'e': rng.choice(['u', 'v'], n),
+        'f': rng.normal(size=n),
+    })
+    mv = pd.DataFrame(0, index=df.index, columns=df.columns, dtype=np.int8)
+    types = pd.Series({'a': CONTINUE_R, 'b': CATEGORICAL, 'c': DATE_EXPLODED,
+                       'd': ORDINAL, 'e': CATEGORICAL, 'f': NOT_A_FEATURE})
+
+    for encode in ['all', ['all', 'sparse'], ['all', 'native']]:
+        encoded, _, enc_types, parent = Database._encode_df(
+            df, mv, types, encode=encode)
+        features = split_encoded(encoded, enc_types, parent, df.columns)
+
+        for subset in [['d', 'a', 'e'], ['c', 'f', 'b'], list(df.columns)]:
+            subset = [f for f in df.columns if f in subset]
+            expected, _, expected_types, _ = Database._encode_df(
+                df[subset], mv[subset], types, encode=encode)
+            got, got_types = assemble_encoded(features, subset, types,
+                                              encode)
+            pd.testing.assert_frame_equal(got, expected)
+            pd.testing.assert_series_equal(got_types, expected_types[
+                expected_types.index.isin(expected.columns)])
+
+
+@pytest.mark.parametrize('mode', ['one_hot', 'native'])
+def test_cached_task(synthetic_tasks, monkeypatch, mode):
+    """Test that tasks loaded from the steps match the uncached ones."""
+    def load(meta, cache):
+        monkeypatch.setenv('TASK_CACHE', cache)
+        task = Task(meta, categorical_encoding=mode)
+        return task.X, task.y, task.categorical_features
+
+    def check(meta):
+        expected = load(meta, '0')
+        loaded = load(meta, '1')
+        pd.testing.assert_frame_equal(loaded[0], expected[0])
+        pd.testing.assert_series_equal(loaded[1], expected[1])
+        assert loaded[2] == expected[2]
+
+    for name, meta in synthetic_tasks.items():
+        meta = meta()
+        check(meta)  # Cold
+        check(meta)  # Warm
+
+    # Warm steps, another select on the same rows
+    entries = os.listdir(task_cache.cache_folder)
+    assert any(e.startswith('features-') for e in entries)
+    meta = synthetic_tasks['drop']()
+    for features in [['A', 'B'], ['B', 'R', 'S']]:
+        check(dataclasses.replace(
+            meta, select=Transform(output_features=features)))
@@ -0,0 +1,40 @@
+"""Test the cache of the loaded tasks."""
+import os
+import pandas as pd
+
+from prediction.tasks import cache
+from prediction.tasks.transform import Transform
+
+
+def _idx_transform(idx):
+    return Transform(transform=lambda df: df.drop(idx, axis=0))
+
+
+def test_describe():
+    """Test that the transforms are described by code and captured values."""
+    idx = pd.Series([1, 2, 3])
+    t1, t2 = _idx_transform(idx), _idx_transform(idx.copy())
+    t3 = _idx_transform(pd.Series([1, 2, 4]))
+    t4 = Transform(transform=lambda df: df.drop(idx, axis=1))
+
+    assert cache._describe(t1) == cache._describe(t2)
+    assert cache._describe(t1) != cache._describe(t3)
+    assert cache._describe(t1) != cache._describe(t4)
+
+
+def test_evict(tmp_path, monkeypatch):
+    """Test that the least recently used entries are evicted."""
+    monkeypatch.setattr(cache, 'cache_folder', f'{tmp_path}/')
+    monkeypatch.setenv('TASK_CACHE_MAX_MB', '1')
+    data = pd.DataFrame({'a': range(50000)})  # 0.4 MB
+
+    cache.dump('k1', data)
+    cache.dump('k2', data)
+    os.utime(cache._entry_path('k1'), ns=(0, 0))
+    os.utime(cache._entry_path('k2'), ns=(1, 1))
+    assert cache.load('k1') is not None  # k1 now the most recently used
+    cache.dump('k3', data)
+
+    assert cache.load('k2') is None
+    pd.testing.assert_frame_equal(cache.load('k1'), data)
+    pd.testing.assert_frame_equal(cache.load('k3'), data)
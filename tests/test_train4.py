@@ -0,0 +1,56 @@
+"""Test the training on train sets of increasing sizes."""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import GridSearchCV, KFold, \
+    StratifiedShuffleSplit
+
+from prediction import DumpHelper
+from prediction.strategies.strategy import Strategy
+from prediction.train4 import train
+
+
+def test_train_parallel(tmp_path, monkeypatch):
+    """Test that the folds fitted in parallel give the sequential results."""
+    monkeypatch.setattr(DumpHelper, 'results_folder', f'{tmp_path}/')
+    rng = np.random.RandomState(0)
+    X = pd.DataFrame(rng.normal(size=(300, 4)), columns=list('abcd'))
+    X = X.mask(rng.uniform(size=X.shape) < 0.1)
+    y = pd.Series((X['a'].fillna(0) + rng.normal(size=300) > 0).astype(int))
+
+    meta = SimpleNamespace(db='DB', name='task', tag='task')
+    task = SimpleNamespace(X=X, y=y, meta=meta, categorical_features=None,
+                           is_classif=lambda: True,
+                           get_infos=lambda: {'name': 'task'})
+
+    def strategy(n_outer_jobs):
+        return Strategy(
+            name=f'Classification_{n_outer_jobs}',
+            estimator=HistGradientBoostingClassifier(random_state=0),
+            inner_cv=StratifiedShuffleSplit(n_splits=2, train_size=0.8,
+                                            random_state=0),
+            outer_cv=KFold(n_splits=2),
+            param_space={'max_depth': [2, 3]},
+            search=GridSearchCV,
+            search_params={'scoring': 'roc_auc', 'n_jobs': 2},
+            imputer=SimpleImputer(),
+            roc=True,
+            train_set_steps=[50, 150],
+            min_test_set=0.2,
+            n_splits=2,
+            n_outer_jobs=n_outer_jobs,
+            n_cpus=2,
+        )
+
+    for n_outer_jobs in [1, 2]:
+        train(task, strategy(n_outer_jobs), RS=0, T=0)
+
+    for size in [50, 150]:
+        for filename in [f'{size}_prediction.csv', f'{size}_probas.csv']:
+            dumped = [pd.read_csv(f'{tmp_path}/DB/task/RS0_T0_'
+                                  f'Classification_{n}/{filename}')
+                      for n in [1, 2]]
+            pd.testing.assert_frame_equal(*dumped)
@@ -0,0 +1,32 @@
+"""Test the expressions of the transforms."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from prediction.tasks.transform import Transform
+
+
+def test_expressions():
+    """Test that expressions infer their inputs and evaluate in one pass."""
+    transform = Transform(expressions={
+        'SI': '`Heart rate` / PAS',
+        'MBP': '(2*PAD + PAS)/3',
+        'Delta': 'maximum(SI, MBP) - `Heart rate`',
+    })
+    assert transform.input_features == ['Heart rate', 'PAS', 'PAD']
+    assert transform.output_features == ['SI', 'MBP', 'Delta']
+
+    df = pd.DataFrame({
+        'Heart rate': ['80', '90', np.nan],
+        'PAS': [100, 0, 120],
+        'PAD': [70, 60, 80],
+        'Unused': ['a', 'b', 'c'],
+    }, index=[3, 1, 2])
+    expected = pd.DataFrame({'SI': [0.8, np.nan, np.nan],
+                             'MBP': [80., 40., 280/3]}, index=df.index)
+    expected['Delta'] = [0., np.nan, np.nan]
+
+    pd.testing.assert_frame_equal(transform.transform(df), expected)
+
+    with pytest.raises(ValueError):
+        Transform(expressions={'A': 'eval(B)'})
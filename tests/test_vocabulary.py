@@ -0,0 +1,67 @@
+"""Test the persisted vocabularies of the encoders."""
+import numpy as np
+import pandas as pd
+
+from database.base import Database
+from database.constants import NOT_MISSING, CATEGORICAL, ORDINAL, \
+    DATE_TIMESTAMP
+from vocabulary import fit_vocabulary
+
+
+def test_fit_vocabulary():
+    """Test that a subset is encoded as in the whole df."""
+    df = pd.DataFrame({
+        'a': ['1', '2', '10', '2', np.nan, '1'],
+        'b': ['x', 'y', 'z', 'x', 'y', 'NA'],
+        'd': ['01/02/2010', '03/02/2010', '01/01/2009', np.nan,
+              '01/02/2010', '05/05/2012'],
+    })
+    mv = pd.DataFrame({'a': [0, 0, 0, 0, 0, 0], 'b': [0, 0, 0, 0, 0, 2],
+                       'd': [0, 0, 0, 0, 0, 0]}, dtype=np.int8)
+    df = df.mask(mv != NOT_MISSING, np.nan)
+    types = pd.Series({'a': ORDINAL, 'b': CATEGORICAL, 'd': DATE_TIMESTAMP})
+
+    vocabulary = fit_vocabulary(df, mv, types)
+    assert vocabulary['a']['categories'] == [1, 2, 10]
+    assert vocabulary['b']['categories'] == ['x', 'y', 'z']
+    assert vocabulary['b']['one_hot'] == ['MISSING_VALUE', 'x', 'y', 'z']
+    assert vocabulary['d']['date_min'] == np.datetime64('2009-01-01')
+
+    encode = ['ordinal', 'native', 'date']
+    encoded, _, _, _ = Database._encode_df(df, mv, types, encode=encode)
+    idx = [1, 3, 4]  # Without 1, z and the minimum date
+    encoded_sub, _, _, _ = Database._encode_df(
+        df.iloc[idx], mv.iloc[idx], types, encode=encode,
+        vocabulary=vocabulary)
+
+    pd.testing.assert_frame_equal(encoded_sub, encoded.iloc[idx])
+
+
+def test_vocabulary_parsed_rows(tmp_path):
+    """Test that rows parsed as numbers match the strings of the fit."""
+    path = f'{tmp_path}/data.csv'
+    pd.DataFrame({
+        'a': ['01', '02', '01', 'x'],
+        'b': ['01', '02', '02', 'y'],
+    }).to_csv(path, index=False)
+    types = pd.Series({'a': ORDINAL, 'b': CATEGORICAL})
+
+    # Whole file: strings. Rows of the task: numbers.
+    df = pd.read_csv(path, low_memory=False)
+    df_task = pd.read_csv(path, skiprows=[4])
+    assert df_task['a'].dtype == np.int64
+    mv = pd.DataFrame(NOT_MISSING, index=df.index, columns=df.columns,
+                      dtype=np.int8)
+
+    vocabulary = fit_vocabulary(df, mv, types)
+    assert vocabulary['a']['categories'] == ['01', '02', 'x']
+
+    for encode in [['ordinal', 'native'], ['ordinal', 'one_hot']]:
+        encoded, _, _, _ = Database._encode_df(df, mv, types, encode=encode,
+                                               vocabulary=vocabulary)
+        encoded_task, _, _, _ = Database._encode_df(
+            df_task, mv.iloc[:3], types, encode=encode,
+            vocabulary=vocabulary)
+
+        pd.testing.assert_frame_equal(encoded_task, encoded.iloc[:3],
+                                      check_dtype=False)
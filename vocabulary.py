@@ -0,0 +1,165 @@
+"""Persisted vocabularies of the encoders of the data frames.
+
+The vocabulary of a feature is the state of its fitted encoders: sorted
+categories (ordinal and categorical codes), one hot categories and date
+minimum (timestamps). It is fitted once on the whole source file of the
+data frame and dumped next to the feature types metadata, keyed by the
+state of the source file and of its metadata (feature types, ordinal
+orders). The encoders then only transform, so that the
+encoded columns are the same across tasks, RS and T values.
+
+The vocabularies are opt-in: set the environment variable
+ENCODER_VOCABULARY=1 to enable them.
+"""
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+from database.constants import METADATA_PATH, NOT_MISSING, ORDINAL, \
+    BINARY, CATEGORICAL, DATE_EXPLODED, DATE_TIMESTAMP
+from encode import ordinal_categories, one_hot_categories, date_minimum
+from missing_values import get_missing_values, filled_missing_values
+from df_utils import fill_df
+from features_type import _load_feature_types
+from io_utils import read_csv, fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+vocabulary_folder = f'{METADATA_PATH}vocabularies/'
+
+# Keep the loaded vocabularies in memory: (db, df_name) -> (states, dict)
+_vocabularies = dict()
+
+
+def vocabulary_enabled():
+    """Tell whether the vocabularies are enabled (ENCODER_VOCABULARY)."""
+    return os.environ.get('ENCODER_VOCABULARY', '0').lower() in \
+        ['1', 'true', 'yes']
+
+
+def _dump_path(db, df_name):
+    """Return the path of the vocabulary of a data frame."""
+    basename, _ = os.path.splitext(os.path.basename(db.frame_paths[df_name]))
+    return f'{vocabulary_folder}{db.acronym}/{basename}.pkl'
+
+
+def metadata_paths(db, df_name):
+    """Paths of the metadata of a df used when encoding it."""
+    basename, _ = os.path.splitext(os.path.basename(db.frame_paths[df_name]))
+    return [
+        f'{METADATA_PATH}features_types/{db.acronym}/{basename}.csv',
+        f'{METADATA_PATH}/ordinal_orders/{db.acronym}/{df_name}.yml',
+    ]
+
+
+def metadata_states(db, df_name):
+    """Fingerprints of the metadata of a df, None for the missing files."""
+    return [fingerprint(p) if os.path.exists(p) else None
+            for p in metadata_paths(db, df_name)]
+
+
+def fit_vocabulary(df, mv, types, dayfirst=True):
+    """Fit the vocabulary of the features of a df as _encode_df encodes them.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The features, missing values filled with Nans.
+    mv : pandas.DataFrame
+        The types of missing values of df.
+    types : pandas.Series
+        The types of the features.
+    dayfirst : bool
+        Passed to the parsing of the dates.
+
+    Returns
+    -------
+    dict
+        Features' names as keys and dict of their fitted state as values.
+
+    """
+    vocabulary = dict()
+
+    for f in df.columns:
+        t = types.get(f, None)
+        v = dict()
+        if t in [ORDINAL, BINARY, CATEGORICAL]:
+            v['categories'] = ordinal_categories(df[f], mv[f])
+        if t == CATEGORICAL:
+            v['one_hot'] = one_hot_categories(df[f], mv[f], normalize=True)
+        if t in [DATE_EXPLODED, DATE_TIMESTAMP]:
+            v['date_min'] = date_minimum(df[f], mv[f], dayfirst=dayfirst)
+        vocabulary[f] = v
+
+    return vocabulary
+
+
+def get_vocabulary(db, df_name, features):
+    """Load the vocabulary of the features of a data frame.
+
+    The features not in the dumped vocabulary are fitted on the whole
+    source file and added to it. The vocabulary is fitted again from
+    scratch if the source file or its metadata (feature types, ordinal
+    orders) have changed.
+
+    Parameters
+    ----------
+    db : Database
+        The database of the data frame.
+    df_name : str
+        The name of the data frame.
+    features : list
+        The names of the features to encode.
+
+    Returns
+    -------
+    dict
+        See fit_vocabulary. Only the features of the source file having an
+        encoded type are in it.
+
+    """
+    path = db.frame_paths[df_name]
+    states = (fingerprint(path), metadata_states(db, df_name))
+    dump_path = _dump_path(db, df_name)
+    key = (db.acronym, df_name)
+
+    cached = _vocabularies.get(key, None)
+    if cached is None and os.path.exists(dump_path):
+        cached = pd.read_pickle(dump_path)
+
+    vocabulary = dict()
+    if cached is not None and cached[0] == states:
+        vocabulary = cached[1]
+    elif cached is not None:
+        logger.info(f'Vocabulary: {path} or its metadata changed, fitting '
+                    f'again.')
+
+    types = _load_feature_types(db, df_name, anonymized=False)
+    encoded_types = [ORDINAL, BINARY, CATEGORICAL, DATE_EXPLODED,
+                     DATE_TIMESTAMP]
+    to_fit = [f for f in features if f not in vocabulary and
+              types.get(f, None) in encoded_types]
+
+    if to_fit:
+        logger.info(f'Vocabulary: fitting {len(to_fit)} features of '
+                    f'{db.acronym}/{df_name} on {path}.')
+        df = read_csv(path, sep=db._sep, encoding=db._encoding,
+                      usecols=to_fit, low_memory=False)
+        mv = get_missing_values(df, db.heuristic)
+        df = fill_df(df, mv != NOT_MISSING, np.nan)
+
+        # Types of missing values of the filled df, as given to the encoders
+        mv_filled = filled_missing_values(mv, db.heuristic)
+        if mv_filled is None:
+            mv_filled = get_missing_values(df, db.heuristic)
+
+        vocabulary = {**vocabulary, **fit_vocabulary(df, mv_filled, types)}
+
+        os.makedirs(os.path.dirname(dump_path), exist_ok=True)
+        pd.to_pickle((states, vocabulary), dump_path)
+
+    _vocabularies[key] = (states, vocabulary)
+
+    return {f: vocabulary[f] for f in features if f in vocabulary}